@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark - track Pi client cold-start time across releases
+
+Runs the restart client in --startup-only mode N times (fresh process each
+time, exactly like vapi_runner.sh) and reports median / p90 per phase and
+per import.
+
+Usage (from the repo root, on the Pi):
+    python3 src/bench_startup.py --runs 10
+    python3 src/bench_startup.py --runs 10 --save bench/pi3.json
+    python3 src/bench_startup.py --runs 10 --baseline bench/pi3.json --threshold 15
+
+Exit code 1 if --baseline is given and the median total regresses by more
+than --threshold percent.
+
+Note: with a fresh token cache the auth phase is a local file read; delete
+config/.device_cache.json first to benchmark the bootstrap path.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CLIENT_SCRIPT = os.path.join(SCRIPT_DIR, "vapi_client_sdk_restart.py")
+
+
+def device_model() -> str:
+    """Raspberry Pi model string (falls back to the CPU architecture)."""
+    try:
+        with open("/proc/device-tree/model") as f:
+            return f.read().strip("\x00\n ")
+    except OSError:
+        return platform.machine()
+
+
+def run_once() -> dict:
+    """One cold start; returns the profiler's JSON report."""
+    fd, profile_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        env = {**os.environ, "STARTUP_PROFILE": "1", "STARTUP_PROFILE_FILE": profile_path}
+        result = subprocess.run(
+            [sys.executable, CLIENT_SCRIPT, "--startup-only"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"client exited with {result.returncode}:\n{result.stderr}")
+        with open(profile_path) as f:
+            report = json.load(f)
+    finally:
+        os.unlink(profile_path)
+
+    # Wall time from exec to ready
+    report["wall"] = report["total"] + (report.get("interpreter_startup") or 0.0)
+    return report
+
+
+def summarize(reports: list) -> dict:
+    """Median / p90 (ms) for wall, total, each phase and each import."""
+    def stats(values):
+        values = sorted(values)
+        p90_index = min(len(values) - 1, int(round(0.9 * (len(values) - 1))))
+        return {"median_ms": statistics.median(values) * 1000, "p90_ms": values[p90_index] * 1000}
+
+    summary = {
+        "wall": stats([r["wall"] for r in reports]),
+        "total": stats([r["total"] for r in reports]),
+        "phases": {},
+        "imports": {}
+    }
+    for section in ("phases", "imports"):
+        names = {name for r in reports for name in r[section]}
+        for name in names:
+            summary[section][name] = stats([r[section].get(name, 0.0) for r in reports])
+    return summary
+
+
+def print_summary(summary: dict):
+    print(f"{'':<26}{'median':>10}{'p90':>10}")
+    print(f"{'wall (exec → ready)':<26}{summary['wall']['median_ms']:>8.0f}ms{summary['wall']['p90_ms']:>8.0f}ms")
+    for section in ("phases", "imports"):
+        rows = sorted(summary[section].items(), key=lambda item: -item[1]["median_ms"])
+        for name, values in rows:
+            if values["median_ms"] >= 1:
+                label = f"{section[:-1]} {name}"
+                print(f"{label:<26}{values['median_ms']:>8.0f}ms{values['p90_ms']:>8.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pi client startup benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a saved JSON file")
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    print(f"🏁 {args.runs} cold starts on {device_model()} (Python {platform.python_version()})")
+    reports = []
+    for i in range(args.runs):
+        reports.append(run_once())
+        print(f"   run {i + 1}: {reports[-1]['wall'] * 1000:.0f}ms")
+
+    summary = summarize(reports)
+    summary["device"] = device_model()
+    summary["python"] = platform.python_version()
+    summary["runs"] = args.runs
+    print()
+    print_summary(summary)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n💾 Saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        before = baseline["wall"]["median_ms"]
+        after = summary["wall"]["median_ms"]
+        change = (after - before) / before * 100
+        print(f"\n📊 Median wall: {before:.0f}ms → {after:.0f}ms ({change:+.1f}%)")
+        if change > args.threshold:
+            print(f"❌ Startup regression above {args.threshold:.0f}%")
+            sys.exit(1)
+        print("✅ Within threshold")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Call Lifecycle - event-driven call tracking for SecureVapiClient
+
+Replaces `while True: time.sleep(1)` with events pushed from the Daily
+call (see lifecycle_vapi.py):
+
+- call-started: joined the Daily room
+- first-audio: assistant audio became playable
+- call-ended: assistant left / call hung up
+- error: join failure or SDK exception
+
+Also records per-phase timings (auth, config, start, first_audio) and
+computes restart delays: immediate after a normal hangup, exponential
+backoff on repeated failures.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+CALL_STARTED = "call-started"
+FIRST_AUDIO = "first-audio"
+CALL_ENDED = "call-ended"
+ERROR = "error"
+
+
+@dataclass
+class CallEvent:
+    """One lifecycle event."""
+    type: str
+    data: dict = field(default_factory=dict)
+    at: float = field(default_factory=time.monotonic)
+
+
+class CallLifecycle:
+    """Event queue + callbacks + phase timings for calls made by one client."""
+
+    def __init__(self):
+        self.events: "queue.Queue[CallEvent]" = queue.Queue()
+        self.timings: Dict[str, float] = {}
+        self._callbacks: Dict[str, List[Callable[[CallEvent], None]]] = {}
+        self._call_requested_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def on(self, event_type: str, callback: Callable[[CallEvent], None]):
+        """Register a callback (runs on the emitting thread - keep it short)."""
+        self._callbacks.setdefault(event_type, []).append(callback)
+
+    def emit(self, event_type: str, **data):
+        """Publish an event (called from Daily's event threads)."""
+        event = CallEvent(event_type, data)
+
+        with self._lock:
+            if event_type == FIRST_AUDIO:
+                if "first_audio" in self.timings:
+                    return
+                if self._call_requested_at is not None:
+                    self.timings["first_audio"] = event.at - self._call_requested_at
+
+        self.events.put(event)
+        for callback in self._callbacks.get(event_type, []):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"⚠️  Lifecycle callback failed for {event_type}: {e}")
+
+    def new_call(self):
+        """Reset per-call state before starting the next call (auth/config timings are kept)."""
+        with self._lock:
+            self.events = queue.Queue()
+            for phase_name in ("start", "first_audio"):
+                self.timings.pop(phase_name, None)
+            self._call_requested_at = time.monotonic()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a startup phase: `with lifecycle.phase("auth"): ...`"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.monotonic() - started
+
+    def wait_for(self, *event_types: str, timeout: Optional[float] = None) -> Optional[CallEvent]:
+        """Block until one of event_types arrives (None on timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                event = self.events.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if event.type in event_types:
+                return event
+
+    def report_timings(self):
+        """Print phase timings collected so far."""
+        order = ("auth", "config", "start", "first_audio")
+        parts = [f"{name}={self.timings[name] * 1000:.0f}ms" for name in order if name in self.timings]
+        if parts:
+            print(f"⏱️  Timings: {', '.join(parts)}")
+
+
+class RestartBackoff:
+    """Restart delay: 0 after a normal hangup, exponential after consecutive failures."""
+
+    def __init__(self, base: float = 1.0, maximum: float = 60.0):
+        self.base = base
+        self.maximum = maximum
+        self.failures = 0
+
+    def next_delay(self, failed: bool) -> float:
+        if not failed:
+            self.failures = 0
+            return 0.0
+        self.failures += 1
+        return min(self.maximum, self.base * (2 ** (self.failures - 1)))
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Device Token Cache - persists JWT + VAPI config across process restarts
+
+The restart wrapper relaunches the client after every call. Without a cache
+each relaunch redoes /device/auth and /device/vapi-config even though the
+JWT is valid for 15 minutes.
+
+- Written atomically (temp file + rename) with 0600 permissions
+- Token reused until REFRESH_MARGIN_SECONDS before it expires
+- Background thread refreshes via /device/refresh while a call is running
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Refresh this long before the token expires
+REFRESH_MARGIN_SECONDS = 120
+
+
+class DeviceCache:
+    """On-device cache of the device JWT and VAPI config."""
+
+    def __init__(self, path: str, device_id: str, proxy_url: str):
+        self.path = path
+        self.device_id = device_id
+        self.proxy_url = proxy_url
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    def load(self) -> dict:
+        """Load cache; returns {} if missing, unreadable or for another device/proxy."""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if data.get("device_id") != self.device_id or data.get("proxy_url") != self.proxy_url:
+            return {}
+
+        return data
+
+    def save(self, data: dict):
+        """Atomically write the cache (readable by this user only)."""
+        data = {**data, "device_id": self.device_id, "proxy_url": self.proxy_url}
+        directory = os.path.dirname(os.path.abspath(self.path))
+
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".device_cache.")
+            try:
+                os.fchmod(fd, 0o600)
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except Exception:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+    def update(self, **fields):
+        """Merge fields into the cached data."""
+        self.save({**self.load(), **fields})
+
+    def clear(self):
+        """Remove the cache file."""
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def store_token(self, access_token: str, expires_in: int, **fields):
+        """Cache a freshly issued token (expiry from expires_in, so no JWT parsing needed)."""
+        self.update(
+            access_token=access_token,
+            expires_at=time.time() + expires_in,
+            **fields
+        )
+
+    @staticmethod
+    def token_fresh(data: dict) -> bool:
+        """Token usable without refreshing."""
+        return bool(data.get("access_token")) and data.get("expires_at", 0) - REFRESH_MARGIN_SECONDS > time.time()
+
+    @staticmethod
+    def token_alive(data: dict) -> bool:
+        """Token not yet expired (can still be used for /device/refresh)."""
+        return bool(data.get("access_token")) and data.get("expires_at", 0) > time.time() + 5
+
+    def refresh_token(self, client=None) -> dict:
+        """
+        Exchange the cached token for a new one via /device/refresh.
+
+        Returns:
+            Updated cache data ({} if the token was rejected)
+        """
+        data = self.load()
+        if not self.token_alive(data):
+            return {}
+
+        if client is None:
+            import httpx
+            client = httpx
+        response = client.post(
+            f"{self.proxy_url}/device/refresh",
+            headers={"Authorization": f"Bearer {data['access_token']}"},
+            timeout=30
+        )
+        if response.status_code == 401:
+            # Revoked or signing key gone - force full auth next time
+            self.update(access_token=None, expires_at=0)
+            return {}
+        response.raise_for_status()
+        refreshed = response.json()
+
+        self.store_token(refreshed["access_token"], refreshed["expires_in"])
+        return self.load()
+
+    def start_background_refresh(self, get_client=None):
+        """
+        Keep the cached token fresh while this process is alive (daemon thread).
+
+        get_client: optional callable returning the HTTP client to use; only
+        called when a refresh is actually due.
+        """
+        if self._refresh_thread is not None:
+            return
+
+        def refresh_loop():
+            while True:
+                data = self.load()
+                if not self.token_alive(data):
+                    return
+                wait = data["expires_at"] - REFRESH_MARGIN_SECONDS - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                    continue
+                try:
+                    client = get_client() if get_client else None
+                    if not self.refresh_token(client=client):
+                        return
+                    print("🔄 Device token refreshed in background")
+                except Exception as e:
+                    print(f"⚠️  Background token refresh failed: {e}")
+                    time.sleep(30)
+
+        self._refresh_thread = threading.Thread(target=refresh_loop, name="token-refresh", daemon=True)
+        self._refresh_thread.start()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Lifecycle-aware Vapi SDK wrapper
+
+vapi_python's Vapi.start() returns nothing and never reports when the
+call ends. These subclasses feed Daily's callbacks into a CallLifecycle.
+"""
+
+from vapi_python import Vapi
+from vapi_python.vapi_python import create_web_call
+from vapi_python.daily_call import DailyCall, is_playable_speaker
+
+from call_lifecycle import CallLifecycle, CALL_STARTED, FIRST_AUDIO, CALL_ENDED, ERROR
+
+
+class LifecycleDailyCall(DailyCall):
+    """DailyCall that emits lifecycle events."""
+
+    def __init__(self, lifecycle: CallLifecycle):
+        self._lifecycle = lifecycle
+        self._ended = False
+        self._left = False
+        super().__init__()
+
+    def leave(self):
+        # Called by the base class on participant-left and again by stop()
+        if self._left:
+            return
+        self._left = True
+        super().leave()
+
+    def on_joined(self, data, error):
+        super().on_joined(data, error)
+        if error:
+            self._lifecycle.emit(ERROR, error=str(error))
+        else:
+            self._lifecycle.emit(CALL_STARTED)
+
+    def on_participant_updated(self, participant):
+        super().on_participant_updated(participant)
+        if is_playable_speaker(participant):
+            self._lifecycle.emit(FIRST_AUDIO)
+
+    def on_participant_left(self, participant, reason):
+        # Base class leaves the call (joins audio threads) - report first
+        self._emit_ended(reason=str(reason))
+        super().on_participant_left(participant, reason)
+
+    def on_call_state_updated(self, state):
+        if state == "left":
+            self._emit_ended(reason="left")
+
+    def _emit_ended(self, reason: str):
+        if not self._ended:
+            self._ended = True
+            self._lifecycle.emit(CALL_ENDED, reason=reason)
+
+
+class LifecycleVapi(Vapi):
+    """Vapi client whose calls report lifecycle events; start() returns the call id."""
+
+    def __init__(self, *, api_key, lifecycle: CallLifecycle, api_url="https://api.vapi.ai"):
+        super().__init__(api_key=api_key, api_url=api_url)
+        self.lifecycle = lifecycle
+        self.call_id = None
+        self._call = None
+
+    def start(self, *, assistant_id=None, assistant=None, assistant_overrides=None):
+        if assistant_id:
+            payload = {'assistantId': assistant_id, 'assistantOverrides': assistant_overrides}
+        else:
+            payload = {'assistant': assistant, 'assistantOverrides': assistant_overrides}
+
+        self.lifecycle.new_call()
+        with self.lifecycle.phase("start"):
+            call_id, web_call_url = create_web_call(self.api_url, self.api_key, payload)
+            if not web_call_url:
+                raise Exception("Error: Unable to create call.")
+
+            self.call_id = call_id
+            self._call = LifecycleDailyCall(self.lifecycle)
+            self._call.join(web_call_url)
+
+        return call_id
+
+    def stop(self):
+        if self._call is not None:
+            call, self._call = self._call, None
+            call.leave()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Proxy Client - single-round-trip device bootstrap over a keep-alive connection
+
+- One persistent httpx.Client per process (TLS handshake paid once)
+- POST /device/bootstrap returns token + customer info + VAPI config
+- Cached config is revalidated by ETag (server omits it / answers 304 if unchanged)
+- Falls back to /device/auth + /device/vapi-config on older servers
+"""
+
+from typing import Optional, Tuple
+
+import httpx
+
+
+def create_http_client(proxy_url: str) -> httpx.Client:
+    """Persistent keep-alive client for all proxy requests."""
+    return httpx.Client(
+        base_url=proxy_url,
+        timeout=30,
+        limits=httpx.Limits(max_keepalive_connections=2, keepalive_expiry=300)
+    )
+
+
+def bootstrap(http: httpx.Client, device_id: str, device_secret: str,
+              config_etag: Optional[str] = None) -> dict:
+    """
+    Authenticate and fetch VAPI config in one request.
+
+    Returns:
+        {access_token, expires_in, customer_id, config_etag, vapi_config}
+        vapi_config is None when config_etag is still current.
+    """
+    response = http.post(
+        "/device/bootstrap",
+        json={
+            "device_id": device_id,
+            "device_secret": device_secret,
+            "config_etag": config_etag
+        }
+    )
+
+    if response.status_code == 404:
+        # Proxy predates /device/bootstrap
+        return _bootstrap_legacy(http, device_id, device_secret)
+
+    response.raise_for_status()
+    data = response.json()
+
+    return {
+        "access_token": data["access_token"],
+        "expires_in": data.get("expires_in", 900),
+        "customer_id": data.get("customer_id"),
+        "config_etag": data.get("config_etag"),
+        "vapi_config": data.get("vapi_config")
+    }
+
+
+def fetch_vapi_config(http: httpx.Client, access_token: str,
+                      config_etag: Optional[str] = None) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Conditional GET of /device/vapi-config.
+
+    Returns:
+        (config, etag) - config is None on 304 Not Modified
+    """
+    headers = {"Authorization": f"Bearer {access_token}"}
+    if config_etag:
+        headers["If-None-Match"] = config_etag
+
+    response = http.get("/device/vapi-config", headers=headers)
+    if response.status_code == 304:
+        return None, config_etag
+
+    response.raise_for_status()
+    return response.json(), response.headers.get("ETag")
+
+
+def _bootstrap_legacy(http: httpx.Client, device_id: str, device_secret: str) -> dict:
+    response = http.post(
+        "/device/auth",
+        json={
+            "device_id": device_id,
+            "device_secret": device_secret
+        }
+    )
+    response.raise_for_status()
+    auth_data = response.json()
+
+    vapi_config, etag = fetch_vapi_config(http, auth_data["access_token"])
+
+    return {
+        "access_token": auth_data["access_token"],
+        "expires_in": auth_data.get("expires_in", 900),
+        "customer_id": auth_data.get("customer_id"),
+        "config_etag": etag,
+        "vapi_config": vapi_config
+    }
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Startup Profiler - per-import and per-phase timings for Pi client cold starts
+
+Every call pays a full Python start under the restart wrapper, so startup
+time matters. Enable with:
+
+    STARTUP_PROFILE=1 python3 src/vapi_client_sdk_restart.py --startup-only
+
+- Times top-level imports made while the hook is installed
+- Times named phases (env, config_file, auth, sdk_import, ...)
+- Report goes to stderr; STARTUP_PROFILE_FILE=path also writes it as JSON
+  (see bench_startup.py)
+
+Stdlib only, so importing this module costs next to nothing.
+"""
+
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+ENABLED = os.getenv("STARTUP_PROFILE", "0") == "1"
+PROFILE_FILE = os.getenv("STARTUP_PROFILE_FILE")
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process was exec'd (Linux only) - covers interpreter startup."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfiler:
+    """Collects import and phase timings; a no-op unless enabled."""
+
+    def __init__(self, enabled: bool = ENABLED):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.interpreter_startup = _process_age() if enabled else None
+        self.imports: Dict[str, float] = {}
+        self.phases: Dict[str, float] = {}
+        self._local = threading.local()
+        self._original_import = None
+
+    def install_import_hook(self):
+        """
+        Time outermost third-party/stdlib imports.
+
+        Nested imports count towards their importer; our own modules in src/
+        are transparent, so e.g. vapi_python shows up instead of lifecycle_vapi.
+        """
+        if not self.enabled or self._original_import is not None:
+            return
+
+        original_import = builtins.__import__
+        self._original_import = original_import
+        local = self._local
+        imports = self.imports
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or getattr(local, "depth", 0) or name in sys.modules:
+                return original_import(name, globals, locals, fromlist, level)
+            if os.path.exists(os.path.join(SCRIPT_DIR, f"{name}.py")):
+                return original_import(name, globals, locals, fromlist, level)
+
+            local.depth = 1
+            started = time.perf_counter()
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                local.depth = 0
+                top_level = name.partition(".")[0]
+                imports[top_level] = imports.get(top_level, 0.0) + time.perf_counter() - started
+
+        builtins.__import__ = timed_import
+
+    def uninstall_import_hook(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a startup phase: `with profiler.phase("env"): ...`"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def report(self, label: str = "ready"):
+        """Print the report (and write STARTUP_PROFILE_FILE if set)."""
+        if not self.enabled:
+            return
+
+        self.uninstall_import_hook()
+        total = time.perf_counter() - self.started
+
+        result = {
+            "label": label,
+            "interpreter_startup": self.interpreter_startup,
+            "total": total,
+            "phases": self.phases,
+            "imports": self.imports
+        }
+
+        lines = [f"⏱️  Startup profile ({label}): {total * 1000:.0f}ms after profiler import"]
+        if self.interpreter_startup is not None:
+            lines.append(f"   interpreter startup  {self.interpreter_startup * 1000:8.1f}ms")
+        for name, seconds in self.phases.items():
+            lines.append(f"   phase {name:<15}{seconds * 1000:8.1f}ms")
+        for name, seconds in sorted(self.imports.items(), key=lambda item: -item[1]):
+            if seconds >= 0.001:
+                lines.append(f"   import {name:<14}{seconds * 1000:8.1f}ms")
+        print("\n".join(lines), file=sys.stderr)
+
+        if PROFILE_FILE:
+            with open(PROFILE_FILE, "w") as f:
+                json.dump(result, f)
+
+
+profiler = StartupProfiler()
+profiler.install_import_hook()
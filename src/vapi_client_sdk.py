@@ -7,9 +7,11 @@ Fetches VAPI config from Railway server (no local secrets)
 import json
 import os
 import time
-import httpx
 from dotenv import load_dotenv
-from vapi_python import Vapi
+
+from call_lifecycle import CallLifecycle, RestartBackoff, CALL_ENDED, ERROR
+from lifecycle_vapi import LifecycleVapi
+from proxy_client import bootstrap, create_http_client
 
 load_dotenv()
 
@@ -33,6 +35,8 @@ class SecureVapiClient:
         self.api_key = None
         self.assistant_id = None
         self.vapi = None
+        self.lifecycle = CallLifecycle()
+        self.http = create_http_client(self.proxy_url)
 
     def _load_config(self, config_path: str) -> dict:
         """Load configuration from JSON file."""
@@ -43,30 +47,12 @@ class SecureVapiClient:
         """Fetch VAPI API key and assistant ID from Railway server."""
         print(f"🔑 Authenticating with proxy server...")
 
-        # Authenticate and get JWT token
-        response = httpx.post(
-            f"{self.proxy_url}/device/auth",
-            json={
-                "device_id": self.device_id,
-                "device_secret": self.device_secret
-            },
-            timeout=30
-        )
-        response.raise_for_status()
-        auth_data = response.json()
-
-        jwt_token = auth_data["access_token"]
-        print(f"✅ Authenticated! Customer: {auth_data.get('customer_id')}")
-
-        # Fetch VAPI config from server
-        print(f"📡 Fetching VAPI configuration from server...")
-        response = httpx.get(
-            f"{self.proxy_url}/device/vapi-config",
-            headers={"Authorization": f"Bearer {jwt_token}"},
-            timeout=30
-        )
-        response.raise_for_status()
-        vapi_config = response.json()
+        # Token + VAPI config in one request over the keep-alive connection
+        with self.lifecycle.phase("auth"):
+            data = bootstrap(self.http, self.device_id, self.device_secret)
+        vapi_config = data["vapi_config"]
+
+        print(f"✅ Authenticated! Customer: {data.get('customer_id')}")
 
         self.api_key = vapi_config["api_key"]
         self.assistant_id = vapi_config["assistant_id"]
@@ -75,7 +61,7 @@ class SecureVapiClient:
         print(f"   Assistant ID: {self.assistant_id}")
 
         # Initialize VAPI SDK
-        self.vapi = Vapi(api_key=self.api_key)
+        self.vapi = LifecycleVapi(api_key=self.api_key, lifecycle=self.lifecycle)
 
     def start_session(self):
         """Start voice session with serverUrl override - runs forever with auto-restart."""
@@ -91,6 +77,7 @@ class SecureVapiClient:
 
         # Build webhook URL
         webhook_url = f"{self.proxy_url}/webhook?device_id={self.device_id}"
+        backoff = RestartBackoff()
 
         try:
             while True:  # Run forever
@@ -99,7 +86,7 @@ class SecureVapiClient:
                     print(f"🔗 Webhook: {webhook_url}")
 
                     # Start call with serverUrl override
-                    call = self.vapi.start(
+                    call_id = self.vapi.start(
                         assistant_id=self.assistant_id,
                         assistant_overrides={
                             "serverUrl": webhook_url
@@ -107,7 +94,7 @@ class SecureVapiClient:
                     )
 
                     print("\n✅ Voice session started!")
-                    print(f"📱 Call ID: {call.id if hasattr(call, 'id') else 'N/A'}")
+                    print(f"📱 Call ID: {call_id or 'N/A'}")
 
                     print("\n" + "=" * 80)
                     print("🎤 VOICE SESSION ACTIVE - Start speaking!")
@@ -122,22 +109,31 @@ class SecureVapiClient:
                     print("🔴 Press Ctrl+C to stop the service")
                     print("=" * 80)
 
-                    # Keep session alive
-                    while True:
-                        time.sleep(1)
+                    # Block until Daily reports the call ended (or failed)
+                    event = self.lifecycle.wait_for(CALL_ENDED, ERROR)
+                    failed = event.type == ERROR
+                    if failed:
+                        print(f"\n⚠️  Call failed: {event.data.get('error')}")
+                    else:
+                        print(f"\n📴 Call ended ({event.data.get('reason', 'hangup')})")
 
                 except Exception as e:
-                    # Call ended or error - auto restart
-                    print(f"\n⚠️  Call ended or error: {e}")
-                    print(f"🔄 Auto-restarting in 3 seconds...")
+                    print(f"\n⚠️  Call error: {e}")
+                    failed = True
 
-                    try:
-                        self.vapi.stop()
-                    except:
-                        pass
-
-                    time.sleep(3)  # Wait before restart
-                    continue
+                try:
+                    self.vapi.stop()
+                except:
+                    pass
+                self.lifecycle.report_timings()
+
+                # Immediate restart after a hangup, exponential backoff on repeated failures
+                delay = backoff.next_delay(failed)
+                if delay:
+                    print(f"🔄 Auto-restarting in {delay:.0f} seconds...")
+                    time.sleep(delay)
+                else:
+                    print(f"🔄 Auto-restarting...")
 
         except KeyboardInterrupt:
             print("\n\n⏹️  Service stopped by user")
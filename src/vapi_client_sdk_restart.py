@@ -2,17 +2,61 @@
 """
 VAPI Client with SDK - Process Restart Version
 Restarts entire Python process between calls to avoid Daily Core context issues
+Token + VAPI config are cached on disk so a restart skips the auth round trips;
+a cold start is one /device/bootstrap request over a keep-alive connection
+
+Exit codes (read by vapi_runner.sh / vapi_supervisor.py):
+- 0: stopped by user, 1: fatal startup error
+- 2: call ended normally (restart immediately)
+- 3: call failed (restart with backoff)
+
+Standby mode (used by vapi_supervisor.py):
+    python3 vapi_client_sdk_restart.py --standby --ready-fd N
+Imports + authenticates, signals readiness on fd N, then waits for "start" on stdin.
+
+Startup profiling:
+    STARTUP_PROFILE=1 python3 vapi_client_sdk_restart.py --startup-only
+Reports per-import and per-phase times, then exits (see bench_startup.py).
 """
 
+import argparse
+import importlib
 import json
 import os
 import sys
-import time
-import httpx
-from dotenv import load_dotenv
-from vapi_python import Vapi
+import threading
+
+from startup_profile import profiler
+
+from call_lifecycle import CallLifecycle, CALL_ENDED, ERROR
+from device_cache import DeviceCache
+
+# Deferred imports (each restart pays for every module imported here):
+# - vapi_python (Daily, PyAudio): imported in a background thread during
+#   prepare(), overlapping the bootstrap request
+# - httpx (proxy_client): only when the cache can't serve token + config
+# - dotenv: only when there is a .env file to load
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-load_dotenv()
+
+def load_env():
+    """Load the nearest .env above this script (same lookup as load_dotenv())."""
+    directory = SCRIPT_DIR
+    while True:
+        env_path = os.path.join(directory, ".env")
+        if os.path.isfile(env_path):
+            from dotenv import load_dotenv
+            load_dotenv(env_path)
+            return
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return
+        directory = parent
+
+
+with profiler.phase("env"):
+    load_env()
 
 
 class SecureVapiClient:
@@ -20,7 +64,8 @@ class SecureVapiClient:
 
     def __init__(self, config_path: str = "config/device_config.json"):
         """Initialize VAPI client."""
-        self.config = self._load_config(config_path)
+        with profiler.phase("config_file"):
+            self.config = self._load_config(config_path)
 
         # Device credentials (only thing stored locally)
         self.device_id = os.getenv('DEVICE_ID', self.config.get('device_id'))
@@ -30,10 +75,39 @@ class SecureVapiClient:
         if not self.device_id or not self.device_secret:
             raise ValueError("device_id and device_secret required")
 
-        # VAPI config (fetched from server)
+        # VAPI config (fetched from server, cached across restarts)
         self.api_key = None
         self.assistant_id = None
         self.vapi = None
+        self.lifecycle = CallLifecycle()
+        self._http = None
+        self._http_lock = threading.Lock()
+        self._sdk_import = None
+        self._config_from_cache = False
+        self.cache = DeviceCache(
+            self.config.get('cache_path', 'config/.device_cache.json'),
+            self.device_id,
+            self.proxy_url
+        )
+
+    @property
+    def http(self):
+        """Keep-alive proxy client (httpx is imported on first use)."""
+        with self._http_lock:
+            if self._http is None:
+                from proxy_client import create_http_client
+                self._http = create_http_client(self.proxy_url)
+            return self._http
+
+    def _start_sdk_import(self):
+        """Import the Vapi/Daily SDK in the background while we talk to the proxy."""
+        self._sdk_import = threading.Thread(
+            target=importlib.import_module,
+            args=("lifecycle_vapi",),
+            name="sdk-import",
+            daemon=True
+        )
+        self._sdk_import.start()
 
     def _load_config(self, config_path: str) -> dict:
         """Load configuration from JSON file."""
@@ -41,45 +115,97 @@ class SecureVapiClient:
             return json.load(f)
 
     def _fetch_vapi_config(self):
-        """Fetch VAPI API key and assistant ID from Railway server."""
-        print(f"🔑 Authenticating with proxy server...")
-
-        # Authenticate and get JWT token
-        response = httpx.post(
-            f"{self.proxy_url}/device/auth",
-            json={
-                "device_id": self.device_id,
-                "device_secret": self.device_secret
-            },
-            timeout=30
-        )
-        response.raise_for_status()
-        auth_data = response.json()
-
-        jwt_token = auth_data["access_token"]
-        print(f"✅ Authenticated! Customer: {auth_data.get('customer_id')}")
-
-        # Fetch VAPI config from server
-        print(f"📡 Fetching VAPI configuration from server...")
-        response = httpx.get(
-            f"{self.proxy_url}/device/vapi-config",
-            headers={"Authorization": f"Bearer {jwt_token}"},
-            timeout=30
-        )
-        response.raise_for_status()
-        vapi_config = response.json()
+        """Load VAPI config from the cache, or bootstrap it from Railway server."""
+        self._start_sdk_import()
+
+        with self.lifecycle.phase("auth"), profiler.phase("auth"):
+            cached = self.cache.load()
+
+            if not self.cache.token_fresh(cached) and self.cache.token_alive(cached):
+                # Token about to expire - one /device/refresh instead of full auth
+                try:
+                    cached = self.cache.refresh_token(client=self.http)
+                except Exception as e:
+                    print(f"⚠️  Token refresh failed: {e}")
+                    cached = {}
+
+        if self.cache.token_fresh(cached) and cached.get("vapi_config"):
+            print(f"⚡ Using cached token and VAPI config")
+            vapi_config = cached["vapi_config"]
+            # Revalidated once the call is up (see run_call)
+            self._config_from_cache = True
+        else:
+            vapi_config = self._bootstrap(cached)
 
         self.api_key = vapi_config["api_key"]
         self.assistant_id = vapi_config["assistant_id"]
 
-        print(f"✅ VAPI config received!")
+        print(f"✅ VAPI config ready!")
         print(f"   Assistant ID: {self.assistant_id}")
 
-        # Initialize VAPI SDK
-        self.vapi = Vapi(api_key=self.api_key)
+        # Keep the cached token fresh for the next restart
+        self.cache.start_background_refresh(get_client=lambda: self.http)
 
-    def start_single_session(self):
-        """Start a single voice session (no restart loop - handled by wrapper script)."""
+        # Initialize VAPI SDK (import started in the background above)
+        with profiler.phase("sdk_import"):
+            self._sdk_import.join()
+            from lifecycle_vapi import LifecycleVapi
+        with profiler.phase("sdk_init"):
+            self.vapi = LifecycleVapi(api_key=self.api_key, lifecycle=self.lifecycle)
+
+    def _bootstrap(self, cached: dict) -> dict:
+        """Authenticate + fetch VAPI config in one request (config omitted if our ETag is current)."""
+        print(f"🔑 Bootstrapping with proxy server...")
+        from proxy_client import bootstrap
+
+        # Token + config arrive together, so this covers both phases
+        with self.lifecycle.phase("auth"):
+            data = bootstrap(
+                self.http,
+                self.device_id,
+                self.device_secret,
+                config_etag=cached.get("config_etag") if cached.get("vapi_config") else None
+            )
+
+        print(f"✅ Authenticated! Customer: {data.get('customer_id')}")
+
+        vapi_config = data["vapi_config"]
+        if vapi_config is None:
+            print(f"📡 VAPI config unchanged (cached)")
+            vapi_config = cached["vapi_config"]
+        else:
+            print(f"📡 VAPI config received!")
+
+        try:
+            self.cache.store_token(
+                data["access_token"],
+                data["expires_in"],
+                customer_id=data.get("customer_id"),
+                vapi_config=vapi_config,
+                config_etag=data.get("config_etag")
+            )
+        except OSError as e:
+            print(f"⚠️  Could not write device cache: {e}")
+
+        return vapi_config
+
+    def _revalidate_config(self):
+        """Background: conditional GET of the cached config (304 if unchanged)."""
+        from proxy_client import fetch_vapi_config
+
+        cached = self.cache.load()
+        try:
+            vapi_config, etag = fetch_vapi_config(self.http, cached["access_token"], cached.get("config_etag"))
+        except Exception as e:
+            print(f"⚠️  Config revalidation failed: {e}")
+            return
+
+        if vapi_config is not None:
+            print(f"📡 VAPI config changed on server - will apply on next restart")
+            self.cache.update(vapi_config=vapi_config, config_etag=etag)
+
+    def prepare(self):
+        """Fetch VAPI config and initialize the SDK (everything before the call)."""
         print("=" * 80)
         print("🔊 VAPI Voice Assistant - Process Restart Mode")
         print("=" * 80)
@@ -88,7 +214,15 @@ class SecureVapiClient:
 
         # Fetch VAPI config
         self._fetch_vapi_config()
+        profiler.report("ready")
 
+    def start_single_session(self):
+        """Start a single voice session (no restart loop - handled by wrapper script)."""
+        self.prepare()
+        self.run_call()
+
+    def run_call(self):
+        """Run one call until it ends; exits with 2 (hangup) or 3 (error) so the wrapper restarts us."""
         # Build webhook URL
         webhook_url = f"{self.proxy_url}/webhook?device_id={self.device_id}"
 
@@ -97,15 +231,19 @@ class SecureVapiClient:
 
         try:
             # Start call with serverUrl override
-            call = self.vapi.start(
+            call_id = self.vapi.start(
                 assistant_id=self.assistant_id,
                 assistant_overrides={
                     "serverUrl": webhook_url
                 }
             )
 
+            if self._config_from_cache:
+                # Pick up config changes for the next restart without delaying this one
+                threading.Thread(target=self._revalidate_config, name="config-revalidate", daemon=True).start()
+
             print("\n✅ Voice session started!")
-            print(f"📱 Call ID: {call.id if hasattr(call, 'id') else 'N/A'}")
+            print(f"📱 Call ID: {call_id or 'N/A'}")
 
             print("\n" + "=" * 80)
             print("🎤 VOICE SESSION ACTIVE - Start speaking!")
@@ -120,9 +258,8 @@ class SecureVapiClient:
             print("🔴 Press Ctrl+C to stop the service")
             print("=" * 80)
 
-            # Keep session alive
-            while True:
-                time.sleep(1)
+            # Block until Daily reports the call ended (or failed)
+            event = self.lifecycle.wait_for(CALL_ENDED, ERROR)
 
         except KeyboardInterrupt:
             print("\n\n⏹️  Service stopped by user")
@@ -133,24 +270,74 @@ class SecureVapiClient:
                 pass
             sys.exit(0)
         except Exception as e:
-            print(f"\n⚠️  Call ended or error: {e}")
+            print(f"\n⚠️  Call error: {e}")
             try:
                 self.vapi.stop()
             except:
                 pass
-            # Exit with code 2 to signal restart needed
-            sys.exit(2)
+            self.lifecycle.report_timings()
+            sys.exit(3)
+
+        try:
+            self.vapi.stop()
+        except:
+            pass
+        self.lifecycle.report_timings()
+
+        if event.type == ERROR:
+            print(f"\n⚠️  Call failed: {event.data.get('error')}")
+            sys.exit(3)
+
+        print(f"\n📴 Call ended ({event.data.get('reason', 'hangup')})")
+        # Exit with code 2 to signal restart needed
+        sys.exit(2)
+
+
+def wait_for_promotion(ready_fd: int):
+    """Standby: tell the supervisor we're warm, then block until promoted."""
+    try:
+        os.write(ready_fd, b"ready\n")
+        os.close(ready_fd)
+    except BrokenPipeError:
+        # Supervisor already gone
+        sys.exit(0)
+    print("💤 Standby worker ready - waiting for promotion")
+
+    try:
+        command = sys.stdin.readline().strip()
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+    if command != "start":
+        # Supervisor went away or asked us to quit
+        sys.exit(0)
 
 
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="VAPI client (process restart mode)")
+    parser.add_argument("--standby", action="store_true", help="prepare, then wait for 'start' on stdin")
+    parser.add_argument("--ready-fd", type=int, help="fd to signal readiness on (standby mode)")
+    parser.add_argument("--startup-only", action="store_true", help="prepare, report startup profile and exit")
+    args = parser.parse_args()
+
     try:
         client = SecureVapiClient()
-        client.start_single_session()
+        client.prepare()
+    except KeyboardInterrupt:
+        sys.exit(0)
     except Exception as e:
         print(f"❌ Failed to start: {e}")
         sys.exit(1)
 
+    if args.startup_only:
+        sys.exit(0)
+
+    if args.standby:
+        wait_for_promotion(args.ready_fd)
+
+    client.run_call()
+
 
 if __name__ == "__main__":
     main()
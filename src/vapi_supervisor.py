@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+VAPI Client Supervisor - pre-warmed standby worker
+
+Keeps the process-per-call isolation of vapi_runner.sh (Daily Core context
+issues) without paying a full Python cold start between calls:
+
+- Active worker runs the current call
+- Standby worker is already imported + authenticated, waiting on stdin
+- When the active call ends, the standby is promoted immediately and a
+  new standby is spawned in the background
+
+Worker exit codes (same as vapi_client_sdk_restart.py):
+- 0: clean shutdown (Ctrl+C) → stop the service
+- 1: fatal error → stop the service
+- 2: call ended → promote standby immediately
+- 3: call failed → promote standby after exponential backoff
+"""
+
+import os
+import select
+import subprocess
+import sys
+import time
+
+from call_lifecycle import RestartBackoff
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_SCRIPT = os.path.join(SCRIPT_DIR, "vapi_client_sdk_restart.py")
+
+# How long a standby may take to import + authenticate
+STANDBY_READY_TIMEOUT = 60
+# Delay before respawning a standby that died before becoming ready
+STANDBY_RETRY_DELAY = 3
+
+
+class Worker:
+    """One client process, started in standby mode."""
+
+    def __init__(self):
+        ready_r, ready_w = os.pipe()
+        self.ready_fd = ready_r
+        self.ready = False
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT, "--standby", "--ready-fd", str(ready_w)],
+            stdin=subprocess.PIPE,
+            pass_fds=(ready_w,)
+        )
+        os.close(ready_w)
+        self.started_at = time.monotonic()
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Block until the worker reports ready (False if it died or timed out)."""
+        if self.ready:
+            return True
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            readable, _, _ = select.select([self.ready_fd], [], [], max(0.0, deadline - time.monotonic()))
+            if not readable:
+                break
+            data = os.read(self.ready_fd, 64)
+            if data.startswith(b"ready"):
+                self.ready = True
+                print(f"💤 Standby worker {self.process.pid} warm in {time.monotonic() - self.started_at:.1f}s")
+                return True
+            if not data:
+                # EOF: worker exited before becoming ready
+                return False
+        return False
+
+    def _close_ready_fd(self):
+        if self.ready_fd is not None:
+            os.close(self.ready_fd)
+            self.ready_fd = None
+
+    def promote(self) -> bool:
+        """Tell the standby to start its call (False if it already died)."""
+        self._close_ready_fd()
+        try:
+            self.process.stdin.write(b"start\n")
+            self.process.stdin.flush()
+            self.process.stdin.close()
+        except (BrokenPipeError, ValueError):
+            return False
+        return True
+
+    def stop(self):
+        """Shut down the worker (standby exits cleanly on stdin EOF)."""
+        self._close_ready_fd()
+        if self.process.poll() is not None:
+            return
+        try:
+            self.process.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def spawn_ready_worker() -> Worker:
+    """Spawn workers until one becomes ready (exits the supervisor on a fatal error)."""
+    while True:
+        worker = Worker()
+        if worker.wait_ready(STANDBY_READY_TIMEOUT):
+            return worker
+
+        worker.stop()
+        if worker.process.returncode in (0, 1):
+            print("❌ Worker failed during startup - stopping service")
+            sys.exit(worker.process.returncode)
+
+        print(f"⚠️  Standby worker not ready - retrying in {STANDBY_RETRY_DELAY} seconds...")
+        time.sleep(STANDBY_RETRY_DELAY)
+
+
+def promote_ready_worker(worker: Worker) -> Worker:
+    """Promote a ready worker, replacing it if it died while waiting."""
+    while not worker.promote():
+        worker.stop()
+        worker = spawn_ready_worker()
+    return worker
+
+
+def main():
+    """Run calls back-to-back, always with a warm standby behind the active call."""
+    print("♾️  Supervisor mode: warm standby worker between calls")
+    print("🔴 Press Ctrl+C to stop the service")
+
+    active = promote_ready_worker(spawn_ready_worker())
+    standby = Worker()
+    backoff = RestartBackoff()
+
+    try:
+        while True:
+            exit_code = active.process.wait()
+            call_ended_at = time.monotonic()
+
+            if exit_code == 0:
+                print("\n✅ Clean shutdown")
+                standby.stop()
+                sys.exit(0)
+            if exit_code == 1:
+                print("\n❌ Fatal error - stopping service")
+                standby.stop()
+                sys.exit(1)
+            delay = backoff.next_delay(failed=exit_code != 2)
+            if delay:
+                print(f"\n⚠️  Call failed (exit code {exit_code}) - promoting standby in {delay:.0f} seconds...")
+                time.sleep(delay)
+
+            if not standby.wait_ready(STANDBY_READY_TIMEOUT):
+                standby.stop()
+                standby = spawn_ready_worker()
+
+            active = promote_ready_worker(standby)
+            print(f"🔄 Call ended - standby promoted in {(time.monotonic() - call_ended_at) * 1000:.0f}ms")
+            standby = Worker()
+
+    except KeyboardInterrupt:
+        # Ctrl+C reaches the whole process group; workers exit on their own
+        print("\n\n⏹️  Service stopped by user")
+        for worker in (active, standby):
+            worker.stop()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
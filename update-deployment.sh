@@ -38,12 +38,15 @@ docker-compose down
 docker-compose build
 docker-compose up -d
 
-# Wait for health check
+# Wait for readiness (warm-up finished)
 echo -e "${YELLOW}Waiting for services to start...${NC}"
-sleep 10
+for i in $(seq 1 30); do
+    curl -sf http://localhost:8001/ready > /dev/null 2>&1 && break
+    sleep 2
+done
 
-# Check health
-if curl -f http://localhost:8001/health > /dev/null 2>&1; then
+# Check readiness
+if curl -f http://localhost:8001/ready > /dev/null 2>&1; then
     echo -e "${GREEN}✓ Deployment updated successfully!${NC}"
     docker-compose ps
 else
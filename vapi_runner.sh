@@ -2,11 +2,19 @@
 ################################################################################
 # VAPI Client Auto-Restart Wrapper
 # Restarts Python process between calls to avoid Daily Core context issues
+#
+# VAPI_SUPERVISOR=1 ./vapi_runner.sh
+#   Keeps a pre-warmed standby process (imported + authenticated) ready while
+#   the current call runs, so the gap between calls is well under a second.
 ################################################################################
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 PYTHON_SCRIPT="$SCRIPT_DIR/src/vapi_client_sdk_restart.py"
 
+if [ "${VAPI_SUPERVISOR:-0}" = "1" ]; then
+    exec python3 "$SCRIPT_DIR/src/vapi_supervisor.py"
+fi
+
 echo "╔════════════════════════════════════════════════════════════════════════════╗"
 echo "║          VAPI Voice Assistant - Continuous Service (Process Restart)       ║"
 echo "╚════════════════════════════════════════════════════════════════════════════╝"
@@ -18,6 +26,10 @@ echo ""
 # Trap Ctrl+C to exit cleanly
 trap 'echo -e "\n\n⏹️  Service stopped by user"; exit 0' INT
 
+# Consecutive failed calls (exponential backoff: 1, 2, 4 ... 60 seconds)
+FAILURES=0
+MAX_BACKOFF=60
+
 while true; do
     echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
     echo "🚀 Starting new Python process..."
@@ -39,16 +51,21 @@ while true; do
         echo "❌ Fatal error - stopping service"
         exit 1
     elif [ $EXIT_CODE -eq 2 ]; then
-        # Call ended - restart
+        # Call ended normally - restart immediately
+        FAILURES=0
         echo ""
-        echo "🔄 Call ended - restarting in 3 seconds..."
-        sleep 3
+        echo "🔄 Call ended - restarting..."
         continue
     else
-        # Unknown error - wait and retry
+        # Call failed (3) or unknown error - back off exponentially
+        FAILURES=$((FAILURES + 1))
+        DELAY=$((1 << (FAILURES - 1)))
+        if [ $DELAY -gt $MAX_BACKOFF ] || [ $FAILURES -gt 7 ]; then
+            DELAY=$MAX_BACKOFF
+        fi
         echo ""
-        echo "⚠️  Unexpected exit code: $EXIT_CODE - restarting in 3 seconds..."
-        sleep 3
+        echo "⚠️  Call failed (exit code $EXIT_CODE, failure #$FAILURES) - restarting in $DELAY seconds..."
+        sleep $DELAY
         continue
     fi
 done
@@ -0,0 +1,103 @@
+"""
+Benchmark: typed webhook parsing vs dict walking
+
+Compares, per webhook body (bytes as received):
+
+- dict: json.loads + the .get() chains the handlers used before
+  webhook_models.py (including re-parsing string arguments)
+- typed: parse_webhook() - one pydantic-core pass from bytes to models
+
+Usage:
+    python bench_webhook_parsing.py [--number 20000] [--conversation 40]
+"""
+
+from typing import Any, Dict, Tuple
+import argparse
+import json
+import timeit
+
+from webhook_models import ConversationUpdateMessage, ToolCallsMessage, parse_webhook
+
+
+def sample_bodies(conversation_length: int) -> Dict[str, bytes]:
+    call = {"id": "call_0001", "assistantId": "asst_1"}
+    conversation = [
+        {"role": "user" if i % 2 else "assistant", "content": f"utterance number {i} of the call"}
+        for i in range(conversation_length)
+    ]
+    bodies = {
+        "tool-calls": {
+            "message": {
+                "type": "tool-calls",
+                "toolCalls": [{
+                    "id": "toolcall_1",
+                    "type": "function",
+                    "function": {
+                        "name": "control_air_circulator",
+                        "arguments": json.dumps({"device": "speed", "action": "medium"})
+                    }
+                }],
+                "call": call
+            },
+            "call": call
+        },
+        "status-update": {"message": {"type": "status-update", "status": "in-progress"}, "call": call},
+        f"conversation-update ({conversation_length} msgs)": {
+            "message": {"type": "conversation-update", "conversation": conversation},
+            "call": call
+        }
+    }
+    return {name: json.dumps(body).encode() for name, body in bodies.items()}
+
+
+def dict_walk(raw: bytes) -> Tuple[Any, ...]:
+    """What the handlers did before: json.loads, then .get() chains per branch."""
+    body = json.loads(raw)
+    message = body.get("message", {})
+    message_type = message.get("type", "")
+    call_id = (body.get("call") or message.get("call") or {}).get("id")
+
+    if message_type in ["function-call", "tool-calls"]:
+        function_call = message.get("functionCall", {})
+        tool_call_id = None
+        if not function_call and message.get("toolCalls"):
+            first_tool_call = message.get("toolCalls", [])[0]
+            function_call = first_tool_call.get("function", {})
+            tool_call_id = first_tool_call.get("id")
+        parameters = function_call.get("parameters", {}) or function_call.get("arguments", {})
+        if isinstance(parameters, str):
+            parameters = json.loads(parameters)
+        return call_id, tool_call_id, parameters.get("device", ""), parameters.get("action", "")
+    if message_type == "conversation-update":
+        return call_id, len(message.get("conversation", []))
+    return call_id, message.get("status", "")
+
+
+def typed(raw: bytes) -> Tuple[Any, ...]:
+    event = parse_webhook(raw)
+    message = event.message
+    if isinstance(message, ToolCallsMessage):
+        tool_call = message.first_call()
+        arguments = tool_call.function.arguments
+        return event.call_id, tool_call.id, arguments.device, arguments.action
+    if isinstance(message, ConversationUpdateMessage):
+        return event.call_id, len(message.conversation)
+    return event.call_id, getattr(message, "status", "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Typed webhook parsing vs dict walking")
+    parser.add_argument("--number", type=int, default=20000, help="iterations per payload")
+    parser.add_argument("--conversation", type=int, default=40, help="messages in the conversation-update")
+    args = parser.parse_args()
+
+    print(f"{'payload':<32} {'bytes':>7} {'dict µs':>9} {'typed µs':>9} {'ratio':>7}")
+    for name, raw in sample_bodies(args.conversation).items():
+        assert dict_walk(raw) == typed(raw), name
+        dict_us = min(timeit.repeat(lambda: dict_walk(raw), number=args.number, repeat=3)) / args.number * 1e6
+        typed_us = min(timeit.repeat(lambda: typed(raw), number=args.number, repeat=3)) / args.number * 1e6
+        print(f"{name:<32} {len(raw):>7} {dict_us:>9.2f} {typed_us:>9.2f} {typed_us / dict_us:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
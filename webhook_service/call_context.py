@@ -0,0 +1,113 @@
+"""
+Per-Call Routing Context (keyed by call.id)
+
+A single VAPI call sends dozens of webhook events. The first event of a call
+resolves the route (device → customer → HA) and the auth decision; the result
+is kept in a CallContext so the following events of that call reuse it:
+
+- Reused only when the event carries the same routing identity (device_id,
+  x-customer-id, Authorization) - a different caller presenting the same
+  call.id is resolved from scratch
+- Reused only while the routing table snapshot is unchanged - a device
+  revoked or re-homed mid-call takes effect on its next event
+- Per-call counters: events by type, tool calls
+- Released on end-of-call-report; calls idle for CALL_CONTEXT_IDLE_SECONDS
+  and the least recently used beyond CALL_CONTEXT_MAX_CALLS are evicted
+"""
+
+from typing import Any, Dict, Optional, Tuple
+from collections import Counter, OrderedDict
+import os
+import time
+
+from routing import CompiledRoutes, Route, ROUTING_TABLE
+
+CALL_CONTEXT_IDLE_SECONDS = float(os.getenv("CALL_CONTEXT_IDLE_SECONDS", 1800))
+CALL_CONTEXT_MAX_CALLS = int(os.getenv("CALL_CONTEXT_MAX_CALLS", 10000))
+
+# (device_id, x-customer-id, Authorization) of the request
+RoutingIdentity = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+class CallContext:
+    """Resolved routing + auth decision and counters of one call."""
+
+    __slots__ = ("call_id", "identity", "routes", "route", "device_id", "auth",
+                 "started_at", "last_seen", "events", "tool_calls")
+
+    def __init__(self, call_id: str, identity: RoutingIdentity, routes: CompiledRoutes,
+                 route: Route, device_id: Optional[str], auth: str):
+        self.call_id = call_id
+        self.identity = identity
+        self.routes = routes
+        self.route = route
+        self.device_id = device_id
+        self.auth = auth  # "device", "vapi", "sid" or "default"
+        self.started_at = time.time()
+        self.last_seen = time.monotonic()
+        self.events: Counter = Counter()
+        self.tool_calls = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "customer_id": self.route.customer_id,
+            "auth": self.auth,
+            "events": dict(self.events),
+            "tool_calls": self.tool_calls,
+            "duration_seconds": round(time.time() - self.started_at, 1)
+        }
+
+
+class CallContextCache:
+    """call.id → CallContext (LRU + idle bounded)."""
+
+    def __init__(self, max_calls: int = CALL_CONTEXT_MAX_CALLS):
+        self.max_calls = max_calls
+        self._calls: "OrderedDict[str, CallContext]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def get(self, call_id: str, identity: RoutingIdentity) -> Optional[CallContext]:
+        """The call's context if it is still valid for this request, else None."""
+        context = self._calls.get(call_id)
+        if (context is None or context.identity != identity
+                or context.routes is not ROUTING_TABLE.current()):
+            self.misses += 1
+            return None
+        context.last_seen = time.monotonic()
+        self._calls.move_to_end(call_id)
+        self.hits += 1
+        return context
+
+    def start(self, call_id: str, identity: RoutingIdentity, route: Route,
+              device_id: Optional[str], auth: str) -> CallContext:
+        context = CallContext(call_id, identity, ROUTING_TABLE.current(), route, device_id, auth)
+        self._calls[call_id] = context
+        self._calls.move_to_end(call_id)
+        self._evict()
+        return context
+
+    def end(self, call_id: str) -> Optional[CallContext]:
+        """Release a finished call's context."""
+        return self._calls.pop(call_id, None)
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - CALL_CONTEXT_IDLE_SECONDS
+        while self._calls:
+            call_id, context = next(iter(self._calls.items()))
+            if len(self._calls) <= self.max_calls and context.last_seen >= cutoff:
+                break
+            del self._calls[call_id]
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": len(self._calls),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted
+        }
+
+
+CALL_CONTEXTS = CallContextCache()
@@ -0,0 +1,272 @@
+"""
+Append-only Call Event Journal
+
+Call history (transcripts, conversation updates, end-of-call reports) for
+debugging and billing, kept off the webhook's request path:
+
+- record() only enqueues (bounded queue; events are dropped and counted when
+  the writer falls behind) - webhook latency never waits on the disk
+- A writer task batches events and appends each batch as one gzip member to
+  the active segment file (seg-00000001.jsonl.gz), in a worker thread
+- Segments rotate at CALL_JOURNAL_SEGMENT_BYTES; the oldest are deleted past
+  CALL_JOURNAL_MAX_SEGMENTS
+- Each batch gets a line in the segment's .idx sidecar (offset, length,
+  call ids → customer ids), so the in-memory index by call.id and customer_id
+  is rebuilt on startup without decompressing anything
+- Reads mmap the segment and decompress only the members holding the call
+
+Disabled unless CALL_JOURNAL_DIR is set.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import gzip
+import json
+import mmap
+import os
+import re
+import threading
+import time
+
+CALL_JOURNAL_DIR = os.getenv("CALL_JOURNAL_DIR")
+CALL_JOURNAL_SEGMENT_BYTES = int(os.getenv("CALL_JOURNAL_SEGMENT_BYTES", 16 * 1024 * 1024))
+CALL_JOURNAL_MAX_SEGMENTS = int(os.getenv("CALL_JOURNAL_MAX_SEGMENTS", 256))
+CALL_JOURNAL_BATCH_SIZE = int(os.getenv("CALL_JOURNAL_BATCH_SIZE", 500))
+CALL_JOURNAL_FLUSH_SECONDS = float(os.getenv("CALL_JOURNAL_FLUSH_SECONDS", 1.0))
+CALL_JOURNAL_QUEUE_SIZE = int(os.getenv("CALL_JOURNAL_QUEUE_SIZE", 10000))
+
+_SEGMENT_RE = re.compile(r"^seg-(\d{8})\.jsonl\.gz$")
+
+# (segment number, offset, length) of one gzip member
+Extent = Tuple[int, int, int]
+
+
+class CallJournal:
+    """Batched, compressed, indexed append-only log of call events."""
+
+    def __init__(self, directory: Optional[str] = CALL_JOURNAL_DIR,
+                 segment_bytes: int = CALL_JOURNAL_SEGMENT_BYTES,
+                 max_segments: int = CALL_JOURNAL_MAX_SEGMENTS):
+        self.directory = directory
+        self.enabled = bool(directory)
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()  # index + segment list (writer thread vs readers)
+
+        self._segments: List[int] = []
+        self._calls: Dict[str, List[Extent]] = {}
+        # customer_id → call_id → last event timestamp
+        self._customers: Dict[str, Dict[str, float]] = {}
+
+        self.written = 0
+        self.dropped = 0
+
+    # ----------------------------------------
+    # Segment files
+    # ----------------------------------------
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"seg-{segment:08d}.jsonl.gz")
+
+    def _index_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"seg-{segment:08d}.idx")
+
+    def load(self) -> None:
+        """Rebuild the in-memory index from the .idx sidecars."""
+        if not self.enabled:
+            print("⚠️  CALL_JOURNAL_DIR not set - call event journal disabled")
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        segments = sorted(
+            int(match.group(1))
+            for match in (_SEGMENT_RE.match(name) for name in os.listdir(self.directory))
+            if match
+        )
+        for segment in segments:
+            self._load_index(segment)
+        self._segments = segments or [1]
+        print(f"📒 Call journal: {len(self._segments)} segment(s), {len(self._calls)} call(s) in {self.directory}")
+
+    def _load_index(self, segment: int) -> None:
+        try:
+            with open(self._index_path(segment)) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line after a crash
+                    self._index_batch(segment, entry["o"], entry["l"], entry["calls"])
+        except FileNotFoundError:
+            pass
+
+    def _index_batch(self, segment: int, offset: int, length: int,
+                     calls: Dict[str, List[Any]]) -> None:
+        """calls: call_id → [customer_id, last event timestamp in this batch]"""
+        for call_id, (customer_id, timestamp) in calls.items():
+            self._calls.setdefault(call_id, []).append((segment, offset, length))
+            if customer_id:
+                customer_calls = self._customers.setdefault(customer_id, {})
+                customer_calls[call_id] = max(timestamp, customer_calls.get(call_id, 0.0))
+
+    def _rotate_if_needed(self) -> None:
+        active = self._segments[-1]
+        try:
+            size = os.path.getsize(self._segment_path(active))
+        except FileNotFoundError:
+            return
+        if size < self.segment_bytes:
+            return
+
+        with self._lock:
+            self._segments.append(active + 1)
+            expired = self._segments[:-self.max_segments] if self.max_segments > 0 else []
+            del self._segments[:len(expired)]
+            if expired:
+                self._forget_segments(set(expired))
+
+        for segment in expired:
+            for path in (self._segment_path(segment), self._index_path(segment)):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def _forget_segments(self, expired: set) -> None:
+        for call_id in list(self._calls):
+            extents = [extent for extent in self._calls[call_id] if extent[0] not in expired]
+            if extents:
+                self._calls[call_id] = extents
+            else:
+                del self._calls[call_id]
+                for customer_calls in self._customers.values():
+                    customer_calls.pop(call_id, None)
+
+    # ----------------------------------------
+    # Write path
+    # ----------------------------------------
+
+    def record(self, event: Dict[str, Any]) -> None:
+        """Enqueue an event ({"call_id", "customer_id", "type", ...}); never blocks."""
+        if self._queue is None:
+            return
+        event.setdefault("ts", time.time())
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def start(self) -> None:
+        """Start the writer task (inside the running event loop)."""
+        if not self.enabled or self._writer_task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=CALL_JOURNAL_QUEUE_SIZE)
+        self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def close(self) -> None:
+        """Flush pending events and stop the writer."""
+        if self._writer_task is None:
+            return
+        await self._queue.put(None)
+        await self._writer_task
+        self._writer_task = None
+        self._queue = None
+
+    async def _writer_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            event = await self._queue.get()
+            if event is None:
+                break
+            batch = [event]
+            deadline = loop.time() + CALL_JOURNAL_FLUSH_SECONDS
+            while len(batch) < CALL_JOURNAL_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if event is None:
+                    closing = True
+                    break
+                batch.append(event)
+
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                print(f"❌ Call journal write failed ({len(batch)} events lost): {e}")
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Append one gzip member + its index line (worker thread)."""
+        self._rotate_if_needed()
+        segment = self._segments[-1]
+
+        payload = "".join(json.dumps(event, separators=(",", ":")) + "\n" for event in batch)
+        member = gzip.compress(payload.encode(), compresslevel=6)
+        calls = {event["call_id"]: [event.get("customer_id"), event["ts"]] for event in batch if event.get("call_id")}
+
+        with open(self._segment_path(segment), "ab") as f:
+            offset = f.tell()
+            f.write(member)
+
+        with open(self._index_path(segment), "a") as f:
+            f.write(json.dumps({"o": offset, "l": len(member), "calls": calls}) + "\n")
+
+        with self._lock:
+            self._index_batch(segment, offset, len(member), calls)
+        self.written += len(batch)
+
+    # ----------------------------------------
+    # Read path (call from a thread: asyncio.to_thread)
+    # ----------------------------------------
+
+    def read_call(self, call_id: str) -> List[Dict[str, Any]]:
+        """All journaled events of one call, oldest first."""
+        with self._lock:
+            extents = list(self._calls.get(call_id, []))
+
+        events = []
+        by_segment: Dict[int, List[Extent]] = {}
+        for extent in extents:
+            by_segment.setdefault(extent[0], []).append(extent)
+
+        for segment, segment_extents in sorted(by_segment.items()):
+            try:
+                with open(self._segment_path(segment), "rb") as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for _, offset, length in segment_extents:
+                        for line in gzip.decompress(mapped[offset:offset + length]).splitlines():
+                            event = json.loads(line)
+                            if event.get("call_id") == call_id:
+                                events.append(event)
+            except (FileNotFoundError, ValueError):
+                continue  # segment rotated away while reading
+        return events
+
+    def list_calls(self, customer_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recently active calls of a customer."""
+        with self._lock:
+            customer_calls = list(self._customers.get(customer_id, {}).items())
+        customer_calls.sort(key=lambda item: item[1], reverse=True)
+        return [{"call_id": call_id, "last_event": ts} for call_id, ts in customer_calls[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "segments": len(self._segments),
+            "calls": len(self._calls),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "dropped": self.dropped
+        }
+
+
+CALL_JOURNAL = CallJournal()
+CALL_JOURNAL.load()
@@ -0,0 +1,250 @@
+"""
+Warm Pool of Pre-created VAPI Web Calls
+
+/vapi/start normally waits on VAPI's POST /call/web before the Pi can join,
+so VAPI's call-creation latency sits in front of the first spoken word.
+With the pool enabled (VAPI_CALL_POOL_ENABLED=1), web calls are created
+ahead of time per (assistant_id, device_id) and handed out instantly.
+
+- Pooled calls expire after VAPI_CALL_POOL_TTL_SECONDS and are ended (PATCH)
+- Pool size adapts to the recent start rate per key: a key only gets a warm
+  call when at least VAPI_CALL_POOL_MIN_USE starts are expected within one
+  TTL (each pooled call costs a VAPI call creation, used or expired)
+- Refills run in the background after each hand-out and on a maintenance tick
+- A pooled call is only handed out if the request's assistant_overrides match
+
+Point VAPI_BASE_URL at vapi_standin.py to exercise the pool offline.
+"""
+
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+from collections import deque
+from dataclasses import dataclass, field
+import asyncio
+import json
+import math
+import os
+import time
+
+CALL_POOL_ENABLED = os.getenv("VAPI_CALL_POOL_ENABLED", "0") == "1"
+CALL_POOL_TTL_SECONDS = float(os.getenv("VAPI_CALL_POOL_TTL_SECONDS", 45))
+CALL_POOL_MAX_SIZE = int(os.getenv("VAPI_CALL_POOL_MAX_SIZE", 3))
+# Keys with no start within this window are drained to zero
+CALL_POOL_IDLE_SECONDS = float(os.getenv("VAPI_CALL_POOL_IDLE_SECONDS", 1800))
+# Expected starts per TTL below which a key gets no warm call (most would expire unused)
+CALL_POOL_MIN_USE = float(os.getenv("VAPI_CALL_POOL_MIN_USE", 0.5))
+
+# Window used to estimate the start rate per key
+RATE_WINDOW_SECONDS = 600
+MAINTENANCE_INTERVAL_SECONDS = 5.0
+
+PoolKey = Tuple[str, str]  # (assistant_id, device_id)
+CreateCall = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+EndCall = Callable[[str], Awaitable[Any]]
+
+
+@dataclass
+class PooledCall:
+    """A pre-created web call waiting for a device."""
+    call: Dict[str, Any]
+    expires_at: float
+
+
+@dataclass
+class _KeyState:
+    assistant_overrides: Dict[str, Any]
+    overrides_key: str
+    calls: Deque[PooledCall] = field(default_factory=deque)
+    starts: Deque[float] = field(default_factory=deque)
+    create_latency: float = 1.0  # EWMA of POST /call/web latency (seconds)
+    refill_task: Optional[asyncio.Task] = None
+
+
+def _overrides_key(assistant_overrides: Dict[str, Any]) -> str:
+    return json.dumps(assistant_overrides or {}, sort_keys=True)
+
+
+class CallPool:
+    """Per-(assistant, device) pools of pre-created web calls."""
+
+    def __init__(self, create_call: CreateCall, end_call: EndCall,
+                 ttl: float = CALL_POOL_TTL_SECONDS,
+                 max_size: int = CALL_POOL_MAX_SIZE,
+                 idle_seconds: float = CALL_POOL_IDLE_SECONDS):
+        self._create_call = create_call
+        self._end_call = end_call
+        self.ttl = ttl
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._pools: Dict[PoolKey, _KeyState] = {}
+        self._background: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+
+    # ----------------------------------------
+    # Hand-out
+    # ----------------------------------------
+
+    async def start_call(self, assistant_id: str, device_id: str,
+                         assistant_overrides: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Get a web call for a device: pooled if available, otherwise created now.
+
+        Returns:
+            (VAPI call response, pool_hit)
+        Raises:
+            Whatever create_call raises on a miss (e.g. httpx.HTTPStatusError)
+        """
+        key = (assistant_id, device_id)
+        now = time.monotonic()
+        state = self._state_for(key, assistant_overrides)
+
+        state.starts.append(now)
+        while state.starts and state.starts[0] < now - RATE_WINDOW_SECONDS:
+            state.starts.popleft()
+
+        call = None
+        while state.calls:
+            pooled = state.calls.popleft()
+            if pooled.expires_at > now:
+                call = pooled.call
+                break
+            self._end_in_background(pooled.call)
+
+        self._schedule_refill(key, state)
+
+        if call is not None:
+            self.hits += 1
+            return call, True
+
+        self.misses += 1
+        call = await self._timed_create(state, assistant_id)
+        return call, False
+
+    def _state_for(self, key: PoolKey, assistant_overrides: Dict[str, Any]) -> _KeyState:
+        overrides_key = _overrides_key(assistant_overrides)
+        state = self._pools.get(key)
+
+        if state is None:
+            state = _KeyState(assistant_overrides=assistant_overrides or {}, overrides_key=overrides_key)
+            self._pools[key] = state
+        elif state.overrides_key != overrides_key:
+            # Device now asks for different overrides - pooled calls are useless
+            for pooled in state.calls:
+                self._end_in_background(pooled.call)
+            state.calls.clear()
+            state.assistant_overrides = assistant_overrides or {}
+            state.overrides_key = overrides_key
+
+        return state
+
+    # ----------------------------------------
+    # Sizing / refill
+    # ----------------------------------------
+
+    def target_size(self, state: _KeyState, now: float) -> int:
+        """
+        Calls to keep warm: enough to cover starts arriving while a refill is in
+        flight, and none unless a start is likely before a pooled call expires.
+        """
+        if not state.starts or now - state.starts[-1] > self.idle_seconds:
+            return 0
+        # At least a few TTLs of history, so one isolated start does not look like a burst
+        window = min(RATE_WINDOW_SECONDS, max(4 * self.ttl, now - state.starts[0]))
+        rate = len(state.starts) / window  # starts per second
+        if rate * self.ttl < CALL_POOL_MIN_USE:
+            return 0
+        needed = math.ceil(rate * state.create_latency * 2)
+        return max(1, min(self.max_size, needed))
+
+    async def _timed_create(self, state: _KeyState, assistant_id: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        call = await self._create_call(assistant_id, state.assistant_overrides)
+        latency = time.monotonic() - started
+        state.create_latency = 0.8 * state.create_latency + 0.2 * latency
+        return call
+
+    def _schedule_refill(self, key: PoolKey, state: _KeyState) -> None:
+        if state.refill_task is None or state.refill_task.done():
+            state.refill_task = asyncio.create_task(self._refill(key, state))
+
+    async def _refill(self, key: PoolKey, state: _KeyState) -> None:
+        try:
+            while len(state.calls) < self.target_size(state, time.monotonic()):
+                overrides_key = state.overrides_key
+                call = await self._timed_create(state, key[0])
+                if state.overrides_key != overrides_key or self._pools.get(key) is not state:
+                    self._end_in_background(call)
+                    return
+                state.calls.append(PooledCall(call=call, expires_at=time.monotonic() + self.ttl))
+        except Exception as e:
+            print(f"⚠️  Call pool refill failed for {key[1]}: {e}")
+
+    # ----------------------------------------
+    # Expiry / cleanup
+    # ----------------------------------------
+
+    def _end_in_background(self, call: Dict[str, Any]) -> None:
+        call_id = call.get("id")
+        if not call_id:
+            return
+        task = asyncio.create_task(self._end_quietly(call_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _end_quietly(self, call_id: str) -> None:
+        try:
+            await self._end_call(call_id)
+        except Exception as e:
+            print(f"⚠️  Could not end pooled call {call_id}: {e}")
+
+    def maintain(self) -> None:
+        """Expire old calls, shrink/refill to target, forget idle keys."""
+        now = time.monotonic()
+        for key, state in list(self._pools.items()):
+            live = deque()
+            for pooled in state.calls:
+                if pooled.expires_at > now:
+                    live.append(pooled)
+                else:
+                    self._end_in_background(pooled.call)
+            state.calls = live
+
+            target = self.target_size(state, now)
+            while len(state.calls) > target:
+                self._end_in_background(state.calls.pop().call)
+
+            if target == 0 and not state.calls:
+                if state.refill_task is None or state.refill_task.done():
+                    del self._pools[key]
+            elif len(state.calls) < target:
+                self._schedule_refill(key, state)
+
+    async def maintenance_loop(self) -> None:
+        """Background task: periodic expiry + refill."""
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL_SECONDS)
+            try:
+                self.maintain()
+            except Exception as e:
+                print(f"❌ Call pool maintenance failed: {e}")
+
+    async def close(self) -> None:
+        """End every pooled call (shutdown)."""
+        for state in self._pools.values():
+            if state.refill_task is not None:
+                state.refill_task.cancel()
+            for pooled in state.calls:
+                self._end_in_background(pooled.call)
+            state.calls.clear()
+        self._pools.clear()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool sizes and hit rate."""
+        return {
+            "keys": len(self._pools),
+            "pooled_calls": sum(len(state.calls) for state in self._pools.values()),
+            "hits": self.hits,
+            "misses": self.misses
+        }
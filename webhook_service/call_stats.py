@@ -0,0 +1,201 @@
+"""
+Per-tenant Call Analytics (in-process rollups)
+
+"How many calls and commands did customer X make today, and what was the
+p95 HA latency?" - answered from rollups updated as webhook events arrive:
+
+- One bucket per (customer_id, STATS_BUCKET_SECONDS window), kept for
+  STATS_RETENTION_HOURS
+- Each bucket: call starts/ends, ended reasons, tool calls per function,
+  HA requests / successes and a mergeable latency sketch
+- Queries merge the buckets in range: O(buckets), not O(events)
+
+Latencies use a DDSketch-style log-bucketed histogram: quantiles within
+STATS_SKETCH_ACCURACY relative error in a few hundred counters, and two
+sketches merge by adding counters.
+
+Counters are per process (reset on restart).
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter
+import math
+import os
+import time
+
+STATS_BUCKET_SECONDS = int(os.getenv("STATS_BUCKET_SECONDS", 3600))
+STATS_RETENTION_HOURS = int(os.getenv("STATS_RETENTION_HOURS", 48))
+STATS_SKETCH_ACCURACY = float(os.getenv("STATS_SKETCH_ACCURACY", 0.02))
+
+# Tenant key for events that could not be routed to a customer
+UNROUTED = "unrouted"
+
+
+class LatencySketch:
+    """Log-bucketed quantile sketch (relative-error guarantee, mergeable)."""
+
+    # Latencies below this (seconds) share the lowest bucket
+    MIN_VALUE = 1e-4
+
+    def __init__(self, relative_accuracy: float = STATS_SKETCH_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.counts: Counter = Counter()
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        value = max(value, self.MIN_VALUE)
+        self.counts[math.ceil(math.log(value) / self._log_gamma)] += 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "LatencySketch") -> None:
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total += other.total
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                # Midpoint of (gamma^(i-1), gamma^i] in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return None
+
+
+class StatsBucket:
+    """Rollup of one tenant over one time window."""
+
+    def __init__(self):
+        self.calls_started = 0
+        self.calls_ended = 0
+        self.ended_reasons: Counter = Counter()
+        self.tool_calls: Counter = Counter()
+        self.ha_requests = 0
+        self.ha_successes = 0
+        self.ha_latency = LatencySketch()
+
+    def merge(self, other: "StatsBucket") -> None:
+        self.calls_started += other.calls_started
+        self.calls_ended += other.calls_ended
+        self.ended_reasons.update(other.ended_reasons)
+        self.tool_calls.update(other.tool_calls)
+        self.ha_requests += other.ha_requests
+        self.ha_successes += other.ha_successes
+        self.ha_latency.merge(other.ha_latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        return {
+            "calls_started": self.calls_started,
+            "calls_ended": self.calls_ended,
+            "ended_reasons": dict(self.ended_reasons),
+            "tool_calls": dict(self.tool_calls),
+            "ha_requests": self.ha_requests,
+            "ha_success_rate": round(self.ha_successes / self.ha_requests, 4) if self.ha_requests else None,
+            "ha_latency_ms": {
+                "p50": ms(self.ha_latency.quantile(0.50)),
+                "p95": ms(self.ha_latency.quantile(0.95)),
+                "p99": ms(self.ha_latency.quantile(0.99)),
+                "mean": ms(self.ha_latency.total / self.ha_latency.count) if self.ha_latency.count else None
+            }
+        }
+
+
+class CallStats:
+    """Per-tenant, per-window rollups."""
+
+    def __init__(self, bucket_seconds: int = STATS_BUCKET_SECONDS,
+                 retention_hours: int = STATS_RETENTION_HOURS):
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_hours * 3600
+        # customer_id → {window_start: StatsBucket}
+        self._buckets: Dict[str, Dict[int, StatsBucket]] = {}
+        self._last_prune = 0.0
+
+    def _bucket(self, customer_id: Optional[str]) -> StatsBucket:
+        now = time.time()
+        window_start = int(now // self.bucket_seconds) * self.bucket_seconds
+        tenant_buckets = self._buckets.setdefault(customer_id or UNROUTED, {})
+        bucket = tenant_buckets.get(window_start)
+        if bucket is None:
+            bucket = tenant_buckets[window_start] = StatsBucket()
+            if now - self._last_prune > self.bucket_seconds:
+                self._prune(now)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        self._last_prune = now
+        cutoff = now - self.retention_seconds
+        for customer_id in list(self._buckets):
+            tenant_buckets = self._buckets[customer_id]
+            for window_start in [w for w in tenant_buckets if w + self.bucket_seconds < cutoff]:
+                del tenant_buckets[window_start]
+            if not tenant_buckets:
+                del self._buckets[customer_id]
+
+    # ----------------------------------------
+    # Updates (called from webhook handling)
+    # ----------------------------------------
+
+    def record_call_started(self, customer_id: Optional[str]) -> None:
+        self._bucket(customer_id).calls_started += 1
+
+    def record_call_ended(self, customer_id: Optional[str], ended_reason: Optional[str]) -> None:
+        bucket = self._bucket(customer_id)
+        bucket.calls_ended += 1
+        bucket.ended_reasons[ended_reason or "unknown"] += 1
+
+    def record_tool_call(self, customer_id: Optional[str], function_name: str) -> None:
+        self._bucket(customer_id).tool_calls[function_name or "unknown"] += 1
+
+    def record_ha_request(self, customer_id: Optional[str], success: bool, latency: float) -> None:
+        bucket = self._bucket(customer_id)
+        bucket.ha_requests += 1
+        bucket.ha_successes += int(success)
+        bucket.ha_latency.add(latency)
+
+    # ----------------------------------------
+    # Queries
+    # ----------------------------------------
+
+    def query(self, customer_id: Optional[str] = None, since_seconds: int = 24 * 3600) -> Dict[str, Any]:
+        """
+        Merge the buckets of the last `since_seconds` per tenant.
+
+        Returns:
+            {"window_seconds", "customers": {customer_id: rollup}, "total": rollup}
+        """
+        cutoff = time.time() - since_seconds
+        tenants: List[Tuple[str, Dict[int, StatsBucket]]] = (
+            [(customer_id, self._buckets.get(customer_id, {}))] if customer_id
+            else list(self._buckets.items())
+        )
+
+        total = StatsBucket()
+        customers = {}
+        for tenant, tenant_buckets in tenants:
+            merged = StatsBucket()
+            for window_start, bucket in list(tenant_buckets.items()):
+                if window_start + self.bucket_seconds > cutoff:
+                    merged.merge(bucket)
+            customers[tenant] = merged.to_dict()
+            total.merge(merged)
+
+        return {
+            "window_seconds": since_seconds,
+            "bucket_seconds": self.bucket_seconds,
+            "customers": customers,
+            "total": total.to_dict()
+        }
+
+
+CALL_STATS = CallStats()
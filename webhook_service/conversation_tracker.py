@@ -0,0 +1,126 @@
+"""
+Incremental Conversation Tracking
+
+Every conversation-update webhook carries the whole conversation so far, so
+walking it on each update makes a call's total work quadratic in its length.
+The tracker remembers, per call.id, how many messages it has already seen and
+only processes the new tail into a compact summary:
+
+    {"messages": 14, "by_role": {"user": 6, "assistant": 6, ...},
+     "tool_calls": 3, "last_user": "...", "last_assistant": "..."}
+
+- A conversation shorter than what was seen (VAPI trimmed/reset it) is
+  re-read from the start
+- Bounded: at most CONVERSATION_TRACKER_MAX_CALLS calls (least recently
+  updated evicted first), and calls idle for CONVERSATION_TRACKER_IDLE_SECONDS
+  are dropped
+- finish(call_id) on end-of-call-report releases the call and returns its summary
+"""
+
+from typing import Any, Dict, List, Optional
+from collections import Counter, OrderedDict
+import os
+import time
+
+CONVERSATION_TRACKER_MAX_CALLS = int(os.getenv("CONVERSATION_TRACKER_MAX_CALLS", 10000))
+CONVERSATION_TRACKER_IDLE_SECONDS = float(os.getenv("CONVERSATION_TRACKER_IDLE_SECONDS", 3600))
+
+# Characters kept of the last user / assistant utterance
+SNIPPET_CHARS = 200
+
+
+class CallConversation:
+    """Compact running summary of one call's conversation."""
+
+    __slots__ = ("seen", "by_role", "tool_calls", "last_user", "last_assistant", "updated_at")
+
+    def __init__(self):
+        self.seen = 0
+        self.by_role: Counter = Counter()
+        self.tool_calls = 0
+        self.last_user: Optional[str] = None
+        self.last_assistant: Optional[str] = None
+        self.updated_at = time.monotonic()
+
+    def add(self, message: Dict[str, Any]) -> None:
+        role = message.get("role") or "unknown"
+        self.by_role[role] += 1
+        self.tool_calls += len(message.get("tool_calls") or message.get("toolCalls") or [])
+
+        content = message.get("content") or message.get("message")
+        if isinstance(content, str):
+            if role == "user":
+                self.last_user = content[:SNIPPET_CHARS]
+            elif role in ("assistant", "bot"):
+                self.last_assistant = content[:SNIPPET_CHARS]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "messages": self.seen,
+            "by_role": dict(self.by_role),
+            "tool_calls": self.tool_calls,
+            "last_user": self.last_user,
+            "last_assistant": self.last_assistant
+        }
+
+
+class ConversationTracker:
+    """Per-call incremental conversation summaries (LRU + idle bounded)."""
+
+    def __init__(self, max_calls: int = CONVERSATION_TRACKER_MAX_CALLS):
+        self.max_calls = max_calls
+        self._calls: "OrderedDict[str, CallConversation]" = OrderedDict()
+        self.messages_processed = 0
+        self.evicted = 0
+
+    def update(self, call_id: str, conversation: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fold the messages not seen yet for this call into its summary.
+
+        Returns:
+            The new messages (the unseen tail of `conversation`)
+        """
+        call = self._calls.get(call_id)
+        if call is None or len(conversation) < call.seen:
+            call = CallConversation()
+        self._calls[call_id] = call
+        self._calls.move_to_end(call_id)
+
+        new_messages = conversation[call.seen:]
+        for message in new_messages:
+            if isinstance(message, dict):
+                call.add(message)
+        call.seen = len(conversation)
+        call.updated_at = time.monotonic()
+        self.messages_processed += len(new_messages)
+
+        self._evict()
+        return new_messages
+
+    def summary(self, call_id: str) -> Optional[Dict[str, Any]]:
+        call = self._calls.get(call_id)
+        return call.summary() if call else None
+
+    def finish(self, call_id: str) -> Optional[Dict[str, Any]]:
+        """Release a finished call; returns its final summary (None if untracked)."""
+        call = self._calls.pop(call_id, None)
+        return call.summary() if call else None
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - CONVERSATION_TRACKER_IDLE_SECONDS
+        while self._calls:
+            call_id, call = next(iter(self._calls.items()))
+            if len(self._calls) <= self.max_calls and call.updated_at >= cutoff:
+                break
+            del self._calls[call_id]
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": len(self._calls),
+            "messages_processed": self.messages_processed,
+            "evicted": self.evicted
+        }
+
+
+CONVERSATIONS = ConversationTracker()
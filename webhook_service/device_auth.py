@@ -5,30 +5,62 @@ Manages authentication for edge devices (Raspberry Pi) with short-lived JWT toke
 
 Security features:
 - Device secrets never exposed to end users
-- JWT tokens with 15-minute TTL
+- Device secrets stored as KDF hashes (scrypt / PBKDF2), compared in constant time
+- Short-TTL verification cache so re-auth storms don't pay the KDF every time
+- JWT tokens with 15-minute TTL, signed EdDSA/ES256 with key IDs (see signing_keys.py)
 - Token refresh mechanism
-- Device revocation support
+- Device revocation support, plus O(1) token revocation per device or per
+  customer via token generations (dgen/tgen claims)
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import bisect
+import hashlib
+import hmac
+import json
 import secrets
+import threading
 import time
 import os
 from datetime import datetime, timedelta
 import jwt
 
-# JWT secret for signing tokens
-# IMPORTANT: Use fixed secret from environment or generate once and save
-JWT_SECRET = os.getenv("JWT_SECRET", secrets.token_urlsafe(32))
-JWT_ALGORITHM = "HS256"
+from signing_keys import KEY_SET
+
 TOKEN_TTL_MINUTES = 15  # Short-lived tokens
 
-# Device registry (in production, use database)
-# Each device has: device_id, device_secret, customer_id, name, active
+# Device secret hashing
+# DEVICE_SECRET_KDF selects the KDF for newly hashed secrets ("scrypt" or "pbkdf2_sha256").
+# Stored hashes carry their own parameters, so changing these never breaks existing devices.
+DEVICE_SECRET_KDF = os.getenv("DEVICE_SECRET_KDF", "scrypt")
+SCRYPT_N = int(os.getenv("DEVICE_SECRET_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.getenv("DEVICE_SECRET_SCRYPT_R", 8))
+SCRYPT_P = int(os.getenv("DEVICE_SECRET_SCRYPT_P", 1))
+PBKDF2_ITERATIONS = int(os.getenv("DEVICE_SECRET_PBKDF2_ITERATIONS", 600_000))
+KDF_WORKERS = int(os.getenv("DEVICE_SECRET_KDF_WORKERS", 4))
+
+# Verification cache: recent successful (device_id, secret) checks skip the KDF
+VERIFY_CACHE_TTL_SECONDS = int(os.getenv("DEVICE_VERIFY_CACHE_TTL", 300))
+VERIFY_CACHE_MAX_ENTRIES = int(os.getenv("DEVICE_VERIFY_CACHE_SIZE", 10_000))
+
+# Bumped on every registry change so compiled routing tables know to rebuild (see routing.py)
+DEVICES_VERSION = 0
+
+# Registered / re-registered / revoked devices are appended here (JSON lines,
+# secret hashes only) and fsynced before they take effect; unset = in memory only
+DEVICE_REGISTRY_PATH = os.getenv("DEVICE_REGISTRY_PATH")
+
+# Device registry (seed entries below + DEVICE_REGISTRY_PATH)
+# Each device has: device_id, device_secret_hash, customer_id, name, active
 DEVICES = {
     "pi_urbanjungle_001": {
         "device_id": "pi_urbanjungle_001",
-        "device_secret": "dev_secret_urbanjungle_abc123xyz",  # Strong secret
+        # Hash of "dev_secret_urbanjungle_abc123xyz" (see hash_device_secret)
+        "device_secret_hash": "scrypt$16384$8$1$V1AtB5P7WcgmPLYPdWsnNQ$8Rzx0D8dASJOmJAdoCuK7eAwivzQz4W54qO_5fQrWv0",
         "customer_id": "urbanjungle",
         "name": "Urban Jungle - Raspberry Pi #1",
         "active": True,
@@ -37,13 +69,196 @@ DEVICES = {
     # Add more devices here:
     # "pi_customer2_001": {
     #     "device_id": "pi_customer2_001",
-    #     "device_secret": "dev_secret_customer2_def456uvw",
+    #     "device_secret_hash": "scrypt$...",  # output of hash_device_secret(secret)
     #     "customer_id": "customer2",
     #     "name": "Customer 2 - Raspberry Pi #1",
     #     "active": True
     # },
 }
 
+# customer_id -> sorted device_ids (cursor-paginated export, see list_devices_page)
+_CUSTOMER_DEVICES: Dict[str, List[str]] = {}
+
+# Token generations: tokens carry dgen/tgen and are only valid while they match.
+# Bumping one invalidates every outstanding token of that device / customer in O(1).
+_DEVICE_GENERATIONS: Dict[str, int] = {}
+_TENANT_GENERATIONS: Dict[str, int] = {}
+
+# Keyed digest -> expiry of recently verified credentials (LRU order)
+_VERIFY_CACHE: "OrderedDict[bytes, float]" = OrderedDict()
+_VERIFY_CACHE_LOCK = threading.Lock()
+# Per-process key so cached digests are useless outside this process
+_VERIFY_CACHE_KEY = secrets.token_bytes(32)
+
+_KDF_EXECUTOR = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="device-kdf")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def hash_device_secret(device_secret: str, kdf: Optional[str] = None) -> str:
+    """
+    Hash a device secret for storage.
+
+    Format:
+    - scrypt$N$r$p$salt$hash
+    - pbkdf2_sha256$iterations$salt$hash
+    """
+    kdf = kdf or DEVICE_SECRET_KDF
+    salt = secrets.token_bytes(16)
+
+    if kdf == "scrypt":
+        digest = hashlib.scrypt(
+            device_secret.encode(), salt=salt,
+            n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=32
+        )
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+
+    if kdf == "pbkdf2_sha256":
+        digest = hashlib.pbkdf2_hmac("sha256", device_secret.encode(), salt, PBKDF2_ITERATIONS)
+        return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64encode(salt)}${_b64encode(digest)}"
+
+    raise ValueError(f"Unsupported device secret KDF: {kdf}")
+
+
+def verify_device_secret(device_secret: str, secret_hash: str) -> bool:
+    """
+    Check a device secret against a stored hash (constant-time comparison).
+
+    CPU-heavy (tens of milliseconds) - call via the thread pool from async code.
+    """
+    try:
+        kdf, _, params = secret_hash.partition("$")
+        if kdf == "scrypt":
+            n, r, p, salt, expected = params.split("$")
+            digest = hashlib.scrypt(
+                device_secret.encode(), salt=_b64decode(salt),
+                n=int(n), r=int(r), p=int(p), dklen=32, maxmem=256 * 1024 * 1024
+            )
+        elif kdf == "pbkdf2_sha256":
+            iterations, salt, expected = params.split("$")
+            digest = hashlib.pbkdf2_hmac(
+                "sha256", device_secret.encode(), _b64decode(salt), int(iterations)
+            )
+        else:
+            return False
+        expected_digest = _b64decode(expected)
+    except (ValueError, TypeError):  # incl. binascii.Error from a corrupted stored hash
+        return False
+
+    return hmac.compare_digest(digest, expected_digest)
+
+
+def _verify_cache_key(device_id: str, device_secret: str, secret_hash: str) -> bytes:
+    """Fast keyed digest of the credentials (includes the stored hash, so rotation invalidates)."""
+    material = "\0".join((device_id, device_secret, secret_hash)).encode()
+    return hashlib.blake2b(material, key=_VERIFY_CACHE_KEY, digest_size=32).digest()
+
+
+def _verify_cache_hit(key: bytes) -> bool:
+    now = time.monotonic()
+    with _VERIFY_CACHE_LOCK:
+        expiry = _VERIFY_CACHE.get(key)
+        if expiry is None:
+            return False
+        if expiry < now:
+            del _VERIFY_CACHE[key]
+            return False
+        _VERIFY_CACHE.move_to_end(key)
+        return True
+
+
+def _verify_cache_store(key: bytes) -> None:
+    with _VERIFY_CACHE_LOCK:
+        _VERIFY_CACHE[key] = time.monotonic() + VERIFY_CACHE_TTL_SECONDS
+        _VERIFY_CACHE.move_to_end(key)
+        while len(_VERIFY_CACHE) > VERIFY_CACHE_MAX_ENTRIES:
+            _VERIFY_CACHE.popitem(last=False)
+
+
+def clear_verify_cache() -> None:
+    """Drop all cached verifications (e.g. after bulk secret rotation)."""
+    with _VERIFY_CACHE_LOCK:
+        _VERIFY_CACHE.clear()
+
+
+def _load_device_registry() -> None:
+    """Replay DEVICE_REGISTRY_PATH into DEVICES (the last record of a device wins)."""
+    if not DEVICE_REGISTRY_PATH:
+        return
+    loaded = 0
+    try:
+        with open(DEVICE_REGISTRY_PATH) as f:
+            for line in f:
+                try:
+                    device = json.loads(line)
+                except ValueError:
+                    continue  # torn last line of a crash
+                DEVICES[device["device_id"]] = device
+                loaded += 1
+    except FileNotFoundError:
+        return
+    print(f"🔐 Device registry restored: {loaded} record(s), {len(DEVICES)} device(s)")
+
+
+def _persist_devices(devices: List[Dict[str, Any]]) -> None:
+    """
+    Append device records to DEVICE_REGISTRY_PATH and fsync.
+
+    Raises:
+        OSError: The write failed (callers then leave DEVICES unchanged)
+    """
+    if not DEVICE_REGISTRY_PATH:
+        return
+    directory = os.path.dirname(os.path.abspath(DEVICE_REGISTRY_PATH))
+    os.makedirs(directory, exist_ok=True)
+    data = "".join(json.dumps(device, separators=(",", ":")) + "\n" for device in devices)
+    with open(DEVICE_REGISTRY_PATH, "a") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+_load_device_registry()
+
+
+def _migrate_plaintext_secrets() -> None:
+    """Replace any legacy plaintext device_secret entries with hashes."""
+    for device in DEVICES.values():
+        if "device_secret" in device:
+            device["device_secret_hash"] = hash_device_secret(device.pop("device_secret"))
+
+
+_migrate_plaintext_secrets()
+
+
+def _index_device(device_id: str, customer_id: str) -> None:
+    device_ids = _CUSTOMER_DEVICES.setdefault(customer_id, [])
+    position = bisect.bisect_left(device_ids, device_id)
+    if position == len(device_ids) or device_ids[position] != device_id:
+        device_ids.insert(position, device_id)
+
+
+def _unindex_device(device_id: str, customer_id: str) -> None:
+    device_ids = _CUSTOMER_DEVICES.get(customer_id, [])
+    position = bisect.bisect_left(device_ids, device_id)
+    if position < len(device_ids) and device_ids[position] == device_id:
+        del device_ids[position]
+
+
+def _build_indexes() -> None:
+    for device in DEVICES.values():
+        _index_device(device["device_id"], device["customer_id"])
+        _DEVICE_GENERATIONS.setdefault(device["device_id"], 0)
+
+
+_build_indexes()
+
 
 def get_device(device_id: str) -> Optional[Dict[str, Any]]:
     """Get device configuration by device_id."""
@@ -54,6 +269,9 @@ def validate_device_credentials(device_id: str, device_secret: str) -> Optional[
     """
     Validate device credentials.
 
+    Blocks for the KDF on a cache miss - prefer validate_device_credentials_async
+    from request handlers.
+
     Returns:
         Device config if valid, None otherwise
     """
@@ -66,9 +284,42 @@ def validate_device_credentials(device_id: str, device_secret: str) -> Optional[
         return None
 
     # Validate secret
-    if device["device_secret"] != device_secret:
+    secret_hash = device.get("device_secret_hash", "")
+    cache_key = _verify_cache_key(device_id, device_secret, secret_hash)
+    if _verify_cache_hit(cache_key):
+        return device
+
+    if not verify_device_secret(device_secret, secret_hash):
+        return None
+
+    _verify_cache_store(cache_key)
+    return device
+
+
+async def validate_device_credentials_async(device_id: str, device_secret: str) -> Optional[Dict[str, Any]]:
+    """
+    Validate device credentials without blocking the event loop.
+
+    Cache hits return immediately; the KDF runs in the device-kdf thread pool.
+
+    Returns:
+        Device config if valid, None otherwise
+    """
+    device = get_device(device_id)
+    if not device or not device.get("active", False):
         return None
 
+    secret_hash = device.get("device_secret_hash", "")
+    cache_key = _verify_cache_key(device_id, device_secret, secret_hash)
+    if _verify_cache_hit(cache_key):
+        return device
+
+    loop = asyncio.get_running_loop()
+    valid = await loop.run_in_executor(_KDF_EXECUTOR, verify_device_secret, device_secret, secret_hash)
+    if not valid:
+        return None
+
+    _verify_cache_store(cache_key)
     return device
 
 
@@ -82,6 +333,7 @@ def generate_device_token(device_id: str, customer_id: str) -> str:
     - exp: Expiration time (15 minutes from now)
     - iat: Issued at time
     - type: "device_token"
+    - dgen / tgen: Device / customer token generation (see revoke_*)
     """
     now = datetime.utcnow()
     expiry = now + timedelta(minutes=TOKEN_TTL_MINUTES)
@@ -90,14 +342,29 @@ def generate_device_token(device_id: str, customer_id: str) -> str:
         "device_id": device_id,
         "customer_id": customer_id,
         "type": "device_token",
+        "dgen": _DEVICE_GENERATIONS.get(device_id, 0),
+        "tgen": _TENANT_GENERATIONS.get(customer_id, 0),
         "iat": int(now.timestamp()),
         "exp": int(expiry.timestamp())
     }
 
-    token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    token = KEY_SET.sign(payload)
     return token
 
 
+def token_generations_current(payload: Dict[str, Any]) -> bool:
+    """
+    False once the token's device or customer was revoked since it was issued.
+
+    Generations: revocation (device or whole customer) bumps these, so two
+    dict lookups replace a registry check. Unknown device → False.
+    """
+    device_generation = _DEVICE_GENERATIONS.get(payload.get("device_id"))
+    if device_generation is None or payload.get("dgen", 0) != device_generation:
+        return False
+    return payload.get("tgen", 0) == _TENANT_GENERATIONS.get(payload.get("customer_id"), 0)
+
+
 def verify_device_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Verify and decode device JWT token.
@@ -106,16 +373,13 @@ def verify_device_token(token: str) -> Optional[Dict[str, Any]]:
         Token payload if valid, None if invalid/expired
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = KEY_SET.decode(token)
 
         # Verify token type
         if payload.get("type") != "device_token":
             return None
 
-        # Verify device still exists and is active
-        device_id = payload.get("device_id")
-        device = get_device(device_id)
-        if not device or not device.get("active", False):
+        if not token_generations_current(payload):
             return None
 
         return payload
@@ -132,17 +396,59 @@ def revoke_device(device_id: str) -> bool:
     """
     Revoke a device (set active=False).
 
-    All existing tokens for this device will be rejected on next validation.
+    All existing tokens for this device are rejected immediately (generation bump).
     """
     device = get_device(device_id)
     if not device:
         return False
 
-    device["active"] = False
+    global DEVICES_VERSION
+    device = {**device, "active": False}
+    _persist_devices([device])
     DEVICES[device_id] = device
+    DEVICES_VERSION += 1
+    revoke_device_tokens(device_id)
     return True
 
 
+def revoke_device_tokens(device_id: str) -> int:
+    """
+    Invalidate every outstanding token of one device (it can re-authenticate).
+
+    Returns:
+        The new device generation
+    """
+    _DEVICE_GENERATIONS[device_id] = _DEVICE_GENERATIONS.get(device_id, 0) + 1
+    return _DEVICE_GENERATIONS[device_id]
+
+
+def revoke_customer_tokens(customer_id: str) -> int:
+    """
+    Invalidate every outstanding token of every device of a customer in O(1).
+
+    Devices with valid secrets can re-authenticate; rotate/revoke secrets too
+    if those leaked.
+
+    Returns:
+        The new tenant generation
+    """
+    _TENANT_GENERATIONS[customer_id] = _TENANT_GENERATIONS.get(customer_id, 0) + 1
+    return _TENANT_GENERATIONS[customer_id]
+
+
+def snapshot_token_generations() -> Dict[str, Dict[str, int]]:
+    """Generations to persist across restarts (revocations must survive them)."""
+    return {"devices": dict(_DEVICE_GENERATIONS), "tenants": dict(_TENANT_GENERATIONS)}
+
+
+def restore_token_generations(snapshot: Dict[str, Dict[str, int]]) -> None:
+    """Merge saved generations, keeping the higher value (never un-revokes)."""
+    for saved, current in ((snapshot.get("devices", {}), _DEVICE_GENERATIONS),
+                           (snapshot.get("tenants", {}), _TENANT_GENERATIONS)):
+        for key, generation in saved.items():
+            current[key] = max(current.get(key, 0), int(generation))
+
+
 def get_device_info(device_id: str) -> Optional[Dict[str, Any]]:
     """
     Get public device info (without secret).
@@ -182,19 +488,100 @@ def register_new_device(device_id: str, customer_id: str, name: str) -> Dict[str
     """
     Register a new device.
 
+    Only the secret hash is stored; the plaintext secret is returned once.
+
     Returns:
         Device config including generated secret
     """
     device_secret = generate_device_secret()
 
-    device = {
+    device = _new_device_record(device_id, customer_id, name, hash_device_secret(device_secret))
+
+    _store_devices([device])
+    return {**device, "device_secret": device_secret}
+
+
+def _new_device_record(device_id: str, customer_id: str, name: str, secret_hash: str) -> Dict[str, Any]:
+    return {
         "device_id": device_id,
-        "device_secret": device_secret,
+        "device_secret_hash": secret_hash,
         "customer_id": customer_id,
         "name": name,
         "active": True,
         "created_at": datetime.utcnow().isoformat() + "Z"
     }
 
-    DEVICES[device_id] = device
-    return device
+
+def _store_devices(devices: List[Dict[str, Any]]) -> None:
+    """
+    Persist, then apply device records in one step (no awaits - atomic for the event loop).
+
+    Raises:
+        OSError: Writing DEVICE_REGISTRY_PATH failed (nothing applied)
+    """
+    global DEVICES_VERSION
+    _persist_devices(devices)
+    for device in devices:
+        previous = DEVICES.get(device["device_id"])
+        if previous and previous["customer_id"] != device["customer_id"]:
+            _unindex_device(device["device_id"], previous["customer_id"])
+        DEVICES[device["device_id"]] = device
+        _index_device(device["device_id"], device["customer_id"])
+        if previous:
+            revoke_device_tokens(device["device_id"])  # re-registered: old tokens die with the old secret
+        else:
+            _DEVICE_GENERATIONS.setdefault(device["device_id"], 0)
+    DEVICES_VERSION += 1
+
+
+async def register_devices_bulk(rows: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+    """
+    Register a batch of new devices all-or-nothing.
+
+    Secrets are generated together and hashed in parallel on the device-kdf
+    pool; once every hash is ready the batch is appended to
+    DEVICE_REGISTRY_PATH with one fsync and then applied in one step, so a
+    batch whose secrets were returned survives a restart.
+
+    Args:
+        rows: (device_id, customer_id, name) - callers validate beforehand
+    Returns:
+        Device configs including the generated secrets (shown once)
+    Raises:
+        ValueError if any device_id was registered while hashing (nothing applied)
+        OSError if the registry write failed (nothing applied)
+    """
+    device_secrets = [generate_device_secret() for _ in rows]
+    loop = asyncio.get_running_loop()
+    secret_hashes = await asyncio.gather(*(
+        loop.run_in_executor(_KDF_EXECUTOR, hash_device_secret, device_secret)
+        for device_secret in device_secrets
+    ))
+
+    conflicts = [device_id for device_id, _, _ in rows if device_id in DEVICES]
+    if conflicts:
+        raise ValueError(f"already registered: {', '.join(conflicts[:5])}")
+
+    devices = [
+        _new_device_record(device_id, customer_id, name, secret_hash)
+        for (device_id, customer_id, name), secret_hash in zip(rows, secret_hashes)
+    ]
+    _store_devices(devices)
+    return [{**device, "device_secret": device_secret} for device, device_secret in zip(devices, device_secrets)]
+
+
+def list_devices_page(customer_id: str, after: Optional[str] = None,
+                      limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of a customer's devices, ordered by device_id.
+
+    O(log n + limit) per page via the sorted per-customer index.
+
+    Returns:
+        (device infos, device_id to continue after - None on the last page)
+    """
+    device_ids = _CUSTOMER_DEVICES.get(customer_id, [])
+    start = bisect.bisect_right(device_ids, after) if after else 0
+    page_ids = device_ids[start:start + limit]
+    next_after = page_ids[-1] if start + limit < len(device_ids) and page_ids else None
+    return [get_device_info(device_id) for device_id in page_ids], next_after
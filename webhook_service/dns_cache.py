@@ -0,0 +1,224 @@
+"""
+Shared DNS Cache for Upstream Clients
+
+Every tenant Home Assistant is a public hostname; without a cache each new
+upstream connection does a blocking getaddrinfo in a thread. This cache sits
+in the transport of every pooled client (see http_clients.py):
+
+- Lookups are cached for DNS_CACHE_TTL_SECONDS (getaddrinfo exposes no
+  record TTL, so the TTL is configured; keep it at or below the records' TTL)
+- refresh_loop() re-resolves entries before they expire, so the voice-command
+  path only ever reads the cache
+- If a refresh fails, the last good addresses are served for up to
+  DNS_CACHE_STALE_SECONDS past expiry
+- Concurrent misses for one host share a single lookup
+- Per-host metrics: hits, misses, refreshes, failures, stale serves, last lookup time
+
+The transport connects to the cached IP while keeping the hostname for the
+Host header and TLS (SNI + certificate verification). If connecting fails
+it tries the host's next address, and the failed one is tried last until
+the next successful lookup.
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import ipaddress
+import os
+import socket
+import time
+
+import httpx
+
+DNS_CACHE_TTL_SECONDS = float(os.getenv("DNS_CACHE_TTL_SECONDS", 300))
+DNS_CACHE_STALE_SECONDS = float(os.getenv("DNS_CACHE_STALE_SECONDS", 3600))
+# Entries not used for this long are dropped instead of refreshed
+DNS_CACHE_IDLE_SECONDS = float(os.getenv("DNS_CACHE_IDLE_SECONDS", 3600))
+# Refresh once this fraction of the TTL has passed
+DNS_REFRESH_AHEAD = 0.8
+
+
+class DNSEntry:
+    """Cached addresses of one (host, port) plus its metrics."""
+
+    def __init__(self):
+        self.addresses: List[str] = []
+        self.expires_at = 0.0
+        self.resolved_at = 0.0
+        self.last_used = time.monotonic()
+        self.lookup: Optional[asyncio.Future] = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.stale_served = 0
+        self.last_lookup_ms = 0.0
+        self.last_error: Optional[str] = None
+        # Addresses that refused a connection since the last lookup
+        self.down: Set[str] = set()
+        self.connect_failures = 0
+
+
+class DNSCache:
+    """TTL cache over loop.getaddrinfo with refresh-ahead and serve-stale."""
+
+    def __init__(self, ttl: float = DNS_CACHE_TTL_SECONDS, stale: float = DNS_CACHE_STALE_SECONDS):
+        self.ttl = ttl
+        self.stale = stale
+        self._entries: Dict[Tuple[str, int], DNSEntry] = {}
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """
+        Addresses for host, from the cache whenever possible.
+
+        Raises:
+            OSError: Lookup failed and there is no usable stale entry
+        """
+        now = time.monotonic()
+        entry = self._entries.get((host, port))
+        if entry is None:
+            entry = self._entries[(host, port)] = DNSEntry()
+        entry.last_used = now
+
+        if entry.addresses and now < entry.expires_at:
+            entry.hits += 1
+            return self._up_first(entry)
+
+        entry.misses += 1
+        try:
+            await self._lookup(host, port, entry)
+        except OSError:
+            if entry.addresses and now < entry.expires_at + self.stale:
+                entry.stale_served += 1
+                return self._up_first(entry)
+            raise
+        return self._up_first(entry)
+
+    @staticmethod
+    def _up_first(entry: DNSEntry) -> List[str]:
+        if not entry.down:
+            return entry.addresses
+        return ([address for address in entry.addresses if address not in entry.down]
+                + [address for address in entry.addresses if address in entry.down])
+
+    def mark_down(self, host: str, port: int, address: str) -> None:
+        """Try address last for host until the next successful lookup."""
+        entry = self._entries.get((host, port))
+        if entry is not None and address in entry.addresses:
+            entry.down.add(address)
+            entry.connect_failures += 1
+
+    async def _lookup(self, host: str, port: int, entry: DNSEntry) -> List[str]:
+        """Resolve once per host at a time; concurrent callers share the result."""
+        if entry.lookup is not None:
+            return await asyncio.shield(entry.lookup)
+
+        entry.lookup = asyncio.get_running_loop().create_future()
+        started = time.monotonic()
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            addresses = list(dict.fromkeys(info[4][0] for info in infos))
+            if not addresses:
+                raise socket.gaierror(f"no addresses for {host}")
+        except OSError as e:
+            entry.failures += 1
+            entry.last_error = str(e)
+            entry.lookup.set_exception(e)
+            entry.lookup.exception()  # retrieved - no warning without waiters
+            raise
+        finally:
+            entry.last_lookup_ms = (time.monotonic() - started) * 1000
+            lookup, entry.lookup = entry.lookup, None
+
+        entry.addresses = addresses
+        entry.down.clear()
+        entry.resolved_at = time.monotonic()
+        entry.expires_at = entry.resolved_at + self.ttl
+        entry.last_error = None
+        lookup.set_result(addresses)
+        return addresses
+
+    async def refresh_due(self) -> None:
+        """Re-resolve entries close to expiry; drop idle ones."""
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if now - entry.last_used > DNS_CACHE_IDLE_SECONDS:
+                del self._entries[key]
+                continue
+            if not entry.addresses or now < entry.resolved_at + self.ttl * DNS_REFRESH_AHEAD:
+                continue
+            entry.refreshes += 1
+            try:
+                await self._lookup(key[0], key[1], entry)
+            except OSError as e:
+                print(f"⚠️  DNS refresh failed for {key[0]} (serving cached addresses): {e}")
+
+    async def refresh_loop(self) -> None:
+        """Background task: keep cached entries fresh."""
+        interval = max(1.0, min(30.0, self.ttl * (1 - DNS_REFRESH_AHEAD) / 2))
+        while True:
+            await asyncio.sleep(interval)
+            await self.refresh_due()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            f"{host}:{port}": {
+                "addresses": entry.addresses,
+                "down": sorted(entry.down),
+                "connect_failures": entry.connect_failures,
+                "expires_in": round(entry.expires_at - now, 1) if entry.addresses else None,
+                "hits": entry.hits,
+                "misses": entry.misses,
+                "refreshes": entry.refreshes,
+                "failures": entry.failures,
+                "stale_served": entry.stale_served,
+                "last_lookup_ms": round(entry.last_lookup_ms, 2),
+                "last_error": entry.last_error
+            }
+            for (host, port), entry in self._entries.items()
+        }
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class CachedDNSTransport(httpx.AsyncHTTPTransport):
+    """Connects to the cached address; Host header and TLS keep the hostname."""
+
+    def __init__(self, cache: "DNSCache", **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if not host or _is_ip(host):
+            return await super().handle_async_request(request)
+
+        port = request.url.port or (443 if request.url.scheme == "https" else 80)
+        try:
+            addresses = await self.cache.resolve(host, port)
+        except OSError as e:
+            raise httpx.ConnectError(f"DNS lookup failed for {host}: {e}", request=request) from e
+
+        url = request.url
+        if url.scheme == "https":
+            request.extensions = {**request.extensions, "sni_hostname": host}
+        for index, address in enumerate(addresses):
+            # The Host header was set from the original URL when the request was built
+            request.url = url.copy_with(host=address)
+            try:
+                return await super().handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                # Nothing was sent yet, so the next address is safe to try
+                self.cache.mark_down(host, port, address)
+                if index == len(addresses) - 1:
+                    raise
+                print(f"⚠️  Connect to {host} via {address} failed ({e!r}) - trying {addresses[index + 1]}")
+
+
+DNS_CACHE = DNSCache()
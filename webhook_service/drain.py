@@ -0,0 +1,201 @@
+"""
+Graceful Drain on SIGTERM
+
+Redeploys used to kill uvicorn with HA commands and /vapi/start calls still
+in flight. With the drain controller, SIGTERM now means:
+
+1. /ready starts failing (503) so the load balancer / orchestrator stops
+   sending new traffic; responses carry "Connection: close"
+2. After DRAIN_GRACE_SECONDS, drain callbacks run (e.g. close SSE streams)
+3. In-flight requests get up to DRAIN_DEADLINE_SECONDS to finish
+4. uvicorn's own SIGTERM handling then runs (stop accepting, lifespan
+   shutdown: pools closed, state snapshot written)
+
+A second SIGTERM skips the wait. State registered with register_state() is
+written to STATE_SNAPSHOT_PATH on shutdown and restored on the next start.
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+import asyncio
+import json
+import os
+import signal
+import tempfile
+import threading
+import time
+
+DRAIN_GRACE_SECONDS = float(os.getenv("DRAIN_GRACE_SECONDS", 5))
+DRAIN_DEADLINE_SECONDS = float(os.getenv("DRAIN_DEADLINE_SECONDS", 25))
+STATE_SNAPSHOT_PATH = os.getenv("STATE_SNAPSHOT_PATH")
+
+# Not counted as in-flight work (probes, long-lived streams)
+UNTRACKED_PATHS = {"/health", "/ready", "/events/stream"}
+
+
+class DrainController:
+    """Tracks in-flight requests and runs the SIGTERM drain sequence."""
+
+    def __init__(self):
+        self.draining = False
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._drain_callbacks: List[Callable[[], Any]] = []
+        self._state: Dict[str, Tuple[Callable[[], Any], Callable[[Any], None]]] = {}
+        self._drain_task = None
+
+    # ----------------------------------------
+    # In-flight tracking
+    # ----------------------------------------
+
+    def request_started(self) -> None:
+        self.in_flight += 1
+        self._idle.clear()
+
+    def request_finished(self) -> None:
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    def on_drain(self, callback: Callable[[], Any]) -> None:
+        """Run callback once in-flight work should wind down (before waiting for it)."""
+        self._drain_callbacks.append(callback)
+
+    # ----------------------------------------
+    # SIGTERM
+    # ----------------------------------------
+
+    def install_sigterm_handler(self) -> None:
+        """
+        Wrap the current SIGTERM handler (uvicorn's) with the drain sequence.
+
+        Call from lifespan startup - uvicorn installs its handlers before that.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        original = signal.getsignal(signal.SIGTERM)
+        loop = asyncio.get_running_loop()
+
+        def handle_sigterm(sig, frame):
+            if self.draining:
+                print("🛑 Second SIGTERM - stopping without waiting")
+                _call_original(original, sig, frame)
+                return
+            self.draining = True
+            loop.call_soon_threadsafe(self._start_drain, original, sig, frame)
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+
+    def _start_drain(self, original, sig, frame) -> None:
+        self._drain_task = asyncio.ensure_future(self._drain_then_exit(original, sig, frame))
+
+    async def _drain_then_exit(self, original, sig, frame) -> None:
+        print(f"🛑 SIGTERM - draining: readiness failing, {self.in_flight} request(s) in flight")
+        await asyncio.sleep(DRAIN_GRACE_SECONDS)
+
+        for callback in self._drain_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️  Drain callback failed: {e}")
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._idle.wait(), DRAIN_DEADLINE_SECONDS)
+            print(f"✅ Drained in {time.monotonic() - started:.1f}s")
+        except asyncio.TimeoutError:
+            print(f"⚠️  Drain deadline hit with {self.in_flight} request(s) still in flight")
+
+        _call_original(original, sig, frame)
+
+    # ----------------------------------------
+    # State snapshot
+    # ----------------------------------------
+
+    def register_state(self, name: str, dump: Callable[[], Any], restore: Callable[[Any], None]) -> None:
+        """dump() must return JSON-serializable data; restore(data) gets it back on start."""
+        self._state[name] = (dump, restore)
+
+    def save_snapshot(self) -> None:
+        if not STATE_SNAPSHOT_PATH:
+            return
+
+        snapshot = {"saved_at": time.time(), "state": {}}
+        for name, (dump, _) in self._state.items():
+            try:
+                snapshot["state"][name] = dump()
+            except Exception as e:
+                print(f"⚠️  Could not snapshot {name}: {e}")
+
+        directory = os.path.dirname(os.path.abspath(STATE_SNAPSHOT_PATH))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+        try:
+            os.fchmod(fd, 0o600)  # sessions and tool results
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, STATE_SNAPSHOT_PATH)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        print(f"💾 State snapshot written: {', '.join(snapshot['state'])}")
+
+    def restore_snapshot(self) -> None:
+        if not STATE_SNAPSHOT_PATH:
+            return
+        try:
+            with open(STATE_SNAPSHOT_PATH) as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            print(f"⚠️  Ignoring unreadable state snapshot: {e}")
+            return
+
+        age = time.time() - snapshot.get("saved_at", 0)
+        for name, data in snapshot.get("state", {}).items():
+            if name not in self._state:
+                continue
+            try:
+                self._state[name][1](data)
+            except Exception as e:
+                print(f"⚠️  Could not restore {name}: {e}")
+        print(f"♻️  State restored from snapshot ({age:.0f}s old)")
+
+
+def _call_original(original, sig, frame) -> None:
+    if callable(original):
+        original(sig, frame)
+    else:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+
+class InFlightMiddleware:
+    """ASGI middleware: counts in-flight requests; adds Connection: close while draining."""
+
+    def __init__(self, app, controller: DrainController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in UNTRACKED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and controller.draining:
+                message = {**message, "headers": [*message.get("headers", []), (b"connection", b"close")]}
+            await send(message)
+
+        controller.request_started()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            controller.request_finished()
+
+
+DRAIN = DrainController()
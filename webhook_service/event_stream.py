@@ -0,0 +1,212 @@
+"""
+Live Call-Status Stream (Server-Sent Events fan-out)
+
+Pushes call status, tool-call outcomes and device online state to ops
+dashboards instead of making them poll.
+
+- publish() serializes each event once into an SSE frame and offers it to
+  every matching subscriber with put_nowait - the webhook path never waits
+- Each subscriber has a bounded buffer (STREAM_SUBSCRIBER_BUFFER frames);
+  a subscriber that falls behind is dropped (told so, then disconnected)
+- Subscribers are indexed by tenant, so a publish touches only that tenant's
+  subscribers plus the all-tenant (admin) ones
+- Device-scoped subscribers (device JWT) only get events about their own
+  device - the rest of the tenant's calls stay hidden from a single Pi.
+  Their stream ends (with a "closed" frame) when the token expires or the
+  device / customer is revoked; the generations are re-checked before every
+  frame and heartbeat
+- Device presence: online on any authenticated request, offline after
+  DEVICE_OFFLINE_SECONDS without one (a Pi refreshes its token every ~13 min)
+- EventSource cannot send headers, so the stream accepts ?token=;
+  redact_access_log_tokens() keeps those values out of uvicorn's access log
+"""
+
+from typing import Any, Dict, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+
+from device_auth import token_generations_current
+
+STREAM_SUBSCRIBER_BUFFER = int(os.getenv("STREAM_SUBSCRIBER_BUFFER", 256))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", 15))
+DEVICE_OFFLINE_SECONDS = float(os.getenv("DEVICE_OFFLINE_SECONDS", 20 * 60))
+
+# Frame that tells a dropped subscriber why the stream ended
+_DROPPED_FRAME = 'event: dropped\ndata: {"reason": "subscriber too slow"}\n\n'
+
+
+_TOKEN_QUERY_RE = re.compile(r"(?<=[?&]token=)[^&\s]+")
+
+
+def sse_frame(event_type: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class _RedactQueryTokens(logging.Filter):
+    """Replace ?token= values in access log lines with [redacted]."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                _TOKEN_QUERY_RE.sub("[redacted]", arg) if isinstance(arg, str) else arg
+                for arg in record.args
+            )
+        return True
+
+
+def redact_access_log_tokens() -> None:
+    logging.getLogger("uvicorn.access").addFilter(_RedactQueryTokens())
+
+
+class Subscriber:
+    """One connected dashboard."""
+
+    def __init__(self, customer_id: Optional[str], device_id: Optional[str] = None,
+                 token: Optional[Dict[str, Any]] = None):
+        self.customer_id = customer_id  # None = all tenants
+        self.device_id = device_id  # set = only events about this device
+        self.token = token  # device JWT payload (None for the admin key)
+        # +2 leaves room for the dropped frame and the end sentinel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_SUBSCRIBER_BUFFER + 2)
+        self.dropped = False
+
+    def offer(self, frame: str) -> bool:
+        """Queue a frame; False if the subscriber's buffer is full."""
+        if self.queue.qsize() >= STREAM_SUBSCRIBER_BUFFER:
+            return False
+        self.queue.put_nowait(frame)
+        return True
+
+
+class EventHub:
+    """Tenant-indexed SSE fan-out."""
+
+    def __init__(self):
+        self._subscribers: Dict[Optional[str], Set[Subscriber]] = {}
+        # (customer_id, device_id) → last seen
+        self._devices: Dict[Tuple[str, str], float] = {}
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    # ----------------------------------------
+    # Subscribers
+    # ----------------------------------------
+
+    def subscribe(self, customer_id: Optional[str], device_id: Optional[str] = None,
+                  token: Optional[Dict[str, Any]] = None) -> Subscriber:
+        subscriber = Subscriber(customer_id, device_id, token)
+        self._subscribers.setdefault(customer_id, set()).add(subscriber)
+        devices = self.device_states(customer_id)
+        if device_id:
+            devices = {device: state for device, state in devices.items() if device == device_id}
+        subscriber.offer(sse_frame("snapshot", {"devices": devices}))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.customer_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.customer_id]
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        self.unsubscribe(subscriber)
+        subscriber.dropped = True
+        self.dropped_subscribers += 1
+        subscriber.queue.put_nowait(_DROPPED_FRAME)
+        subscriber.queue.put_nowait(None)
+
+    async def stream(self, subscriber: Subscriber):
+        """Async generator of SSE frames for StreamingResponse (with heartbeats)."""
+        token = subscriber.token
+        try:
+            while True:
+                timeout = STREAM_HEARTBEAT_SECONDS
+                if token is not None:
+                    timeout = max(0.0, min(timeout, token["exp"] - time.time()))
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    frame = ": keepalive\n\n"
+                if frame is None:
+                    return
+                if token is not None:
+                    if time.time() >= token["exp"]:
+                        yield sse_frame("closed", {"reason": "token expired"})
+                        return
+                    if not token_generations_current(token):
+                        yield sse_frame("closed", {"reason": "token revoked"})
+                        return
+                yield frame
+        finally:
+            self.unsubscribe(subscriber)
+
+    # ----------------------------------------
+    # Publishing (never blocks)
+    # ----------------------------------------
+
+    def publish(self, customer_id: Optional[str], event_type: str, data: Dict[str, Any]) -> None:
+        targets = self._subscribers.get(customer_id, set()) | self._subscribers.get(None, set())
+        if not targets:
+            return
+
+        frame = sse_frame(event_type, {"customer_id": customer_id, "ts": time.time(), **data})
+        self.published += 1
+        device_id = data.get("device_id")
+        for subscriber in list(targets):
+            if subscriber.device_id and subscriber.device_id != device_id:
+                continue
+            if not subscriber.offer(frame):
+                self._drop(subscriber)
+
+    # ----------------------------------------
+    # Device presence
+    # ----------------------------------------
+
+    def device_seen(self, customer_id: Optional[str], device_id: Optional[str]) -> None:
+        if not customer_id or not device_id:
+            return
+        key = (customer_id, device_id)
+        was_online = key in self._devices
+        self._devices[key] = time.time()
+        if not was_online:
+            self.publish(customer_id, "device", {"device_id": device_id, "online": True})
+
+    def device_states(self, customer_id: Optional[str]) -> Dict[str, Any]:
+        return {
+            device_id: {"customer_id": tenant, "online": True, "last_seen": last_seen}
+            for (tenant, device_id), last_seen in self._devices.items()
+            if customer_id is None or tenant == customer_id
+        }
+
+    async def presence_loop(self) -> None:
+        """Background task: mark devices offline after DEVICE_OFFLINE_SECONDS of silence."""
+        while True:
+            await asyncio.sleep(30)
+            cutoff = time.time() - DEVICE_OFFLINE_SECONDS
+            for key, last_seen in list(self._devices.items()):
+                if last_seen < cutoff:
+                    del self._devices[key]
+                    self.publish(key[0], "device", {"device_id": key[1], "online": False, "last_seen": last_seen})
+
+    def close(self) -> None:
+        """End every stream (shutdown)."""
+        for subscribers in list(self._subscribers.values()):
+            for subscriber in list(subscribers):
+                self.unsubscribe(subscriber)
+                subscriber.queue.put_nowait(None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+            "dropped_subscribers": self.dropped_subscribers,
+            "online_devices": len(self._devices)
+        }
+
+
+EVENT_HUB = EventHub()
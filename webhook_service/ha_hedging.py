@@ -0,0 +1,197 @@
+"""
+Adaptive Timeouts and Hedged Requests for Home Assistant
+
+Customer HAs sit behind home internet connections: usually fast, sometimes a
+request stalls for seconds. A fixed 10s timeout and a single attempt means
+the occasional stall is what the user hears. Instead:
+
+- Per-tenant latency tracking: two rotating LatencySketches (the last
+  HA_LATENCY_WINDOW..2x requests), so percentiles follow recent behaviour
+- Adaptive timeout: p99 x HA_TIMEOUT_MULTIPLIER, clamped to
+  [HA_TIMEOUT_MIN_SECONDS, HA_TIMEOUT_MAX_SECONDS]; the max is used until
+  HA_LATENCY_MIN_SAMPLES requests have been seen. Timeouts count as samples
+  (at the timeout value) so a degrading link raises its own timeout, and so
+  does a first attempt cancelled by a winning hedge or a caller's deadline
+  (at its elapsed time, a lower bound) - otherwise only the fast responses
+  would be sampled and the hedge delay would keep shrinking
+- Hedging: for idempotent actions (absolute states like turn_on or medium,
+  never toggles), if the first attempt is still running at the tenant's p95
+  a second attempt fires; the first response wins, the other is cancelled
+- Global hedge budget: every request earns HA_HEDGE_BUDGET_RATIO of a
+  token (capped at HA_HEDGE_BUDGET_BURST), every hedge spends one - hedges
+  stay at ~10% of HA traffic even when every tenant is slow
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import os
+import time
+
+import httpx
+
+from call_stats import LatencySketch
+
+HA_TIMEOUT_MIN_SECONDS = float(os.getenv("HA_TIMEOUT_MIN_SECONDS", 3))
+HA_TIMEOUT_MAX_SECONDS = float(os.getenv("HA_TIMEOUT_MAX_SECONDS", 10))
+HA_TIMEOUT_MULTIPLIER = float(os.getenv("HA_TIMEOUT_MULTIPLIER", 3))
+HA_LATENCY_WINDOW = int(os.getenv("HA_LATENCY_WINDOW", 200))
+HA_LATENCY_MIN_SAMPLES = int(os.getenv("HA_LATENCY_MIN_SAMPLES", 20))
+
+HA_HEDGE_ENABLED = os.getenv("HA_HEDGE_ENABLED", "1") == "1"
+HA_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HA_HEDGE_MIN_DELAY_SECONDS", 0.05))
+HA_HEDGE_BUDGET_RATIO = float(os.getenv("HA_HEDGE_BUDGET_RATIO", 0.1))
+HA_HEDGE_BUDGET_BURST = float(os.getenv("HA_HEDGE_BUDGET_BURST", 10))
+
+# Actions that set an absolute state - sending one twice is harmless
+IDEMPOTENT_ACTIONS = set(
+    os.getenv("HA_IDEMPOTENT_ACTIONS", "turn_on,turn_off,on,off,low,medium,high,open,close,lock,unlock").split(",")
+)
+
+
+def is_idempotent(action: str) -> bool:
+    return action.strip().lower() in IDEMPOTENT_ACTIONS
+
+
+class TenantLatency:
+    """Recent HA latency of one tenant (current + previous window)."""
+
+    def __init__(self):
+        self.current = LatencySketch()
+        self.previous = LatencySketch()
+
+    def observe(self, latency: float) -> None:
+        if self.current.count >= HA_LATENCY_WINDOW:
+            self.previous, self.current = self.current, LatencySketch()
+        self.current.add(latency)
+
+    @property
+    def count(self) -> int:
+        return self.current.count + self.previous.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count < HA_LATENCY_MIN_SAMPLES:
+            return None
+        merged = LatencySketch()
+        merged.merge(self.previous)
+        merged.merge(self.current)
+        return merged.quantile(q)
+
+
+class HAHedger:
+    """Adaptive timeouts + budgeted hedging around one HA request."""
+
+    def __init__(self):
+        self._tenants: Dict[str, TenantLatency] = {}
+        self._budget = HA_HEDGE_BUDGET_BURST
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_denied = 0
+
+    def _latency(self, customer_id: Optional[str]) -> TenantLatency:
+        key = customer_id or "default"
+        latency = self._tenants.get(key)
+        if latency is None:
+            latency = self._tenants[key] = TenantLatency()
+        return latency
+
+    def timeout_for(self, customer_id: Optional[str]) -> float:
+        p99 = self._latency(customer_id).quantile(0.99)
+        if p99 is None:
+            return HA_TIMEOUT_MAX_SECONDS
+        return min(HA_TIMEOUT_MAX_SECONDS, max(HA_TIMEOUT_MIN_SECONDS, p99 * HA_TIMEOUT_MULTIPLIER))
+
+    def hedge_delay(self, customer_id: Optional[str]) -> Optional[float]:
+        """The tenant's p95, or None while there are too few samples to hedge."""
+        p95 = self._latency(customer_id).quantile(0.95)
+        return None if p95 is None else max(HA_HEDGE_MIN_DELAY_SECONDS, p95)
+
+    def _spend_hedge(self) -> bool:
+        if self._budget < 1:
+            self.hedges_denied += 1
+            return False
+        self._budget -= 1
+        return True
+
+    async def run(self, customer_id: Optional[str],
+                  send: Callable[[float], Awaitable[httpx.Response]],
+                  idempotent: bool) -> httpx.Response:
+        """
+        send(timeout) once, or twice (hedged) for a slow idempotent request.
+
+        Returns:
+            The first response
+        Raises:
+            httpx.HTTPError if every attempt failed
+        """
+        latency = self._latency(customer_id)
+        timeout = self.timeout_for(customer_id)
+        delay = self.hedge_delay(customer_id) if idempotent and HA_HEDGE_ENABLED else None
+        self.requests += 1
+        self._budget = min(HA_HEDGE_BUDGET_BURST, self._budget + HA_HEDGE_BUDGET_RATIO)
+
+        async def attempt(primary: bool) -> httpx.Response:
+            started = time.perf_counter()
+            try:
+                response = await send(timeout)
+            except httpx.TimeoutException:
+                latency.observe(timeout)
+                raise
+            except asyncio.CancelledError:
+                # A losing hedge started late; its elapsed time says nothing about the tail
+                if primary:
+                    latency.observe(time.perf_counter() - started)
+                raise
+            latency.observe(time.perf_counter() - started)
+            return response
+
+        first = asyncio.ensure_future(attempt(primary=True))
+        if delay is None or delay >= timeout:
+            return await first
+
+        attempts = [first]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if done or not self._spend_hedge():
+                return await first
+
+            self.hedges += 1
+            attempts.append(asyncio.ensure_future(attempt(primary=False)))
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()  # the losing attempt (no-op once done)
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_denied": self.hedges_denied,
+            "hedge_budget": round(self._budget, 2),
+            "tenants": {
+                tenant: {
+                    "samples": latency.count,
+                    "p50_ms": ms(latency.quantile(0.5)),
+                    "p95_ms": ms(latency.quantile(0.95)),
+                    "timeout_ms": ms(self.timeout_for(None if tenant == "default" else tenant))
+                }
+                for tenant, latency in self._tenants.items()
+            }
+        }
+
+
+HA_HEDGER = HAHedger()
@@ -0,0 +1,37 @@
+import asyncio
+
+import ha_hedging
+from ha_hedging import HAHedger
+
+
+def test_hedge_delay_holds_when_hedges_keep_winning(monkeypatch):
+    monkeypatch.setattr(ha_hedging, "HA_LATENCY_WINDOW", 20)
+    monkeypatch.setattr(ha_hedging, "HA_HEDGE_MIN_DELAY_SECONDS", 0.0)
+    monkeypatch.setattr(ha_hedging, "HA_HEDGE_BUDGET_RATIO", 1.0)
+    monkeypatch.setattr(ha_hedging, "HA_HEDGE_BUDGET_BURST", 1000.0)
+    hedger = HAHedger()
+
+    # Every 4th first attempt stalls; the hedge is always fast
+    slow, fast = 0.05, 0.001
+    for i in range(40):
+        hedger._latency("t").observe(slow if i % 4 == 0 else fast)
+    initial_delay = hedger.hedge_delay("t")
+    assert initial_delay >= slow * 0.9
+
+    async def run_requests():
+        for i in range(80):
+            attempts = 0
+
+            async def send(timeout):
+                nonlocal attempts
+                attempts += 1
+                await asyncio.sleep(slow * 10 if attempts == 1 and i % 4 == 0 else fast)
+                return "ok"
+
+            assert await hedger.run("t", send, idempotent=True) == "ok"
+
+    asyncio.run(run_requests())
+
+    assert hedger.hedge_wins >= 15
+    # Both latency windows have rotated; the stalled first attempts still count
+    assert hedger.hedge_delay("t") >= initial_delay * 0.9
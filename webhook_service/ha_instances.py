@@ -6,6 +6,11 @@ Simplified Authentication - No Passwords Required!
 - ha_url: Home Assistant instance URL
 - ha_webhook_id: Webhook ID for this instance
 - name: Friendly name for the location
+- sites (optional): several HA instances for one customer (e.g. one per
+  building), each {site_id, ha_url, ha_webhook_id, name, tags}. Without it
+  the customer has one site, "main", built from the fields above. Tool calls
+  pick sites by site_id, name or tag ("all" = every site); the first site is
+  the default target
 
 Authentication Flow:
 1. VAPI sends Bearer token + x-customer-id header
@@ -14,7 +19,10 @@ Authentication Flow:
 4. Commands routed to customer's HA instance
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+# Bumped on every change so compiled routing tables know to rebuild (see routing.py)
+HA_INSTANCES_VERSION = 0
 
 # Home Assistant instances configuration
 # In production, load from environment variables or database
@@ -32,6 +40,19 @@ HA_INSTANCES = {
     #     "ha_webhook_id": "vapi_air_circulator",
     #     "name": "Customer 2 Home"
     # },
+    # Several buildings for one customer:
+    # "propertyco": {
+    #     "customer_id": "propertyco",
+    #     "ha_url": "https://propertyco-a.homeadapt.us",
+    #     "ha_webhook_id": "vapi_air_circulator",
+    #     "name": "PropertyCo",
+    #     "sites": [
+    #         {"site_id": "building_a", "ha_url": "https://propertyco-a.homeadapt.us",
+    #          "ha_webhook_id": "vapi_air_circulator", "name": "Building A", "tags": ["north"]},
+    #         {"site_id": "building_b", "ha_url": "https://propertyco-b.homeadapt.us",
+    #          "ha_webhook_id": "vapi_air_circulator", "name": "Building B", "tags": ["south"]}
+    #     ]
+    # },
 }
 
 
@@ -44,6 +65,65 @@ def get_ha_instance(customer_id: str) -> Optional[Dict[str, Any]]:
     return HA_INSTANCES.get(customer_id)
 
 
+def get_ha_sites(customer_id: str) -> List[Dict[str, Any]]:
+    """
+    A customer's HA sites (the primary instance as site "main" if it has no sites list).
+
+    Returns:
+        [{"site_id", "ha_url", "ha_webhook_id", "name", "tags"}, ...] - empty for unknown customers
+    """
+    instance = HA_INSTANCES.get(customer_id)
+    if not instance:
+        return []
+    if instance.get("sites"):
+        return instance["sites"]
+    return [{
+        "site_id": "main",
+        "ha_url": instance.get("ha_url"),
+        "ha_webhook_id": instance.get("ha_webhook_id"),
+        "name": instance.get("name", "your home"),
+        "tags": []
+    }]
+
+
 def get_all_customers() -> list:
     """Get list of all customer IDs."""
     return list(HA_INSTANCES.keys())
+
+
+def register_ha_instance(customer_id: str, ha_url: str, ha_webhook_id: str, name: str) -> Dict[str, Any]:
+    """Add or replace a customer's HA instance."""
+    global HA_INSTANCES_VERSION
+    instance = {
+        "customer_id": customer_id,
+        "ha_url": ha_url,
+        "ha_webhook_id": ha_webhook_id,
+        "name": name
+    }
+    HA_INSTANCES[customer_id] = instance
+    HA_INSTANCES_VERSION += 1
+    return instance
+
+
+def register_ha_site(customer_id: str, site_id: str, ha_url: str, ha_webhook_id: str,
+                     name: str, tags: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Add or replace one site of an existing customer.
+
+    Raises:
+        KeyError: Unknown customer_id
+    """
+    global HA_INSTANCES_VERSION
+    instance = HA_INSTANCES[customer_id]
+    site = {
+        "site_id": site_id,
+        "ha_url": ha_url,
+        "ha_webhook_id": ha_webhook_id,
+        "name": name,
+        "tags": list(tags or [])
+    }
+    sites = [s for s in get_ha_sites(customer_id) if s["site_id"] != site_id]
+    sites.append(site)
+    instance["sites"] = sites
+    HA_INSTANCES_VERSION += 1
+    return site
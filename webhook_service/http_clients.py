@@ -0,0 +1,70 @@
+"""
+Shared Upstream HTTP Clients
+
+One pooled httpx.AsyncClient per upstream instead of a new client (and a new
+TCP + TLS handshake) per request.
+
+- get_vapi_client(): VAPI REST API
+- get_ha_client(ha_url): one client per customer Home Assistant instance
+- close_http_clients(): called on shutdown
+
+All clients resolve hostnames through the shared DNS cache (dns_cache.py).
+"""
+
+from typing import Dict, Optional
+import os
+
+import httpx
+
+from dns_cache import DNS_CACHE, CachedDNSTransport
+
+# VAPI REST API base URL (point at vapi_standin.py for offline benchmarking)
+VAPI_BASE_URL = os.getenv("VAPI_BASE_URL", "https://api.vapi.ai").rstrip("/")
+
+# Connection pool limits per upstream
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 100))
+UPSTREAM_KEEPALIVE_SECONDS = float(os.getenv("UPSTREAM_KEEPALIVE_SECONDS", 60))
+
+_vapi_client: Optional[httpx.AsyncClient] = None
+_ha_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS,
+        keepalive_expiry=UPSTREAM_KEEPALIVE_SECONDS
+    )
+
+
+def _transport() -> CachedDNSTransport:
+    return CachedDNSTransport(DNS_CACHE, limits=_limits())
+
+
+def get_vapi_client() -> httpx.AsyncClient:
+    """Pooled client for the VAPI REST API."""
+    global _vapi_client
+    if _vapi_client is None or _vapi_client.is_closed:
+        _vapi_client = httpx.AsyncClient(base_url=VAPI_BASE_URL, transport=_transport(), timeout=30.0)
+    return _vapi_client
+
+
+def get_ha_client(ha_url: str) -> httpx.AsyncClient:
+    """Pooled client for one Home Assistant instance (keyed by base URL)."""
+    ha_url = ha_url.rstrip("/")
+    client = _ha_clients.get(ha_url)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(base_url=ha_url, transport=_transport(), timeout=10.0)
+        _ha_clients[ha_url] = client
+    return client
+
+
+async def close_http_clients() -> None:
+    """Close all pooled upstream clients."""
+    global _vapi_client
+    if _vapi_client is not None:
+        await _vapi_client.aclose()
+        _vapi_client = None
+    for client in _ha_clients.values():
+        await client.aclose()
+    _ha_clients.clear()
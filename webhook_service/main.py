@@ -9,15 +9,25 @@ Tier 0 Security Architecture:
 - Pi calls proxy endpoints with JWT token
 - Proxy holds VAPI_API_KEY and forwards requests
 - Supports token refresh for ongoing sessions
+- Tokens signed with asymmetric keys (kid header); public keys at /.well-known/jwks.json
 
 Updated: 2025-10-09 - Secure proxy with JWT tokens
 """
 
-from fastapi import FastAPI, Request, Query, HTTPException, Header, Depends
+from fastapi import FastAPI, Request, Response, Query, HTTPException, Header, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import ValidationError
+from typing import Optional, Dict, Any, List, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import hashlib
+import hmac
+import io
+import json
 import os
+import tempfile
 import uuid
 import time
 import httpx
@@ -25,15 +35,98 @@ import httpx
 # Import modules
 from ha_instances import get_ha_instance
 from device_auth import (
-    validate_device_credentials,
+    validate_device_credentials_async,
     generate_device_token,
     verify_device_token,
     get_device_info,
     get_customer_id_from_device,
+    list_devices_page,
+    revoke_device,
+    revoke_device_tokens,
+    revoke_customer_tokens,
+    snapshot_token_generations,
+    restore_token_generations,
     TOKEN_TTL_MINUTES
 )
+from signing_keys import KEY_SET, key_maintenance_loop
+from http_clients import close_http_clients
+from call_pool import CallPool, CALL_POOL_ENABLED
+from tool_dedup import ToolCallCache, tool_call_key
+from call_journal import CALL_JOURNAL
+from call_stats import CALL_STATS
+from event_stream import EVENT_HUB, redact_access_log_tokens
+from routing import ROUTING_TABLE, DEFAULT_ROUTE, Route, ha_tool_payload
+from drain import DRAIN, InFlightMiddleware
+from warmup import WARMUP_STATE, warm_up
+from dns_cache import DNS_CACHE
+from ha_hedging import HA_HEDGER, is_idempotent
+from conversation_tracker import CONVERSATIONS
+from call_context import CALL_CONTEXTS
+from scheduled_commands import SCHEDULER, ScheduledCommand, format_delay
+from webhook_models import (
+    VapiWebhookRequest,
+    StatusUpdateMessage,
+    TranscriptMessage,
+    ConversationUpdateMessage,
+    EndOfCallReportMessage,
+    AssistantRequestMessage,
+    ConversationStartedMessage,
+    ToolCallsMessage,
+    FunctionCall,
+    AirCirculatorCall,
+    FrontDoorCall,
+    HomeAuthCall,
+    ScheduleCommandCall,
+    ListScheduledCall,
+    CancelScheduledCall,
+    parse_webhook
+)
+import provisioning
+import vapi_api
+
+
+async def _pool_create_call(assistant_id: str, assistant_overrides: Dict[str, Any]) -> Dict[str, Any]:
+    return await vapi_api.create_web_call(os.getenv("VAPI_API_KEY"), assistant_id, assistant_overrides)
+
+
+async def _pool_end_call(call_id: str) -> Dict[str, Any]:
+    return await vapi_api.end_call(os.getenv("VAPI_API_KEY"), call_id)
+
+
+# Tool-call results by toolCallId (VAPI redeliveries run the HA action once)
+TOOL_CALL_CACHE = ToolCallCache()
 
-app = FastAPI(title="VAPI Secure Proxy", version="4.0.0")  # Secure Proxy with JWT
+# Warm pool of pre-created web calls (only used when VAPI_CALL_POOL_ENABLED=1)
+CALL_POOL = CallPool(_pool_create_call, _pool_end_call)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start/stop background tasks; restore/snapshot state across restarts."""
+    DRAIN.restore_snapshot()
+    DRAIN.install_sigterm_handler()
+    tasks = [
+        asyncio.create_task(key_maintenance_loop()),
+        asyncio.create_task(EVENT_HUB.presence_loop()),
+        asyncio.create_task(warm_up()),
+        asyncio.create_task(DNS_CACHE.refresh_loop())
+    ]
+    if CALL_POOL_ENABLED:
+        tasks.append(asyncio.create_task(CALL_POOL.maintenance_loop()))
+    CALL_JOURNAL.start()
+    SCHEDULER.start(fire_scheduled_command)
+    yield
+    for task in tasks:
+        task.cancel()
+    EVENT_HUB.close()
+    await SCHEDULER.close()
+    await CALL_POOL.close()
+    await CALL_JOURNAL.close()
+    await close_http_clients()
+    DRAIN.save_snapshot()
+
+
+app = FastAPI(title="VAPI Secure Proxy", version="4.0.0", lifespan=lifespan)  # Secure Proxy with JWT
 
 # Enable CORS for VAPI
 app.add_middleware(
@@ -44,13 +137,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# In-flight request tracking for graceful drain on SIGTERM
+app.add_middleware(InFlightMiddleware, controller=DRAIN)
+
+# /events/stream?token= (EventSource) must not end up in access logs
+redact_access_log_tokens()
+
 # VAPI API Key for Bearer token validation
 VAPI_API_KEY = os.getenv("VAPI_API_KEY", "e4077034-d96a-41c7-8f49-e36accb11fb4")
 
+# Admin API key for call history / stats endpoints (unset = admin endpoints disabled)
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+
 # Home Assistant configuration
 HOMEASSISTANT_URL = os.getenv("HOMEASSISTANT_URL", "https://ut-demo-urbanjungle.homeadapt.us")
 HOMEASSISTANT_WEBHOOK_ID = os.getenv("HOMEASSISTANT_WEBHOOK_ID", "vapi_air_circulator")
 
+# Per-site time limit when one tool call fans out to several HA sites
+HA_SITE_TIMEOUT_SECONDS = float(os.getenv("HA_SITE_TIMEOUT_SECONDS", 5))
+
 # Session timeout (7 days in seconds) - increased for reliable authentication
 SESSION_TIMEOUT = 7 * 24 * 60 * 60
 
@@ -58,24 +163,41 @@ SESSION_TIMEOUT = 7 * 24 * 60 * 60
 sessions: Dict[str, Dict[str, Any]] = {}
 
 
-class VapiMessage(BaseModel):
-    """VAPI message structure"""
-    type: str
-    role: Optional[str] = None
-    content: Optional[str] = None
-    toolCalls: Optional[list] = None
+def _dump_sessions() -> Dict[str, Dict[str, Any]]:
+    cutoff = time.time() - SESSION_TIMEOUT
+    return {sid: session for sid, session in sessions.items() if session.get("created_at", 0) > cutoff}
+
 
+def _dump_tool_call_cache() -> Dict[str, Any]:
+    return {"saved_at": time.time(), "entries": TOOL_CALL_CACHE.snapshot()}
 
-class VapiCall(BaseModel):
-    """VAPI call information"""
-    id: Optional[str] = None
-    assistantId: Optional[str] = None
 
+def _restore_tool_call_cache(data: Dict[str, Any]) -> None:
+    TOOL_CALL_CACHE.restore(data["entries"], elapsed=time.time() - data["saved_at"])
 
-class VapiWebhookRequest(BaseModel):
-    """VAPI webhook request payload"""
-    message: VapiMessage
-    call: Optional[VapiCall] = None
+
+# State carried across restarts (written on shutdown when STATE_SNAPSHOT_PATH is set)
+DRAIN.register_state("sessions", _dump_sessions, sessions.update)
+DRAIN.register_state("tool_call_cache", _dump_tool_call_cache, _restore_tool_call_cache)
+DRAIN.register_state("token_generations", snapshot_token_generations, restore_token_generations)
+# Close SSE streams at drain start so they don't hold the shutdown open
+DRAIN.on_drain(EVENT_HUB.close)
+
+
+async def read_webhook(request: Request) -> VapiWebhookRequest:
+    """
+    Validate a VAPI webhook body into typed models (see webhook_models.py).
+
+    Raises:
+        HTTPException 422 for invalid JSON or a malformed envelope
+    """
+    try:
+        return parse_webhook(await request.body())
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=e.errors(include_url=False, include_context=False, include_input=False)
+        )
 
 
 def validate_vapi_request(authorization: Optional[str] = Header(None),
@@ -108,6 +230,32 @@ def validate_vapi_request(authorization: Optional[str] = Header(None),
     return x_customer_id
 
 
+def verify_admin_key(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Dependency for operator-only endpoints (Bearer ADMIN_API_KEY).
+
+    Raises:
+        HTTPException 503 if ADMIN_API_KEY is not configured, 401 if invalid
+    """
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=503, detail="Admin API disabled (ADMIN_API_KEY not set)")
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
+    if not hmac.compare_digest(authorization[7:], ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+
+def require_token_signing() -> None:
+    """
+    Dependency for endpoints that issue device tokens.
+
+    Raises:
+        HTTPException 503 on a verify-only node (JWT_SIGNING_ENABLED=0)
+    """
+    if not KEY_SET.signing_enabled:
+        raise HTTPException(status_code=503, detail="This node does not issue tokens (verify-only)")
+
+
 def verify_device_jwt(authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
     """
     Dependency to verify device JWT token.
@@ -129,36 +277,113 @@ def verify_device_jwt(authorization: Optional[str] = Header(None)) -> Dict[str,
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+    EVENT_HUB.device_seen(payload.get("customer_id"), payload.get("device_id"))
     return payload
 
 
+def build_vapi_config(device_id: str, customer_id: str) -> Dict[str, Any]:
+    """
+    VAPI configuration for a device.
+
+    Raises:
+        HTTPException if VAPI_API_KEY is not configured
+    """
+    vapi_api_key = os.getenv("VAPI_API_KEY")
+    vapi_assistant_id = os.getenv("VAPI_ASSISTANT_ID", "31377f1e-dd62-43df-bc3c-ca8e87e08138")
+
+    if not vapi_api_key:
+        raise HTTPException(status_code=500, detail="VAPI_API_KEY not configured on server")
+
+    return {
+        "api_key": vapi_api_key,
+        "assistant_id": vapi_assistant_id,
+        "device_id": device_id,
+        "customer_id": customer_id
+    }
+
+
+def vapi_config_etag(vapi_config: Dict[str, Any]) -> str:
+    """Strong ETag (config version) for a VAPI config."""
+    digest = hashlib.sha256(json.dumps(vapi_config, sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates or "*" in candidates
+
+
+def _json_bytes(content: Dict[str, Any]) -> bytes:
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+# Constant responses, serialized once at import
+_ROOT_BODY = _json_bytes({
+    "service": "VAPI Secure Proxy",
+    "status": "healthy",
+    "version": "4.0.0",
+    "auth": "Device JWT tokens (15 min TTL)",
+    "endpoints": {
+        "device_auth": "/device/auth",
+        "device_bootstrap": "/device/bootstrap",
+        "token_refresh": "/device/refresh",
+        "jwks": "/.well-known/jwks.json",
+        "vapi_proxy": "/vapi/*",
+        "call_history": "/calls/{call_id}/events",
+        "stats": "/stats",
+        "event_stream": "/events/stream",
+        "readiness": "/ready"
+    }
+})
+_HEALTH_BODY = _json_bytes({"status": "healthy"})
+_READY_BODY = _json_bytes({"status": "ready"})
+_WARMING_BODY = _json_bytes({"status": "warming up"})
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
-    return {
-        "service": "VAPI Secure Proxy",
-        "status": "healthy",
-        "version": "4.0.0",
-        "auth": "Device JWT tokens (15 min TTL)",
-        "endpoints": {
-            "device_auth": "/device/auth",
-            "token_refresh": "/device/refresh",
-            "vapi_proxy": "/vapi/*"
-        }
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health")
 async def health():
-    """Health check for Railway"""
-    return {"status": "healthy"}
+    """Health check for Railway (liveness - stays healthy while draining)"""
+    return Response(content=_HEALTH_BODY, media_type="application/json")
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: 503 until the startup warm-up has finished and again once
+    SIGTERM starts the drain, so traffic is only routed to a warm instance.
+    """
+    if DRAIN.draining:
+        return JSONResponse(status_code=503, content={"status": "draining", "in_flight": DRAIN.in_flight})
+    if not WARMUP_STATE["done"]:
+        return Response(content=_WARMING_BODY, status_code=503, media_type="application/json")
+    return Response(content=_READY_BODY, media_type="application/json")
+
+
+@app.get("/.well-known/jwks.json")
+async def jwks():
+    """
+    Public keys for verifying device tokens.
+
+    Lets other nodes/sidecars verify tokens without holding the signing key.
+    Includes retired keys until every token they signed has expired.
+    """
+    return KEY_SET.jwks()
 
 
 # ========================================
 # Device Authentication Endpoints
 # ========================================
 
-@app.post("/device/auth")
+@app.post("/device/auth", dependencies=[Depends(require_token_signing)])
 async def device_authenticate(request: Request):
     """
     Authenticate device and issue short-lived JWT token.
@@ -185,8 +410,8 @@ async def device_authenticate(request: Request):
     if not device_id or not device_secret:
         raise HTTPException(status_code=400, detail="device_id and device_secret required")
 
-    # Validate device credentials
-    device = validate_device_credentials(device_id, device_secret)
+    # Validate device credentials (KDF runs off the event loop)
+    device = await validate_device_credentials_async(device_id, device_secret)
     if not device:
         raise HTTPException(status_code=401, detail="Invalid device credentials")
 
@@ -198,6 +423,7 @@ async def device_authenticate(request: Request):
     device_info = get_device_info(device_id)
 
     print(f"✅ Device authenticated: {device_id} → customer: {customer_id}")
+    EVENT_HUB.device_seen(customer_id, device_id)
 
     return {
         "access_token": token,
@@ -208,7 +434,70 @@ async def device_authenticate(request: Request):
     }
 
 
-@app.post("/device/refresh")
+@app.post("/device/bootstrap", dependencies=[Depends(require_token_signing)])
+async def device_bootstrap(
+    request: Request,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
+    """
+    Authenticate device and return token + customer info + VAPI config in one round trip.
+
+    Request body:
+    {
+      "device_id": "pi_urbanjungle_001",
+      "device_secret": "dev_secret_urbanjungle_abc123xyz",
+      "config_etag": "\"...\""   (optional, or If-None-Match header)
+    }
+
+    Returns:
+    {
+      "access_token": "jwt-token-here",
+      "token_type": "Bearer",
+      "expires_in": 900,
+      "customer_id": "urbanjungle",
+      "device_info": {...},
+      "config_etag": "\"...\"",
+      "config_status": "ok" | "not_modified",
+      "vapi_config": {...} | null   (null when config_etag is still current)
+    }
+    """
+    body = await request.json()
+    device_id = body.get("device_id", "")
+    device_secret = body.get("device_secret", "")
+
+    if not device_id or not device_secret:
+        raise HTTPException(status_code=400, detail="device_id and device_secret required")
+
+    device = await validate_device_credentials_async(device_id, device_secret)
+    if not device:
+        raise HTTPException(status_code=401, detail="Invalid device credentials")
+
+    customer_id = device["customer_id"]
+    token = generate_device_token(device_id, customer_id)
+
+    vapi_config = build_vapi_config(device_id, customer_id)
+    etag = vapi_config_etag(vapi_config)
+    not_modified = etag_matches(body.get("config_etag") or if_none_match, etag)
+
+    print(f"✅ Device bootstrapped: {device_id} → customer: {customer_id} (config {'cached' if not_modified else 'sent'})")
+    EVENT_HUB.device_seen(customer_id, device_id)
+
+    return JSONResponse(
+        {
+            "access_token": token,
+            "token_type": "Bearer",
+            "expires_in": TOKEN_TTL_MINUTES * 60,
+            "customer_id": customer_id,
+            "device_info": get_device_info(device_id),
+            "config_etag": etag,
+            "config_status": "not_modified" if not_modified else "ok",
+            "vapi_config": None if not_modified else vapi_config
+        },
+        headers={"ETag": etag}
+    )
+
+
+@app.post("/device/refresh", dependencies=[Depends(require_token_signing)])
 async def device_refresh_token(token_payload: Dict[str, Any] = Depends(verify_device_jwt)):
     """
     Refresh device JWT token (must have valid token to refresh).
@@ -258,33 +547,33 @@ async def device_get_info(token_payload: Dict[str, Any] = Depends(verify_device_
 
 
 @app.get("/device/vapi-config")
-async def device_get_vapi_config(token_payload: Dict[str, Any] = Depends(verify_device_jwt)):
+async def device_get_vapi_config(
+    token_payload: Dict[str, Any] = Depends(verify_device_jwt),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
     """
     Get VAPI configuration for authenticated device.
 
     Headers:
         Authorization: Bearer {jwt-token}
+        If-None-Match: {etag} (optional - 304 if config unchanged)
 
     Returns:
-        VAPI API key and assistant ID for this device
+        VAPI API key and assistant ID for this device (ETag header = config version)
     """
     device_id = token_payload["device_id"]
     customer_id = token_payload["customer_id"]
 
-    print(f"📡 VAPI config requested by device: {device_id} (customer: {customer_id})")
+    vapi_config = build_vapi_config(device_id, customer_id)
+    etag = vapi_config_etag(vapi_config)
 
-    vapi_api_key = os.getenv("VAPI_API_KEY")
-    vapi_assistant_id = os.getenv("VAPI_ASSISTANT_ID", "31377f1e-dd62-43df-bc3c-ca8e87e08138")
+    if etag_matches(if_none_match, etag):
+        print(f"📡 VAPI config revalidated by device: {device_id} (not modified)")
+        return Response(status_code=304, headers={"ETag": etag})
 
-    if not vapi_api_key:
-        raise HTTPException(status_code=500, detail="VAPI_API_KEY not configured on server")
+    print(f"📡 VAPI config requested by device: {device_id} (customer: {customer_id})")
 
-    return {
-        "api_key": vapi_api_key,
-        "assistant_id": vapi_assistant_id,
-        "device_id": device_id,
-        "customer_id": customer_id
-    }
+    return JSONResponse(vapi_config, headers={"ETag": etag})
 
 
 # ========================================
@@ -360,29 +649,17 @@ async def vapi_proxy_start(
     if not vapi_api_key:
         raise HTTPException(status_code=500, detail="VAPI_API_KEY not configured on server")
 
-    # Call VAPI API on behalf of device (use /call/web for web calls)
-    # Format matches vapi-python SDK: {'assistantId': ..., 'assistantOverrides': ...}
+    # Call VAPI API on behalf of device (use /call/web for web calls),
+    # or hand out a pre-created call from the warm pool
     try:
-        async with httpx.AsyncClient() as client:
-            vapi_response = await client.post(
-                "https://api.vapi.ai/call/web",
-                headers={
-                    "Authorization": f"Bearer {vapi_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "assistantId": assistant_id,
-                    "assistantOverrides": assistant_overrides
-                },
-                timeout=30.0
-            )
-
-            vapi_response.raise_for_status()
-            result = vapi_response.json()
+        if CALL_POOL_ENABLED:
+            result, pool_hit = await CALL_POOL.start_call(assistant_id, device_id, assistant_overrides)
+        else:
+            result, pool_hit = await vapi_api.create_web_call(vapi_api_key, assistant_id, assistant_overrides), False
 
-            print(f"✅ VAPI call started: {result.get('id', 'unknown')}")
+        print(f"✅ VAPI call started: {result.get('id', 'unknown')}{' (warm pool)' if pool_hit else ''}")
 
-            return result
+        return JSONResponse(content=result, headers={"X-Call-Pool": "hit" if pool_hit else "miss"})
 
     except httpx.HTTPStatusError as e:
         print(f"❌ VAPI API error: {e.response.status_code} - {e.response.text}")
@@ -424,23 +701,11 @@ async def vapi_proxy_stop(
 
     # Stop VAPI call (use PATCH method, not POST)
     try:
-        async with httpx.AsyncClient() as client:
-            vapi_response = await client.patch(
-                f"https://api.vapi.ai/call/{call_id}",
-                headers={
-                    "Authorization": f"Bearer {vapi_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={"status": "ended"},
-                timeout=30.0
-            )
-
-            vapi_response.raise_for_status()
-            result = vapi_response.json()
+        result = await vapi_api.end_call(vapi_api_key, call_id)
 
-            print(f"✅ VAPI call stopped: {call_id}")
+        print(f"✅ VAPI call stopped: {call_id}")
 
-            return result
+        return result
 
     except httpx.HTTPStatusError as e:
         raise HTTPException(
@@ -507,11 +772,12 @@ async def authenticate(request: Request, sid: str = Query(None)):
     - Success: result with welcome message
     - Failure: result with error message
     """
+    event = await read_webhook(request)
+    return session_auth_response(sid, event.message.type)
 
-    body = await request.json()
-    message = body.get("message", {})
-    message_type = message.get("type", "")
 
+def session_auth_response(sid: Optional[str], message_type: str) -> Dict[str, Any]:
+    """Mark a legacy session authenticated; response shaped for the VAPI message type."""
     # Get session from sid
     if not sid:
         return {
@@ -599,9 +865,7 @@ async def control_device(request: Request, sid: str = Query(None)):
     - Failure: result with error message
     """
 
-    body = await request.json()
-    message = body.get("message", {})
-    message_type = message.get("type", "")
+    event = await read_webhook(request)
 
     # Get session from sid
     if not sid:
@@ -645,26 +909,12 @@ async def control_device(request: Request, sid: str = Query(None)):
             }]
         }
 
-    # Extract function call parameters (handle both formats)
-    function_call = message.get("functionCall", {})
-
-    # If toolCalls array exists, use the first one
-    if not function_call and message.get("toolCalls"):
-        tool_calls = message.get("toolCalls", [])
-        if tool_calls:
-            first_tool_call = tool_calls[0]
-            function_call = first_tool_call.get("function", {})
-
-    # Handle both "parameters" and "arguments" fields
-    parameters = function_call.get("parameters", {}) or function_call.get("arguments", {})
-
-    # If arguments is a string, parse it as JSON
-    if isinstance(parameters, str):
-        import json
-        parameters = json.loads(parameters)
-
-    device = parameters.get("device", "")
-    action = parameters.get("action", "")
+    # Typed arguments (functionCall or first of toolCalls; JSON strings already decoded)
+    device = action = ""
+    if isinstance(event.message, ToolCallsMessage):
+        function = event.message.first_call().function
+        if isinstance(function, AirCirculatorCall):
+            device, action = function.arguments.device, function.arguments.action
 
     if not device or not action:
         return {
@@ -724,52 +974,610 @@ async def control_device(request: Request, sid: str = Query(None)):
     }
 
 
-@app.post("/webhook")
-async def webhook_unified(
-    request: Request,
-    sid: str = Query(None),
-    device_id: str = Query(None),
+# ========================================
+# Call History, Stats & Live Events
+# ========================================
+
+@app.get("/calls/{call_id}/events", dependencies=[Depends(verify_admin_key)])
+async def call_events(call_id: str):
+    """Journaled events of one call (transcripts, conversation updates, end-of-call report)."""
+    if not CALL_JOURNAL.enabled:
+        raise HTTPException(status_code=503, detail="Call journal disabled (CALL_JOURNAL_DIR not set)")
+
+    events = await asyncio.to_thread(CALL_JOURNAL.read_call, call_id)
+    if not events:
+        raise HTTPException(status_code=404, detail=f"No events for call {call_id}")
+    return {"call_id": call_id, "events": events}
+
+
+@app.get("/customers/{customer_id}/calls", dependencies=[Depends(verify_admin_key)])
+async def customer_calls(customer_id: str, limit: int = Query(50, ge=1, le=1000)):
+    """Most recent journaled calls of a customer."""
+    if not CALL_JOURNAL.enabled:
+        raise HTTPException(status_code=503, detail="Call journal disabled (CALL_JOURNAL_DIR not set)")
+
+    return {"customer_id": customer_id, "calls": CALL_JOURNAL.list_calls(customer_id, limit)}
+
+
+@app.get("/customers/{customer_id}/scheduled-commands", dependencies=[Depends(verify_admin_key)])
+async def customer_scheduled_commands(customer_id: str):
+    """Pending scheduled commands of a customer, soonest first."""
+    return {
+        "customer_id": customer_id,
+        "commands": [command.to_dict() for command in SCHEDULER.list(customer_id)]
+    }
+
+
+@app.delete("/customers/{customer_id}/scheduled-commands/{command_id}", dependencies=[Depends(verify_admin_key)])
+async def cancel_customer_scheduled_command(customer_id: str, command_id: str):
+    """Cancel one pending scheduled command of a customer."""
+    command = SCHEDULER.cancel(customer_id, command_id)
+    if command is None:
+        raise HTTPException(status_code=404, detail=f"No scheduled command {command_id} for {customer_id}")
+    return {"customer_id": customer_id, "cancelled": command.to_dict()}
+
+
+@app.get("/stats", dependencies=[Depends(verify_admin_key)])
+async def stats(
+    customer_id: Optional[str] = Query(None),
+    hours: float = Query(24, gt=0, le=24 * 30)
+):
+    """
+    Per-tenant rollups for the last `hours`: calls, tool calls per function,
+    HA success rate and latency percentiles.
+    """
+    return CALL_STATS.query(customer_id, int(hours * 3600))
+
+
+@app.get("/stats/dns", dependencies=[Depends(verify_admin_key)])
+async def dns_stats():
+    """Upstream DNS cache per host: cached addresses, hits/misses, refreshes, failures."""
+    return DNS_CACHE.stats()
+
+
+@app.get("/stats/ha", dependencies=[Depends(verify_admin_key)])
+async def ha_stats():
+    """Per-tenant HA latency percentiles and adaptive timeouts; hedge counters and budget."""
+    return HA_HEDGER.stats()
+
+
+@app.get("/stats/scheduler", dependencies=[Depends(verify_admin_key)])
+async def scheduler_stats():
+    """Scheduled commands: pending, fired / retried / failed / missed / cancelled, log size."""
+    return SCHEDULER.stats()
+
+
+@app.get("/events/stream")
+async def events_stream(
+    customer_id: Optional[str] = Query(None),
+    token: Optional[str] = Query(None),
     authorization: Optional[str] = Header(None),
-    x_customer_id: Optional[str] = Header(None, alias="x-customer-id")
+    accept: Optional[str] = Header(None)
 ):
     """
-    Unified webhook endpoint that handles all VAPI events.
+    Server-Sent Events: call status, tool-call outcomes, device online state.
 
-    Multi-Tenant Routing Options:
-    1. device_id query param (NEW - from secure proxy client)
-    2. x-customer-id header (VAPI native)
-    3. sid query param (legacy session-based)
+    Auth (Authorization: Bearer ...; ?token= only from EventSource, which
+    cannot send headers - recognized by Accept: text/event-stream; the query
+    string is kept out of the uvicorn and nginx access logs):
+    - ADMIN_API_KEY: any tenant (?customer_id=, or all tenants if omitted)
+    - Device JWT: events about its own device only, until the token expires
+      or the device / customer is revoked (then a final "closed" event)
 
-    Priority: device_id > x-customer-id > sid
+    Events: snapshot, device, call_status, call_ended, tool_call (and
+    dropped, if this subscriber falls too far behind).
+    """
+    if authorization and authorization.startswith("Bearer "):
+        credential = authorization[7:]
+    elif token and "text/event-stream" in (accept or ""):
+        credential = token
+    elif token:
+        raise HTTPException(status_code=401, detail="Send the token in the Authorization header "
+                                                    "(?token= is only accepted from EventSource)")
+    else:
+        raise HTTPException(status_code=401, detail="Missing credentials")
 
-    Query params:
-    - device_id: Device identifier (e.g., "pi_urbanjungle_001") - maps to customer
-    - sid: Session ID (optional, legacy)
+    device_id = None
+    payload = None
+    if ADMIN_API_KEY and hmac.compare_digest(credential, ADMIN_API_KEY):
+        tenant = customer_id
+    else:
+        payload = verify_device_token(credential)
+        if not payload:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        if customer_id and customer_id != payload["customer_id"]:
+            raise HTTPException(status_code=403, detail="Token is not valid for this customer")
+        tenant = payload["customer_id"]
+        device_id = payload["device_id"]
+
+    subscriber = EVENT_HUB.subscribe(tenant, device_id, token=payload)
+    print(f"📡 Event stream opened for {tenant or 'all customers'}{f' (device {device_id})' if device_id else ''}")
+
+    return StreamingResponse(
+        EVENT_HUB.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def journal_event(event: VapiWebhookRequest, customer_id: Optional[str], device_id: Optional[str]) -> None:
+    """Queue a webhook event for the call journal (returns immediately)."""
+    message = event.message
+    call_id = event.call_id
+    if not call_id:
+        return
+
+    if isinstance(message, TranscriptMessage):
+        # Partial transcripts are superseded by the final one
+        if message.transcriptType != "final":
+            return
+        data = {"role": message.role, "transcript": message.transcript}
+    elif isinstance(message, ConversationUpdateMessage):
+        conversation = message.conversation
+        data = {"length": len(conversation), "last": conversation[-1] if conversation else None}
+    elif isinstance(message, EndOfCallReportMessage):
+        data = message.model_dump(include={"endedReason", "summary", "messages", "cost", "durationSeconds"},
+                                  exclude_none=True)
+    elif isinstance(message, StatusUpdateMessage):
+        data = {"status": message.status, "endedReason": message.endedReason}
+    else:
+        return
 
-    Headers:
-    - Authorization: Bearer {VAPI_API_KEY}
-    - x-customer-id: {customer_id} (optional, e.g., "urbanjungle")
+    CALL_JOURNAL.record({
+        "call_id": call_id,
+        "customer_id": customer_id,
+        "device_id": device_id,
+        "type": message.type,
+        "data": data
+    })
+
+
+# ========================================
+# Device Provisioning (admin)
+# ========================================
+
+@app.post("/admin/devices/bulk", dependencies=[Depends(verify_admin_key)])
+async def bulk_provision_devices(request: Request, format: Optional[str] = Query(None)):
     """
-    body = await request.json()
+    Stream-ingest a JSONL or CSV batch of devices (device_id, customer_id, name).
 
-    # DEBUG: Log the entire payload
-    print(f"🔍 WEBHOOK - device_id={device_id}, sid={sid}, x-customer-id={x_customer_id}")
+    Format: ?format=jsonl|csv, or from Content-Type (text/csv → csv).
+
+    Returns NDJSON, one line per row:
+        {"line": 1, "device_id": "...", "customer_id": "...", "device_secret": "..."}
+        {"line": 2, "device_id": "...", "error": "..."}
+        ...
+        {"summary": {"created": N, "failed": N, "batches": N}}
+
+    Batches of BULK_BATCH_SIZE rows are all-or-nothing. Each batch is
+    appended to DEVICE_REGISTRY_PATH and fsynced before its secrets are
+    returned, so the devices survive a restart or crash. Without
+    DEVICE_REGISTRY_PATH they are only kept in memory until the next restart.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "jsonl")
+    if fmt not in ("jsonl", "csv"):
+        raise HTTPException(status_code=400, detail="format must be jsonl or csv")
+
+    # Spool the upload (memory up to 1 MB, then disk) so parsing never holds it all
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > provisioning.BULK_MAX_UPLOAD_BYTES:
+            spool.close()
+            raise HTTPException(status_code=413, detail="Upload too large")
+        spool.write(chunk)
+    spool.seek(0)
+
+    async def results():
+        with io.TextIOWrapper(spool, encoding="utf-8", newline="") as text_stream:
+            async for line in provisioning.ingest(text_stream, fmt):
+                yield line
+
+    return StreamingResponse(results(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-store"})
+
+
+@app.get("/admin/devices", dependencies=[Depends(verify_admin_key)])
+async def export_devices(
+    customer_id: str = Query(...),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Cursor-paginated device export for one customer (no secrets).
+
+    Pass next_cursor back as ?cursor= until it is null.
+    """
+    after = None
+    if cursor:
+        try:
+            after = base64.urlsafe_b64decode(cursor.encode()).decode()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    devices, next_after = list_devices_page(customer_id, after, limit)
+    return {
+        "customer_id": customer_id,
+        "devices": devices,
+        "next_cursor": base64.urlsafe_b64encode(next_after.encode()).decode() if next_after else None
+    }
+
+
+@app.post("/admin/devices/{device_id}/revoke", dependencies=[Depends(verify_admin_key)])
+async def admin_revoke_device(device_id: str, deactivate: bool = Query(True)):
+    """
+    Invalidate a device's tokens; with deactivate=true (default) it also can't re-authenticate.
+    """
+    if get_device_info(device_id) is None:
+        raise HTTPException(status_code=404, detail=f"Device {device_id} not found")
+
+    if deactivate:
+        revoke_device(device_id)
+    else:
+        revoke_device_tokens(device_id)
+
+    print(f"🚫 Tokens revoked for device {device_id}{' (deactivated)' if deactivate else ''}")
+    return {"device_id": device_id, "deactivated": deactivate}
+
+
+@app.post("/admin/customers/{customer_id}/revoke-tokens", dependencies=[Depends(verify_admin_key)])
+async def admin_revoke_customer_tokens(customer_id: str):
+    """
+    Invalidate every token of every device of a customer at once (O(1)).
+
+    Devices re-authenticate with their secrets on the next request.
+    """
+    generation = revoke_customer_tokens(customer_id)
+    print(f"🚫 All tokens revoked for customer {customer_id} (generation {generation})")
+    return {"customer_id": customer_id, "token_generation": generation}
+
+
+# ========================================
+# Tool Calls
+# ========================================
+
+async def forward_to_ha(route: Route, device: str, action: str) -> httpx.Response:
+    """
+    POST a device action to the route's HA webhook (pooled client, latency recorded).
+
+    The timeout adapts to the tenant's recent latency; idempotent actions are
+    hedged when the first attempt runs past the tenant's p95 (see ha_hedging.py).
+
+    Raises:
+        httpx.HTTPError if HA is unreachable
+    """
+    payload = ha_tool_payload(device, action)
+
+    async def send(timeout: float) -> httpx.Response:
+        return await route.client.post(route.ha_webhook_url, json=payload, timeout=timeout)
+
+    ha_started = time.perf_counter()
+    try:
+        ha_response = await HA_HEDGER.run(route.latency_key, send, is_idempotent(action))
+    except Exception:
+        CALL_STATS.record_ha_request(route.customer_id, False, time.perf_counter() - ha_started)
+        raise
+
+    CALL_STATS.record_ha_request(route.customer_id, ha_response.status_code == 200,
+                                 time.perf_counter() - ha_started)
+    return ha_response
+
+
+SITE_TIMEOUT_ERROR = "Error: Home Assistant did not respond"
+
+
+async def fan_out_to_ha(sites: List[Route], device: str, action: str) -> List[Tuple[Route, Optional[str]]]:
+    """
+    Send one device action to several HA sites concurrently.
+
+    With more than one site each is limited to HA_SITE_TIMEOUT_SECONDS, so the
+    call takes as long as the slowest site that answers in time.
+
+    Returns:
+        [(site, error)] - error is None for sites that accepted the action
+    """
+    async def send(site: Route) -> Optional[str]:
+        try:
+            if len(sites) > 1:
+                ha_response = await asyncio.wait_for(forward_to_ha(site, device, action), HA_SITE_TIMEOUT_SECONDS)
+            else:
+                ha_response = await forward_to_ha(site, device, action)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            return SITE_TIMEOUT_ERROR
+        except Exception as e:
+            return f"Error calling Home Assistant: {str(e)}"
+        if ha_response.status_code != 200:
+            return f"Error: Home Assistant returned {ha_response.status_code}"
+        return None
+
+    errors = await asyncio.gather(*(send(site) for site in sites))
+    return list(zip(sites, errors))
+
+
+def _spoken_list(names: List[str]) -> str:
+    return names[0] if len(names) == 1 else f"{', '.join(names[:-1])} and {names[-1]}"
+
+
+def fan_out_message(done: str, results: List[Tuple[Route, Optional[str]]]) -> str:
+    """
+    One spoken result for a (possibly fanned-out) device action.
+
+    Single site: `done` or its error, as before. Several: "Fan turn off at
+    Building A and Building B; Building C did not respond". Starts with
+    "Error" only when no site accepted the action.
+    """
+    if len(results) == 1:
+        return results[0][1] or done
+
+    succeeded = [site.site_name for site, error in results if error is None]
+    timed_out = [site.site_name for site, error in results if error == SITE_TIMEOUT_ERROR]
+    failed = [site.site_name for site, error in results if error and error != SITE_TIMEOUT_ERROR]
+
+    problems = []
+    if timed_out:
+        problems.append(f"{_spoken_list(timed_out)} did not respond")
+    if failed:
+        problems.append(f"{_spoken_list(failed)} failed")
+    if not succeeded:
+        return f"Error: {'; '.join(problems)}"
+    if not problems:
+        return f"{done} at all {len(results)} sites"
+    return f"{done} at {_spoken_list(succeeded)}; {'; '.join(problems)}"
+
+
+def no_site_message(route: Route, target: str) -> str:
+    names = [site.site_name for site in route.sites or (route,)]
+    return f"No site matches {target}. Sites: {_spoken_list(names)}"
+
+
+async def fire_scheduled_command(command: ScheduledCommand) -> bool:
+    """
+    Send a due scheduled command to its tenant's HA (SCHEDULER fire handler).
+
+    Sites that accepted it on an earlier attempt (command.sites_done) are
+    skipped; sites that accept it now are added there.
+
+    Returns True once every selected site accepted it; False makes the scheduler retry.
+    """
+    route = DEFAULT_ROUTE if command.customer_id is None else ROUTING_TABLE.for_customer(command.customer_id)
+    sites = route.select_sites(command.target) if route else []
+    ok = False
+    if route is None:
+        result_message = f"Error: No Home Assistant for customer {command.customer_id}"
+    elif not sites:
+        result_message = f"Error: {no_site_message(route, command.target)}"
+    else:
+        sites = [site for site in sites if site.site_id not in command.sites_done]
+        if not sites:
+            return True
+        results = await fan_out_to_ha(sites, command.device, command.action)
+        command.sites_done.extend(site.site_id for site, error in results if error is None)
+        ok = all(error is None for _, error in results)
+        result_message = fan_out_message(
+            f"{command.device.capitalize()} {command.action.replace('_', ' ')}", results
+        )
+
+    print(f"⏰ Scheduled command {command.id} for {command.customer_id or 'default'}: {result_message}")
+    EVENT_HUB.publish(command.customer_id, "scheduled_command", {
+        "command_id": command.id,
+        "call_id": command.call_id,
+        "device": command.device,
+        "action": command.action,
+        "target": command.target,
+        "attempt": command.attempts + 1,
+        "result": result_message
+    })
+    return ok
+
+
+async def execute_tool_call(
+    function: FunctionCall,
+    route: Route,
+    sid: Optional[str],
+    message_type: str,
+    call_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run one VAPI tool call (forwarding device actions to the route's HA).
+
+    Returns the VAPI function-result response.
+    """
+    function_name = function.name
+    customer_id = route.customer_id
+    CALL_STATS.record_tool_call(customer_id, function_name)
+
+    if isinstance(function, FrontDoorCall):
+        # Handle front door control
+        action = function.arguments.action
+
+        if not action:
+            return {
+                "results": [{
+                    "type": "function-result",
+                    "name": "control_front_door",
+                    "result": "Missing action"
+                }]
+            }
+
+        print(f"🚪 Front door command for {customer_id or 'default HA'}: {action}")
+
+        # Forward to the selected site(s) Home Assistant webhook
+        sites = route.select_sites(function.arguments.target)
+        if sites:
+            results = await fan_out_to_ha(sites, "front_door", action)
+            result_message = fan_out_message(f"Front door {action}", results)
+        else:
+            result_message = no_site_message(route, function.arguments.target)
+
+        return {
+            "results": [{
+                "type": "function-result",
+                "name": "control_front_door",
+                "result": result_message
+            }]
+        }
+    elif isinstance(function, AirCirculatorCall):
+        device = function.arguments.device
+        action = function.arguments.action
+
+        if not device or not action:
+            return {
+                "results": [{
+                    "type": "function-result",
+                    "name": "control_air_circulator",
+                    "result": "Missing device or action"
+                }]
+            }
+
+        # Forward to the selected site(s) Home Assistant webhook
+        sites = route.select_sites(function.arguments.target)
+        if sites:
+            print(f"🏠 Using HA for {customer_id or 'default'}: {', '.join(site.ha_url for site in sites)}")
+            results = await fan_out_to_ha(sites, device, action)
+            result_message = fan_out_message(f"{device.capitalize()} {action.replace('_', ' ')}", results)
+        else:
+            result_message = no_site_message(route, function.arguments.target)
+
+        return {
+            "results": [{
+                "type": "function-result",
+                "name": "control_air_circulator",
+                "result": result_message
+            }]
+        }
+    elif isinstance(function, ScheduleCommandCall):
+        device = function.arguments.device
+        action = function.arguments.action
+        delay_minutes = function.arguments.delay_minutes
+
+        if not device or not action or delay_minutes is None:
+            result_message = "Missing device, action or delay_minutes"
+        else:
+            try:
+                command = SCHEDULER.schedule(customer_id, device, action, delay_minutes * 60, call_id,
+                                             function.arguments.target or None)
+                print(f"⏰ Scheduled {command.id} for {customer_id or 'default'}: {command.describe()}")
+                result_message = (f"{device.capitalize()} {action.replace('_', ' ')} scheduled in "
+                                  f"{format_delay(delay_minutes * 60)} (command {command.id})")
+            except ValueError as e:
+                result_message = f"Error: {e}"
+
+        return {
+            "results": [{
+                "type": "function-result",
+                "name": "schedule_device_command",
+                "result": result_message
+            }]
+        }
+    elif isinstance(function, ListScheduledCall):
+        commands = SCHEDULER.list(customer_id)
+        if commands:
+            now = time.time()
+            result_message = f"{len(commands)} scheduled: " + "; ".join(
+                f"{command.describe(now)} (command {command.id})" for command in commands
+            )
+        else:
+            result_message = "No scheduled commands"
+
+        return {
+            "results": [{
+                "type": "function-result",
+                "name": "list_scheduled_commands",
+                "result": result_message
+            }]
+        }
+    elif isinstance(function, CancelScheduledCall):
+        command_id = function.arguments.command_id
+        device = function.arguments.device
+
+        if command_id:
+            command = SCHEDULER.cancel(customer_id, command_id)
+            cancelled = [command] if command else []
+        elif device:
+            cancelled = SCHEDULER.cancel_device(customer_id, device)
+        else:
+            cancelled = None
+
+        if cancelled is None:
+            result_message = "Missing command_id or device"
+        elif cancelled:
+            now = time.time()
+            result_message = "Cancelled " + "; ".join(command.describe(now) for command in cancelled)
+        else:
+            result_message = "No matching scheduled command"
+
+        return {
+            "results": [{
+                "type": "function-result",
+                "name": "cancel_scheduled_command",
+                "result": result_message
+            }]
+        }
+    elif isinstance(function, HomeAuthCall):
+        # Simplified auth: customer_id already validated, just return welcome message
+        if customer_id:
+            return {
+                "results": [{
+                    "type": "function-result",
+                    "name": "home_auth",
+                    "result": route.welcome_text
+                }]
+            }
+        elif sid:
+            # Fallback to session-based auth (backward compatibility)
+            return session_auth_response(sid, message_type)
+        else:
+            return {
+                "results": [{
+                    "type": "function-result",
+                    "name": "home_auth",
+                    "result": "Authentication failed: No customer_id or session ID"
+                }]
+            }
+    else:
+        return {
+            "results": [{
+                "type": "function-result",
+                "name": function_name,
+                "result": f"Unknown function: {function_name}"
+            }]
+        }
 
-    # Multi-tenant routing: device_id → customer_id → HA instance
-    customer_id = None
-    ha_instance = None
+
+def tool_result_ok(response: Dict[str, Any]) -> bool:
+    """Only successful tool results are cached - a retry after an HA error retries."""
+    return not any(str(r.get("result", "")).startswith("Error") for r in response.get("results", []))
+
+
+def resolve_webhook_route(
+    device_id: Optional[str],
+    sid: Optional[str],
+    authorization: Optional[str],
+    x_customer_id: Optional[str]
+) -> Tuple[Route, str]:
+    """
+    Multi-tenant routing: device_id → compiled route (customer + HA).
+
+    Returns:
+        (route, auth) - auth is "device", "vapi", "sid" or "default"
+    Raises:
+        HTTPException if the device/customer is unknown or VAPI auth fails
+    """
+    route = DEFAULT_ROUTE
+    auth = "default"
 
     # Option 1: device_id query param (secure proxy client)
     if device_id:
-        customer_id = get_customer_id_from_device(device_id)
-        if not customer_id:
-            raise HTTPException(status_code=404, detail=f"Device {device_id} not found")
-
-        ha_instance = get_ha_instance(customer_id)
-        if not ha_instance:
+        route = ROUTING_TABLE.for_device(device_id)
+        if not route:
+            customer_id = get_customer_id_from_device(device_id)
+            if not customer_id:
+                raise HTTPException(status_code=404, detail=f"Device {device_id} not found")
             raise HTTPException(status_code=404, detail=f"HA instance for customer {customer_id} not found")
 
-        print(f"✅ Routed via device_id: {device_id} → customer: {customer_id} → HA: {ha_instance.get('name')}")
+        print(f"✅ Routed via device_id: {device_id} → customer: {route.customer_id} → HA: {route.tenant_name}")
+        auth = "device"
 
     # Option 2: x-customer-id header (VAPI native)
     elif authorization and x_customer_id:
@@ -778,11 +1586,12 @@ async def webhook_unified(
             print(f"✅ VAPI request validated for customer: {customer_id}")
 
             # Map customer_id → HA instance
-            ha_instance = get_ha_instance(customer_id)
-            if not ha_instance:
+            route = ROUTING_TABLE.for_customer(customer_id)
+            if not route:
                 raise HTTPException(status_code=404, detail=f"Customer {customer_id} not found")
 
-            print(f"✅ Mapped to HA: {ha_instance.get('name')}")
+            print(f"✅ Mapped to HA: {route.tenant_name}")
+            auth = "vapi"
 
         except HTTPException as e:
             print(f"❌ Authentication failed: {e.detail}")
@@ -791,27 +1600,85 @@ async def webhook_unified(
     # Option 3: sid query param (legacy session-based)
     elif sid:
         # Use session-based routing (backward compatibility)
-        customer_id = None
-        ha_instance = None
         print(f"⚠️  Using legacy sid-based routing: {sid}")
+        auth = "sid"
 
     else:
         # No routing info - allow for backward compatibility
-        customer_id = None
-        ha_instance = None
         print(f"⚠️  No routing info - using default HA")
 
-    message = body.get("message", {})
-    message_type = message.get("type", "")
+    return route, auth
+
+
+@app.post("/webhook")
+async def webhook_unified(
+    request: Request,
+    sid: str = Query(None),
+    device_id: str = Query(None),
+    authorization: Optional[str] = Header(None),
+    x_customer_id: Optional[str] = Header(None, alias="x-customer-id")
+):
+    """
+    Unified webhook endpoint that handles all VAPI events.
+
+    Multi-Tenant Routing Options:
+    1. device_id query param (NEW - from secure proxy client)
+    2. x-customer-id header (VAPI native)
+    3. sid query param (legacy session-based)
+
+    Priority: device_id > x-customer-id > sid
+
+    Query params:
+    - device_id: Device identifier (e.g., "pi_urbanjungle_001") - maps to customer
+    - sid: Session ID (optional, legacy)
+
+    Headers:
+    - Authorization: Bearer {VAPI_API_KEY}
+    - x-customer-id: {customer_id} (optional, e.g., "urbanjungle")
+    """
+    event = await read_webhook(request)
+
+    # DEBUG: Log the entire payload
+    print(f"🔍 WEBHOOK - device_id={device_id}, sid={sid}, x-customer-id={x_customer_id}")
+
+    message = event.message
+    message_type = message.type
+    call_id = event.call_id
+
+    # Later events of a call reuse the route + auth decision of its first event
+    identity = (device_id, x_customer_id, authorization)
+    context = CALL_CONTEXTS.get(call_id, identity) if call_id else None
+    if context is None:
+        route, auth = resolve_webhook_route(device_id, sid, authorization, x_customer_id)
+        if call_id:
+            context = CALL_CONTEXTS.start(call_id, identity, route, device_id, auth)
+    else:
+        route = context.route
+
+    if device_id:
+        EVENT_HUB.device_seen(route.customer_id, device_id)
+    if context:
+        context.events[message_type] += 1
+
+    customer_id = route.customer_id
 
     print(f"🔍 WEBHOOK - Message type: {message_type}")
 
+    journal_event(event, customer_id, device_id)
+
     # Handle status-update events (call lifecycle tracking)
-    if message_type == "status-update":
-        status = message.get("status", "")
-        call = body.get("call", {})
-        call_id = call.get("id", "unknown")
-        print(f"📞 Call {call_id} status: {status}")
+    if isinstance(message, StatusUpdateMessage):
+        status = message.status
+        print(f"📞 Call {call_id or 'unknown'} status: {status}")
+
+        if status == "in-progress":
+            CALL_STATS.record_call_started(customer_id)
+        EVENT_HUB.publish(customer_id, "call_status", {
+            "call_id": call_id,
+            "device_id": device_id,
+            "status": status,
+            "endedReason": message.endedReason
+        })
 
         # Track session activity if sid provided
         if sid and sid in sessions:
@@ -821,16 +1688,13 @@ async def webhook_unified(
         return {"message": "Status update received"}
 
     # Handle transcript events (speech-to-text logging)
-    if message_type == "transcript":
-        transcript_text = message.get("transcript", "")
-        transcript_type = message.get("transcriptType", "partial")
-        role = message.get("role", "unknown")
-        print(f"💬 Transcript ({transcript_type}) [{role}]: {transcript_text}")
+    if isinstance(message, TranscriptMessage):
+        print(f"💬 Transcript ({message.transcriptType}) [{message.role}]: {message.transcript}")
 
         return {"message": "Transcript received"}
 
     # Handle assistant-request events (dynamic assistant configuration)
-    if message_type == "assistant-request":
+    if isinstance(message, AssistantRequestMessage):
         print(f"🤖 Assistant request received")
 
         # If we have a session, we can return a customized assistant
@@ -848,11 +1712,18 @@ async def webhook_unified(
         }
 
     # Handle end-of-call-report events (call summary)
-    if message_type == "end-of-call-report":
-        call = body.get("call", {})
-        call_id = call.get("id", "unknown")
-        duration = message.get("endedReason", "unknown")
-        print(f"📊 Call {call_id} ended: {duration}")
+    if isinstance(message, EndOfCallReportMessage):
+        print(f"📊 Call {call_id or 'unknown'} ended: {message.endedReason or 'unknown'}")
+        call_context = CALL_CONTEXTS.end(call_id) if call_id else None
+
+        CALL_STATS.record_call_ended(customer_id, message.endedReason)
+        EVENT_HUB.publish(customer_id, "call_ended", {
+            "call_id": call_id,
+            "device_id": device_id,
+            "endedReason": message.endedReason,
+            "conversation": CONVERSATIONS.finish(call_id) if call_id else None,
+            "call": call_context.summary() if call_context else None
+        })
 
         # Clean up session tracking
         if sid and sid in sessions:
@@ -861,9 +1732,15 @@ async def webhook_unified(
         return {"message": "Call report received"}
 
     # Handle conversation-update events (track conversation history)
-    if message_type == "conversation-update":
-        conversation = message.get("conversation", [])
-        print(f"💭 Conversation updated: {len(conversation)} messages")
+    if isinstance(message, ConversationUpdateMessage):
+        conversation = message.conversation
+
+        # Only the messages not seen yet for this call are processed
+        if call_id:
+            new_messages = CONVERSATIONS.update(call_id, conversation)
+            print(f"💭 Conversation updated: {len(conversation)} messages (+{len(new_messages)} new)")
+        else:
+            print(f"💭 Conversation updated: {len(conversation)} messages")
 
         # Track conversation in session
         if sid and sid in sessions:
@@ -872,199 +1749,35 @@ async def webhook_unified(
         return {"message": "Conversation update received"}
 
     # Handle both "function-call" and "tool-calls" message types
-    if message_type in ["function-call", "tool-calls"]:
-        # Handle both formats: functionCall (singular) and toolCalls (array)
-        function_call = message.get("functionCall", {})
-
-        # If toolCalls array exists, use the first one
-        if not function_call and message.get("toolCalls"):
-            tool_calls = message.get("toolCalls", [])
-            if tool_calls:
-                first_tool_call = tool_calls[0]
-                function_call = first_tool_call.get("function", {})
-
-        function_name = function_call.get("name", "")
-
-        if function_name == "control_front_door":
-            # Handle front door control
-            parameters = function_call.get("parameters", {}) or function_call.get("arguments", {})
-
-            # If arguments is a string, parse it as JSON
-            if isinstance(parameters, str):
-                import json
-                parameters = json.loads(parameters)
-
-            action = parameters.get("action", "")
-
-            if not action:
-                return {
-                    "results": [{
-                        "type": "function-result",
-                        "name": "control_front_door",
-                        "result": "Missing action"
-                    }]
-                }
-
-            # Use mapped HA instance if available
-            if ha_instance:
-                target_ha_url = ha_instance.get("ha_url", HOMEASSISTANT_URL)
-                target_webhook_id = ha_instance.get("ha_webhook_id", HOMEASSISTANT_WEBHOOK_ID)
-                print(f"🚪 Front door command for {customer_id}: {action}")
-            else:
-                target_ha_url = HOMEASSISTANT_URL
-                target_webhook_id = HOMEASSISTANT_WEBHOOK_ID
-                print(f"🚪 Front door command: {action}")
-
-            # Forward to Home Assistant webhook
-            try:
-                async with httpx.AsyncClient() as client:
-                    ha_webhook_url = f"{target_ha_url}/api/webhook/{target_webhook_id}"
-
-                    # Transform to Home Assistant expected format
-                    # HA automation expects: trigger.json.message.toolCalls
-                    ha_payload = {
-                        "message": {
-                            "toolCalls": [{
-                                "function": {
-                                    "arguments": {
-                                        "device": "front_door",
-                                        "action": action
-                                    }
-                                }
-                            }]
-                        }
-                    }
-
-                    # Send to Home Assistant
-                    ha_response = await client.post(
-                        ha_webhook_url,
-                        json=ha_payload,
-                        timeout=10.0
-                    )
-
-                    if ha_response.status_code == 200:
-                        result_message = f"Front door {action}"
-                    else:
-                        result_message = f"Error: Home Assistant returned {ha_response.status_code}"
-
-            except Exception as e:
-                result_message = f"Error calling Home Assistant: {str(e)}"
-
-            return {
-                "results": [{
-                    "type": "function-result",
-                    "name": "control_front_door",
-                    "result": result_message
-                }]
-            }
-        elif function_name == "control_air_circulator":
-            # Handle both "parameters" and "arguments" fields
-            parameters = function_call.get("parameters", {}) or function_call.get("arguments", {})
-
-            # If arguments is a string, parse it as JSON
-            if isinstance(parameters, str):
-                import json
-                parameters = json.loads(parameters)
-
-            device = parameters.get("device", "")
-            action = parameters.get("action", "")
-
-            if not device or not action:
-                return {
-                    "results": [{
-                        "type": "function-result",
-                        "name": "control_air_circulator",
-                        "result": "Missing device or action"
-                    }]
-                }
-
-            # Use mapped HA instance if available, otherwise use default
-            if ha_instance:
-                target_ha_url = ha_instance.get("ha_url", HOMEASSISTANT_URL)
-                target_webhook_id = ha_instance.get("ha_webhook_id", HOMEASSISTANT_WEBHOOK_ID)
-                print(f"🏠 Using HA for {customer_id}: {target_ha_url}")
-            else:
-                target_ha_url = HOMEASSISTANT_URL
-                target_webhook_id = HOMEASSISTANT_WEBHOOK_ID
-                print(f"🏠 Using default HA: {target_ha_url}")
-
-            # Forward to Home Assistant webhook
-            try:
-                async with httpx.AsyncClient() as client:
-                    ha_webhook_url = f"{target_ha_url}/api/webhook/{target_webhook_id}"
-
-                    # Transform to Home Assistant expected format
-                    # HA automation expects: trigger.json.message.toolCalls
-                    ha_payload = {
-                        "message": {
-                            "toolCalls": [{
-                                "function": {
-                                    "arguments": {
-                                        "device": device,
-                                        "action": action
-                                    }
-                                }
-                            }]
-                        }
-                    }
-
-                    # Send to Home Assistant
-                    ha_response = await client.post(
-                        ha_webhook_url,
-                        json=ha_payload,
-                        timeout=10.0
-                    )
-
-                    if ha_response.status_code == 200:
-                        result_message = f"{device.capitalize()} {action.replace('_', ' ')}"
-                    else:
-                        result_message = f"Error: Home Assistant returned {ha_response.status_code}"
-
-            except Exception as e:
-                result_message = f"Error calling Home Assistant: {str(e)}"
-
-            return {
-                "results": [{
-                    "type": "function-result",
-                    "name": "control_air_circulator",
-                    "result": result_message
-                }]
-            }
-        elif function_name == "home_auth":
-            # Simplified auth: customer_id already validated, just return welcome message
-            if ha_instance and customer_id:
-                ha_name = ha_instance.get("name", "your home")
-                success_message = f"Welcome! Authentication successful. I'm Luna, controlling {ha_name}. How can I help you today?"
-
-                return {
-                    "results": [{
-                        "type": "function-result",
-                        "name": "home_auth",
-                        "result": success_message
-                    }]
-                }
-            elif sid:
-                # Fallback to session-based auth (backward compatibility)
-                return await authenticate(request, sid)
-            else:
-                return {
-                    "results": [{
-                        "type": "function-result",
-                        "name": "home_auth",
-                        "result": "Authentication failed: No customer_id or session ID"
-                    }]
-                }
+    if isinstance(message, ToolCallsMessage):
+        # functionCall (singular), else the first of toolCalls
+        tool_call = message.first_call()
+        function = tool_call.function
+        if context:
+            context.tool_calls += 1
+
+        # VAPI redelivers tool-calls after a timeout - run each tool call once
+        dedup_key = tool_call_key(customer_id, tool_call.id, call_id, function.model_dump())
+        if dedup_key is None:
+            result = await execute_tool_call(function, route, sid, message_type, call_id)
         else:
-            return {
-                "results": [{
-                    "type": "function-result",
-                    "name": function_name,
-                    "result": f"Unknown function: {function_name}"
-                }]
-            }
-    elif message_type == "conversation-started":
+            result = await TOOL_CALL_CACHE.run(
+                dedup_key,
+                lambda: execute_tool_call(function, route, sid, message_type, call_id),
+                cacheable=tool_result_ok
+            )
+
+        for tool_result in result.get("results", []):
+            EVENT_HUB.publish(customer_id, "tool_call", {
+                "call_id": call_id,
+                "device_id": device_id,
+                "function": tool_result.get("name"),
+                "result": tool_result.get("result")
+            })
+        return result
+    elif isinstance(message, ConversationStartedMessage):
         # Route to auth for conversation started
-        return await authenticate(request, sid)
+        return session_auth_response(sid, message_type)
     else:
         return {
             "results": [{
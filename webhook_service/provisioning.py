@@ -0,0 +1,149 @@
+"""
+Bulk Device Provisioning
+
+Onboarding an installer with thousands of Pis, one register_new_device call
+at a time, is impractical. This streams a JSONL or CSV upload:
+
+    {"device_id": "pi_acme_0001", "customer_id": "acme", "name": "Lobby"}
+
+    device_id,customer_id,name
+    pi_acme_0001,acme,Lobby
+
+- The upload is spooled (memory up to 1 MB, then a temp file) and parsed line by line
+- Rows are processed in batches of BULK_BATCH_SIZE; each batch is a
+  transaction: one invalid row rejects the whole batch, nothing is written.
+  A valid batch is fsynced to DEVICE_REGISTRY_PATH before its secrets are
+  returned (without that path, devices only live until the next restart)
+- Secrets for a batch are generated together and hashed in parallel
+- Results stream back as NDJSON, one line per row, batch by batch - the
+  only place the plaintext secrets ever appear
+"""
+
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+import csv
+import json
+import os
+import re
+
+from device_auth import DEVICES, register_devices_bulk
+import ha_instances
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 200))
+BULK_MAX_UPLOAD_BYTES = int(os.getenv("BULK_MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+
+DEVICE_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# (line number, row) or (line number, parse error)
+ParsedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def parse_rows(text_stream, fmt: str) -> Iterator[ParsedRow]:
+    """Yield rows from a JSONL or CSV text stream without loading it whole."""
+    if fmt == "csv":
+        reader = csv.DictReader(text_stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_number, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "expected a JSON object"
+            continue
+        yield line_number, row, None
+
+
+def validate_row(row: Dict[str, Any], seen: Set[str]) -> Tuple[Optional[Tuple[str, str, str]], Optional[str]]:
+    """
+    Returns:
+        ((device_id, customer_id, name), None) or (None, error)
+    """
+    device_id = str(row.get("device_id") or "").strip()
+    customer_id = str(row.get("customer_id") or "").strip()
+    name = str(row.get("name") or device_id).strip()
+
+    if not DEVICE_ID_RE.match(device_id):
+        return None, "device_id must be 1-64 chars of A-Z a-z 0-9 _ . -"
+    if customer_id not in ha_instances.HA_INSTANCES:
+        return None, f"unknown customer_id: {customer_id or '(empty)'}"
+    if device_id in seen:
+        return None, "duplicate device_id in upload"
+    if device_id in DEVICES:
+        return None, "device_id already registered"
+    return (device_id, customer_id, name), None
+
+
+def _line(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, separators=(",", ":")) + "\n"
+
+
+async def _commit_batch(batch: List[Tuple[int, Tuple[str, str, str]]],
+                        errors: List[Tuple[int, str, str]], summary: Dict[str, int]) -> AsyncIterator[str]:
+    """Apply one batch all-or-nothing and yield its result lines."""
+    if not batch and not errors:
+        return
+    summary["batches"] += 1
+
+    if errors:
+        first_line = errors[0][0]
+        for line_number, device_id, error in errors:
+            yield _line({"line": line_number, "device_id": device_id, "error": error})
+        for line_number, (device_id, _, _) in batch:
+            yield _line({"line": line_number, "device_id": device_id,
+                         "error": f"batch rolled back (line {first_line} invalid)"})
+        summary["failed"] += len(errors) + len(batch)
+        return
+
+    try:
+        created = await register_devices_bulk([row for _, row in batch])
+    except (ValueError, OSError) as e:
+        for line_number, (device_id, _, _) in batch:
+            yield _line({"line": line_number, "device_id": device_id, "error": f"batch rolled back ({e})"})
+        summary["failed"] += len(batch)
+        return
+
+    for (line_number, _), device in zip(batch, created):
+        yield _line({
+            "line": line_number,
+            "device_id": device["device_id"],
+            "customer_id": device["customer_id"],
+            "device_secret": device["device_secret"]
+        })
+    summary["created"] += len(created)
+
+
+async def ingest(text_stream, fmt: str) -> AsyncIterator[str]:
+    """Provision every row of an upload; yields NDJSON result lines, then a summary line."""
+    summary = {"created": 0, "failed": 0, "batches": 0}
+    seen: Set[str] = set()
+    batch: List[Tuple[int, Tuple[str, str, str]]] = []
+    errors: List[Tuple[int, str, str]] = []
+
+    for line_number, row, parse_error in parse_rows(text_stream, fmt):
+        if parse_error:
+            errors.append((line_number, "", parse_error))
+        else:
+            valid_row, error = validate_row(row, seen)
+            if error:
+                errors.append((line_number, str(row.get("device_id", "")), error))
+            else:
+                seen.add(valid_row[0])
+                batch.append((line_number, valid_row))
+
+        if len(batch) + len(errors) >= BULK_BATCH_SIZE:
+            async for line in _commit_batch(batch, errors, summary):
+                yield line
+            batch, errors = [], []
+
+    async for line in _commit_batch(batch, errors, summary):
+        yield line
+
+    print(f"📦 Bulk provisioning: {summary['created']} created, {summary['failed']} failed")
+    yield _line({"summary": summary})
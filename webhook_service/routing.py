@@ -0,0 +1,187 @@
+"""
+Compiled Routing Table (device → customer → Home Assistant)
+
+Resolving a webhook used to mean two registry lookups plus rebuilding the HA
+webhook URL on every tool call. The registries are compiled instead into
+frozen Route objects:
+
+- by_device: device_id → Route (the customer's route, shared per tenant)
+- by_customer: customer_id → Route (x-customer-id path)
+- DEFAULT_ROUTE: env-configured HA for legacy/unrouted requests
+
+Each Route holds the resolved webhook URL, the pooled HA client, the tenant
+name and the pre-rendered home_auth welcome text. A customer with several HA
+sites (ha_instances "sites") gets one Route per site; the customer's Route
+is its first site and carries all of them in `sites` for fan-out.
+
+device_auth.DEVICES_VERSION and ha_instances.HA_INSTANCES_VERSION are bumped
+on every registry change; current() compares them (two int reads) and
+rebuilds + swaps the whole table on a mismatch. Readers keep using the
+snapshot they got, so a swap never exposes a half-built table.
+"""
+
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from dataclasses import dataclass, replace
+import os
+
+import httpx
+
+import device_auth
+import ha_instances
+from http_clients import get_ha_client
+
+HOMEASSISTANT_URL = os.getenv("HOMEASSISTANT_URL", "https://ut-demo-urbanjungle.homeadapt.us")
+HOMEASSISTANT_WEBHOOK_ID = os.getenv("HOMEASSISTANT_WEBHOOK_ID", "vapi_air_circulator")
+
+WELCOME_TEMPLATE = "Welcome! Authentication successful. I'm Luna, controlling {name}. How can I help you today?"
+
+
+@dataclass(frozen=True)
+class Route:
+    """Everything needed to serve one tenant's tool calls."""
+    customer_id: Optional[str]
+    tenant_name: str
+    ha_url: str
+    ha_webhook_url: str
+    welcome_text: str
+    site_id: str = "main"
+    site_name: str = ""
+    tags: FrozenSet[str] = frozenset()
+    # HA latency / timeout bucket (ha_hedging): the customer, or customer/site when it has several
+    latency_key: Optional[str] = None
+    sites: Tuple["Route", ...] = ()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled client for this route's HA (re-created after shutdown/close)."""
+        return get_ha_client(self.ha_url)
+
+    def select_sites(self, target: Optional[str]) -> List["Route"]:
+        """
+        Sites a tool call goes to.
+
+        Returns:
+            No target: the first site; "all": every site; otherwise the sites
+            whose site_id, name or a tag matches (possibly none)
+        """
+        sites = self.sites or (self,)
+        if not target:
+            return [sites[0]]
+        target = target.strip().lower()
+        if target in ("all", "everywhere"):
+            return list(sites)
+        return [
+            site for site in sites
+            if target in (site.site_id.lower(), site.site_name.lower()) or target in site.tags
+        ]
+
+
+def ha_tool_payload(device: str, action: str) -> Dict[str, Any]:
+    """HA automation payload (it reads trigger.json.message.toolCalls)."""
+    return {
+        "message": {
+            "toolCalls": [{
+                "function": {
+                    "arguments": {
+                        "device": device,
+                        "action": action
+                    }
+                }
+            }]
+        }
+    }
+
+
+def _compile_route(customer_id: Optional[str], ha_url: str, ha_webhook_id: str, name: str,
+                   site_id: str = "main", site_name: Optional[str] = None,
+                   tags: Optional[List[str]] = None, latency_key: Optional[str] = None) -> Route:
+    ha_url = ha_url.rstrip("/")
+    route = Route(
+        customer_id=customer_id,
+        tenant_name=name,
+        ha_url=ha_url,
+        ha_webhook_url=f"{ha_url}/api/webhook/{ha_webhook_id}",
+        welcome_text=WELCOME_TEMPLATE.format(name=name),
+        site_id=site_id,
+        site_name=site_name or name,
+        tags=frozenset(tag.lower() for tag in tags or ()),
+        latency_key=latency_key or customer_id
+    )
+    get_ha_client(ha_url)  # warm the pooled client
+    return route
+
+
+def _compile_customer(customer_id: str, instance: Dict[str, Any]) -> Route:
+    """The customer's Route: its first site, carrying every site."""
+    name = instance.get("name", "your home")
+    site_configs = ha_instances.get_ha_sites(customer_id)
+    multi_site = len(site_configs) > 1
+    sites = tuple(
+        _compile_route(
+            customer_id,
+            site.get("ha_url") or HOMEASSISTANT_URL,
+            site.get("ha_webhook_id") or HOMEASSISTANT_WEBHOOK_ID,
+            name,
+            site_id=site["site_id"],
+            site_name=site.get("name"),
+            tags=site.get("tags"),
+            latency_key=f"{customer_id}/{site['site_id']}" if multi_site else customer_id
+        )
+        for site in site_configs
+    )
+    return replace(sites[0], sites=sites)
+
+
+DEFAULT_ROUTE = _compile_route(None, HOMEASSISTANT_URL, HOMEASSISTANT_WEBHOOK_ID, "your home")
+
+
+@dataclass(frozen=True)
+class CompiledRoutes:
+    """Immutable snapshot of the registries."""
+    devices_version: int
+    ha_version: int
+    by_device: Dict[str, Route]
+    by_customer: Dict[str, Route]
+
+
+def compile_routes() -> CompiledRoutes:
+    devices_version = device_auth.DEVICES_VERSION
+    ha_version = ha_instances.HA_INSTANCES_VERSION
+
+    by_customer = {
+        customer_id: _compile_customer(customer_id, instance)
+        for customer_id, instance in ha_instances.HA_INSTANCES.items()
+    }
+    by_device = {
+        device_id: by_customer[device["customer_id"]]
+        for device_id, device in device_auth.DEVICES.items()
+        if device.get("customer_id") in by_customer
+    }
+    return CompiledRoutes(devices_version, ha_version, by_device, by_customer)
+
+
+class RoutingTable:
+    """Holds the current compiled snapshot; rebuilds when a registry version changes."""
+
+    def __init__(self):
+        self._routes = compile_routes()
+        self.rebuilds = 0
+
+    def current(self) -> CompiledRoutes:
+        routes = self._routes
+        if (routes.devices_version != device_auth.DEVICES_VERSION
+                or routes.ha_version != ha_instances.HA_INSTANCES_VERSION):
+            routes = compile_routes()
+            self._routes = routes  # atomic swap
+            self.rebuilds += 1
+            print(f"🔀 Routing table rebuilt: {len(routes.by_device)} devices, {len(routes.by_customer)} customers")
+        return routes
+
+    def for_device(self, device_id: str) -> Optional[Route]:
+        return self.current().by_device.get(device_id)
+
+    def for_customer(self, customer_id: str) -> Optional[Route]:
+        return self.current().by_customer.get(customer_id)
+
+
+ROUTING_TABLE = RoutingTable()
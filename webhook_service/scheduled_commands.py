@@ -0,0 +1,476 @@
+"""
+Scheduled Device Commands (hierarchical timing wheel)
+
+"Turn the fan off in 30 minutes": the schedule_device_command tool stores a
+deferred HA action that fires later through the normal forwarding path
+(forward_to_ha - pooled client, adaptive timeout, hedging).
+
+Timers live in a hierarchical timing wheel: SCHEDULER_WHEEL_LEVELS levels of
+64 slots, one tick = SCHEDULER_TICK_SECONDS (4 levels x 1s ≈ 194 days).
+
+- Insert and cancel are O(1): a timer goes into the slot of its due tick at
+  the coarsest level that still resolves it; each slot is a dict, cancel
+  deletes the timer from the slot it is in
+- Each tick fires one level-0 slot; when a level's lower digits roll over,
+  the next slot of that level is cascaded into the finer levels (every timer
+  moves at most SCHEDULER_WHEEL_LEVELS times in its life)
+- Per-tenant index for list / cancel without scanning
+
+Persistence (SCHEDULED_COMMANDS_PATH, JSON lines): "add" / "del" records are
+buffered and appended once per tick in a worker thread; the log is rewritten
+as a snapshot of the live timers when it grows past twice their number.
+On startup the log is replayed - commands due while the proxy was down fire
+immediately, unless overdue by more than SCHEDULED_COMMAND_MISFIRE_SECONDS.
+A command being fired stays in the log until HA answered, so a restart at
+the wrong moment sends it again rather than losing it (at-least-once).
+
+Failed sends are retried SCHEDULED_COMMAND_MAX_ATTEMPTS times,
+SCHEDULED_COMMAND_RETRY_SECONDS apart, to the sites that have not accepted
+the command yet (sites_done is kept in the log with the command). Actions
+that are not idempotent (toggles) are never retried: a send that timed out
+may still have been applied. Disabled persistence (path unset) keeps timers
+in memory only.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import json
+import math
+import os
+import tempfile
+import time
+import uuid
+
+from ha_hedging import is_idempotent
+
+SCHEDULED_COMMANDS_PATH = os.getenv("SCHEDULED_COMMANDS_PATH")
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", 1.0))
+SCHEDULER_WHEEL_LEVELS = int(os.getenv("SCHEDULER_WHEEL_LEVELS", 4))
+SCHEDULED_COMMAND_MAX_DELAY_SECONDS = float(os.getenv("SCHEDULED_COMMAND_MAX_DELAY_SECONDS", 7 * 24 * 3600))
+SCHEDULED_COMMANDS_MAX_PER_TENANT = int(os.getenv("SCHEDULED_COMMANDS_MAX_PER_TENANT", 100))
+SCHEDULED_COMMAND_MISFIRE_SECONDS = float(os.getenv("SCHEDULED_COMMAND_MISFIRE_SECONDS", 900))
+SCHEDULED_COMMAND_MAX_ATTEMPTS = int(os.getenv("SCHEDULED_COMMAND_MAX_ATTEMPTS", 3))
+SCHEDULED_COMMAND_RETRY_SECONDS = float(os.getenv("SCHEDULED_COMMAND_RETRY_SECONDS", 30))
+SCHEDULED_COMMAND_CONCURRENCY = int(os.getenv("SCHEDULED_COMMAND_CONCURRENCY", 50))
+
+WHEEL_BITS = 6
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SIZE - 1
+
+# Log records beyond 2x the live timers (and at least this many) trigger a rewrite
+COMPACT_MIN_RECORDS = 1000
+
+
+def format_delay(seconds: float) -> str:
+    """Spoken duration: "30 minutes", "1 hour 15 minutes", "45 seconds"."""
+    seconds = max(0, int(round(seconds)))
+    if seconds < 60:
+        return f"{seconds} second{'s' if seconds != 1 else ''}"
+    minutes = round(seconds / 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    parts = []
+    for value, unit in ((days, "day"), (hours, "hour"), (minutes, "minute")):
+        if value:
+            parts.append(f"{value} {unit}{'s' if value != 1 else ''}")
+    return " ".join(parts)
+
+
+class ScheduledCommand:
+    """One deferred HA action."""
+
+    __slots__ = ("id", "customer_id", "device", "action", "target", "due_at", "created_at",
+                 "call_id", "attempts", "sites_done", "tick", "bucket")
+
+    def __init__(self, id: str, customer_id: Optional[str], device: str, action: str,
+                 due_at: float, created_at: float, call_id: Optional[str] = None, attempts: int = 0,
+                 target: Optional[str] = None, sites_done: Optional[List[str]] = None):
+        self.id = id
+        self.customer_id = customer_id
+        self.device = device
+        self.action = action
+        self.target = target  # site selection (routing.Route.select_sites); None = first site
+        self.due_at = due_at
+        self.created_at = created_at
+        self.call_id = call_id
+        self.attempts = attempts
+        self.sites_done = sites_done or []  # site ids that accepted it (skipped on retry)
+        self.tick = 0
+        self.bucket: Optional[Dict[str, "ScheduledCommand"]] = None  # wheel slot holding it
+
+    @property
+    def tenant(self) -> str:
+        return self.customer_id or "default"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "customer_id": self.customer_id,
+            "device": self.device,
+            "action": self.action,
+            "target": self.target,
+            "due_at": self.due_at,
+            "created_at": self.created_at,
+            "call_id": self.call_id,
+            "attempts": self.attempts,
+            "sites_done": self.sites_done
+        }
+
+    def describe(self, now: Optional[float] = None) -> str:
+        remaining = self.due_at - (now or time.time())
+        where = f" at {self.target}" if self.target else ""
+        return f"{self.device} {self.action.replace('_', ' ')}{where} in {format_delay(remaining)}"
+
+
+class TimingWheel:
+    """Hashed hierarchical timing wheel over integer ticks."""
+
+    def __init__(self, now_tick: int, levels: int = SCHEDULER_WHEEL_LEVELS):
+        self.now = now_tick
+        self.levels = levels
+        self._slots = [[{} for _ in range(WHEEL_SIZE)] for _ in range(levels)]
+        self._expired: Dict[str, ScheduledCommand] = {}  # due at or before now
+        self.count = 0
+
+    def insert(self, timer: ScheduledCommand) -> None:
+        self.count += 1
+        self._place(timer)
+
+    def _place(self, timer: ScheduledCommand) -> None:
+        delta = timer.tick - self.now
+        if delta <= 0:
+            bucket = self._expired
+        else:
+            level = 0
+            while level < self.levels - 1 and delta >= 1 << (WHEEL_BITS * (level + 1)):
+                level += 1
+            # Beyond the top level's span the timer is re-cascaded each rotation
+            bucket = self._slots[level][(timer.tick >> (WHEEL_BITS * level)) & WHEEL_MASK]
+        bucket[timer.id] = timer
+        timer.bucket = bucket
+
+    def remove(self, timer: ScheduledCommand) -> bool:
+        if timer.bucket is None:
+            return False
+        del timer.bucket[timer.id]
+        timer.bucket = None
+        self.count -= 1
+        return True
+
+    def advance(self, target_tick: int) -> List[ScheduledCommand]:
+        """Move to target_tick; returns (and removes) every timer now due."""
+        if target_tick - self.now > WHEEL_SIZE * WHEEL_SIZE:
+            self._rebuild(target_tick)  # long stall / clock jump: one O(n) pass
+
+        due: List[ScheduledCommand] = []
+        while self.now < target_tick:
+            self.now += 1
+            tick = self.now
+            for level in range(self.levels - 1, 0, -1):
+                if tick & ((1 << (WHEEL_BITS * level)) - 1):
+                    continue
+                index = (tick >> (WHEEL_BITS * level)) & WHEEL_MASK
+                bucket = self._slots[level][index]
+                if bucket:
+                    self._slots[level][index] = {}
+                    for timer in bucket.values():
+                        self._place(timer)
+            index = tick & WHEEL_MASK
+            bucket = self._slots[0][index]
+            if bucket:
+                self._slots[0][index] = {}
+                due.extend(bucket.values())
+
+        if self._expired:
+            due.extend(self._expired.values())
+            self._expired = {}
+        for timer in due:
+            timer.bucket = None
+        self.count -= len(due)
+        return due
+
+    def _rebuild(self, target_tick: int) -> None:
+        timers = list(self._expired.values())
+        for level in self._slots:
+            for bucket in level:
+                timers.extend(bucket.values())
+                bucket.clear()
+        self._expired = {}
+        self.now = target_tick
+        for timer in timers:
+            self._place(timer)
+
+
+class CommandScheduler:
+    """Tenant-scoped scheduled HA commands on a timing wheel, persisted to a JSON-lines log."""
+
+    def __init__(self, path: Optional[str] = SCHEDULED_COMMANDS_PATH):
+        self.path = path
+        self.wheel = TimingWheel(self._current_tick())
+        self._commands: Dict[str, ScheduledCommand] = {}
+        self._by_tenant: Dict[str, Dict[str, ScheduledCommand]] = {}
+
+        self._fire_handler: Optional[Callable[[ScheduledCommand], Awaitable[bool]]] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._firing: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+
+        self._pending_records: List[str] = []
+        self._log_records = 0
+
+        self.fired = 0
+        self.failed = 0
+        self.retried = 0
+        self.missed = 0
+        self.cancelled = 0
+
+    @staticmethod
+    def _tick_of(timestamp: float) -> int:
+        """Due tick: the first tick boundary at or after timestamp."""
+        return math.ceil(timestamp / SCHEDULER_TICK_SECONDS)
+
+    @staticmethod
+    def _current_tick() -> int:
+        return math.floor(time.time() / SCHEDULER_TICK_SECONDS)
+
+    # ----------------------------------------
+    # Tenant operations
+    # ----------------------------------------
+
+    def schedule(self, customer_id: Optional[str], device: str, action: str,
+                 delay_seconds: float, call_id: Optional[str] = None,
+                 target: Optional[str] = None) -> ScheduledCommand:
+        """
+        Schedule device/action to be sent to the tenant's HA after delay_seconds.
+
+        Raises:
+            ValueError: Delay out of range or the tenant has too many pending commands
+        """
+        if not 0 < delay_seconds <= SCHEDULED_COMMAND_MAX_DELAY_SECONDS:
+            raise ValueError(f"Delay must be between 1 second and {format_delay(SCHEDULED_COMMAND_MAX_DELAY_SECONDS)}")
+        tenant = customer_id or "default"
+        if len(self._by_tenant.get(tenant, ())) >= SCHEDULED_COMMANDS_MAX_PER_TENANT:
+            raise ValueError(f"Too many scheduled commands (limit {SCHEDULED_COMMANDS_MAX_PER_TENANT})")
+
+        command_id = uuid.uuid4().hex[:8]
+        while command_id in self._commands:
+            command_id = uuid.uuid4().hex[:8]
+        now = time.time()
+        command = ScheduledCommand(command_id, customer_id, device, action,
+                                   now + delay_seconds, now, call_id, target=target)
+        self._add(command)
+        self._record("add", command)
+        return command
+
+    def list(self, customer_id: Optional[str]) -> List[ScheduledCommand]:
+        """The tenant's pending commands, soonest first."""
+        commands = self._by_tenant.get(customer_id or "default", {})
+        return sorted(commands.values(), key=lambda command: command.due_at)
+
+    def cancel(self, customer_id: Optional[str], command_id: str) -> Optional[ScheduledCommand]:
+        """Cancel one of the tenant's commands (None if it has no such command)."""
+        command = self._by_tenant.get(customer_id or "default", {}).get(command_id)
+        if command is None:
+            return None
+        self._finish(command)
+        self.cancelled += 1
+        return command
+
+    def cancel_device(self, customer_id: Optional[str], device: str) -> List[ScheduledCommand]:
+        """Cancel all of the tenant's commands for a device."""
+        device = device.lower()
+        cancelled = [command for command in self.list(customer_id) if command.device.lower() == device]
+        for command in cancelled:
+            self._finish(command)
+        self.cancelled += len(cancelled)
+        return cancelled
+
+    # ----------------------------------------
+    # Index + wheel
+    # ----------------------------------------
+
+    def _add(self, command: ScheduledCommand) -> None:
+        command.tick = self._tick_of(command.due_at)
+        self._commands[command.id] = command
+        self._by_tenant.setdefault(command.tenant, {})[command.id] = command
+        self.wheel.insert(command)
+
+    def _finish(self, command: ScheduledCommand) -> None:
+        """Drop a command for good (fired, given up or cancelled)."""
+        self.wheel.remove(command)  # no-op while it is being fired
+        if self._commands.pop(command.id, None) is None:
+            return
+        tenant = self._by_tenant.get(command.tenant)
+        if tenant is not None:
+            tenant.pop(command.id, None)
+            if not tenant:
+                del self._by_tenant[command.tenant]
+        self._record("del", command)
+
+    # ----------------------------------------
+    # Firing
+    # ----------------------------------------
+
+    def start(self, fire: Callable[[ScheduledCommand], Awaitable[bool]]) -> None:
+        """Replay the log and start ticking (inside the running event loop)."""
+        if self._task is not None:
+            return
+        self._fire_handler = fire
+        self._semaphore = asyncio.Semaphore(SCHEDULED_COMMAND_CONCURRENCY)
+        self._stop = asyncio.Event()
+        self.load()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop ticking and write the live timers (in-flight sends are kept for the next start)."""
+        if self._task is None:
+            return
+        self._stop.set()
+        await self._task
+        self._task = None
+        for task in list(self._firing):
+            task.cancel()
+        if self.path:
+            await asyncio.to_thread(self._write_snapshot, [c.to_dict() for c in self._commands.values()])
+
+    async def _run(self) -> None:
+        while not self._stop.is_set():
+            delay = SCHEDULER_TICK_SECONDS - time.time() % SCHEDULER_TICK_SECONDS
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+            for command in self.wheel.advance(self._current_tick()):
+                task = asyncio.create_task(self._fire(command))
+                self._firing.add(task)
+                task.add_done_callback(self._firing.discard)
+
+            try:
+                await self._flush()
+            except Exception as e:
+                print(f"❌ Scheduled commands log write failed: {e}")
+
+    async def _fire(self, command: ScheduledCommand) -> None:
+        late = time.time() - command.due_at
+        if late > SCHEDULED_COMMAND_MISFIRE_SECONDS:
+            print(f"⏰ Scheduled command {command.id} skipped: {format_delay(late)} late")
+            self.missed += 1
+            self._finish(command)
+            return
+
+        async with self._semaphore:
+            try:
+                ok = await self._fire_handler(command)
+            except Exception as e:
+                print(f"❌ Scheduled command {command.id} failed: {e}")
+                ok = False
+
+        if command.id not in self._commands:
+            return  # cancelled while it was being sent
+        command.attempts += 1
+        if ok:
+            self.fired += 1
+        elif not is_idempotent(command.action):
+            print(f"⏰ Scheduled command {command.id} not retried: {command.action} is not idempotent")
+            self.failed += 1
+        elif command.attempts < SCHEDULED_COMMAND_MAX_ATTEMPTS:
+            self.retried += 1
+            command.due_at = time.time() + SCHEDULED_COMMAND_RETRY_SECONDS
+            self._add(command)
+            self._record("add", command)
+            return
+        else:
+            self.failed += 1
+        self._finish(command)
+
+    # ----------------------------------------
+    # Persistence
+    # ----------------------------------------
+
+    def _record(self, op: str, command: ScheduledCommand) -> None:
+        if not self.path:
+            return
+        record = {"op": op, **command.to_dict()} if op == "add" else {"op": op, "id": command.id}
+        self._pending_records.append(json.dumps(record, separators=(",", ":")))
+
+    async def _flush(self) -> None:
+        """Append buffered records, or rewrite the log when it is mostly dead records."""
+        if not self.path or not self._pending_records:
+            return
+        if self._log_records + len(self._pending_records) > max(2 * len(self._commands), COMPACT_MIN_RECORDS):
+            self._pending_records = []
+            snapshot = [command.to_dict() for command in self._commands.values()]
+            await asyncio.to_thread(self._write_snapshot, snapshot)
+        else:
+            records, self._pending_records = self._pending_records, []
+            await asyncio.to_thread(self._append, records)
+
+    def _append(self, records: List[str]) -> None:
+        with open(self.path, "a") as f:
+            f.write("\n".join(records) + "\n")
+        self._log_records += len(records)
+
+    def _write_snapshot(self, commands: List[Dict[str, Any]]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".scheduled-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                for command in commands:
+                    f.write(json.dumps({"op": "add", **command}, separators=(",", ":")) + "\n")
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self._log_records = len(commands)
+
+    def load(self) -> None:
+        """Replay the log into the wheel."""
+        if not self.path:
+            print("⚠️  SCHEDULED_COMMANDS_PATH not set - scheduled commands are not persisted")
+            return
+
+        live: Dict[str, Dict[str, Any]] = {}
+        records = 0
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of a crash
+                    records += 1
+                    if record.pop("op", None) == "add":
+                        live[record["id"]] = record
+                    else:
+                        live.pop(record.get("id"), None)
+        except FileNotFoundError:
+            return
+        self._log_records = records
+
+        self.wheel = TimingWheel(self._current_tick())
+        self._commands.clear()
+        self._by_tenant.clear()
+        for record in live.values():
+            self._add(ScheduledCommand(**record))
+        print(f"⏰ Scheduled commands restored: {len(live)} pending")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._commands),
+            "in_wheel": self.wheel.count,
+            "firing": len(self._firing),
+            "tenants": len(self._by_tenant),
+            "fired": self.fired,
+            "failed": self.failed,
+            "retried": self.retried,
+            "missed": self.missed,
+            "cancelled": self.cancelled,
+            "log_records": self._log_records,
+            "persisted": bool(self.path)
+        }
+
+
+SCHEDULER = CommandScheduler()
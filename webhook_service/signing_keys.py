@@ -0,0 +1,362 @@
+"""
+JWT Signing Key Set
+
+Asymmetric signing for device tokens (EdDSA / ES256) with key IDs.
+
+- Only the node holding the active private key can issue tokens
+- Verifiers only need public keys (file drop or /.well-known/jwks.json)
+- Several verification keys stay active, so rotation never forces a re-auth storm
+- Keys are parsed once when loaded and cached as key objects
+
+Key files (JWT_KEYS_DIR):
+- {kid}.pem      PKCS8 private key (signing + verification)
+- {kid}.pub.pem  public key, written for every key when it is created; on
+                 its own (private key removed) it marks a retired key
+
+Verify-only nodes (JWT_SIGNING_ENABLED=0) read only the *.pub.pem files:
+they never read, generate or write a private key, never delete files and
+refuse to issue tokens. Retired keys are dropped when the signing node
+removes their files; tokens they signed expire on their own anyway.
+
+Rotation:
+- rotate() creates a new signing key and retires the old one to verification-only
+- Retired keys are kept for TOKEN_TTL + leeway, then pruned
+- Only one node should rotate (JWT_ROTATION_INTERVAL_HOURS > 0); the others
+  reload the directory periodically and on an unknown kid
+"""
+
+from typing import Dict, Any, Optional, Tuple
+from dataclasses import dataclass
+import asyncio
+import os
+import secrets
+import threading
+import time
+
+import jwt
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "EdDSA")  # "EdDSA" (Ed25519) or "ES256"
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", "")
+JWT_ROTATION_INTERVAL_HOURS = float(os.getenv("JWT_ROTATION_INTERVAL_HOURS", 0))
+JWT_KEYS_RELOAD_SECONDS = int(os.getenv("JWT_KEYS_RELOAD_SECONDS", 60))
+# 0 = verification-only node (public keys only, never issues tokens)
+JWT_SIGNING_ENABLED = os.getenv("JWT_SIGNING_ENABLED", "1") == "1"
+
+# Legacy HS256 secret - only accepted for verifying kid-less tokens during migration
+JWT_LEGACY_SECRET = os.getenv("JWT_SECRET")
+
+# How long a retired key keeps verifying (must exceed the token TTL)
+RETIRED_KEY_RETENTION_SECONDS = int(os.getenv("JWT_RETIRED_KEY_RETENTION_SECONDS", 15 * 60 + 300))
+
+# Minimum gap between directory reloads triggered by an unknown kid
+_UNKNOWN_KID_RELOAD_INTERVAL = 5.0
+
+
+@dataclass
+class VerificationKey:
+    """Parsed public key for one kid."""
+    kid: str
+    algorithm: str
+    public_key: Any
+    retire_at: Optional[float] = None  # None = still active
+
+
+def _generate_private_key(algorithm: str):
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+
+
+def _algorithm_for_key(key) -> str:
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return "EdDSA"
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        return "ES256"
+    raise ValueError(f"Unsupported key type: {type(key).__name__}")
+
+
+def _write_file_atomic(path: str, data: bytes, mode: int) -> None:
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class KeySet:
+    """Active signing key plus all keys currently accepted for verification."""
+
+    def __init__(self, algorithm: str = JWT_ALGORITHM, keys_dir: str = JWT_KEYS_DIR,
+                 signing_enabled: bool = JWT_SIGNING_ENABLED):
+        self.algorithm = algorithm
+        self.keys_dir = keys_dir
+        self.signing_enabled = signing_enabled
+        self.signing_kid: Optional[str] = None
+        self._signing_key = None
+        self._verification_keys: Dict[str, VerificationKey] = {}
+        self._loaded_files: Dict[str, Tuple[float, bool]] = {}  # path -> (mtime, retired)
+        self._last_rotation = time.time()
+        self._last_unknown_kid_reload = 0.0
+        self._lock = threading.Lock()
+
+    # ----------------------------------------
+    # Loading
+    # ----------------------------------------
+
+    def load(self) -> None:
+        """Load keys from JWT_KEYS_DIR, or create an ephemeral signing key."""
+        if not self.signing_enabled:
+            if not self.keys_dir or not os.path.isdir(self.keys_dir):
+                print(f"⚠️  JWT_SIGNING_ENABLED=0 but JWT_KEYS_DIR ({self.keys_dir or 'unset'}) "
+                      f"is not a directory - no verification keys")
+                return
+            self.reload()
+            print(f"🔑 Verify-only: {len(self._verification_keys)} public key(s) loaded")
+            return
+
+        if self.keys_dir:
+            os.makedirs(self.keys_dir, mode=0o700, exist_ok=True)
+            self.reload()
+            if self._signing_key is not None:
+                # Keys created before public halves were written at creation
+                self._write_public_key(self.signing_kid, self._signing_key.public_key(), overwrite=False)
+
+        if self._signing_key is None:
+            if self.keys_dir:
+                print(f"🔑 No signing key in {self.keys_dir} - generating one")
+            else:
+                print("⚠️  JWT_KEYS_DIR not set - using an ephemeral signing key (tokens die with this process)")
+            self.rotate()
+
+    def reload(self) -> None:
+        """Pick up new/removed key files. Unchanged files are not re-parsed."""
+        if not self.keys_dir:
+            return
+
+        seen = set()
+        newest_private = None
+
+        for filename in os.listdir(self.keys_dir):
+            if not filename.endswith(".pem"):
+                continue
+            path = os.path.join(self.keys_dir, filename)
+            is_public = filename.endswith(".pub.pem")
+            kid = filename[:-len(".pub.pem")] if is_public else filename[:-len(".pem")]
+            if not is_public and not self.signing_enabled:
+                continue  # verify-only nodes never touch private keys
+            mtime = os.path.getmtime(path)
+            seen.add(kid)
+
+            # Signing node: a public key next to its private key is the same (active)
+            # key - the private file covers it; on its own it is retired, and its
+            # mtime is the retirement time
+            retired = False
+            if is_public and self.signing_enabled:
+                if os.path.exists(os.path.join(self.keys_dir, f"{kid}.pem")):
+                    continue
+                retired = True
+                if time.time() - mtime > RETIRED_KEY_RETENTION_SECONDS:
+                    # Retired long enough ago that no token signed with it can still be valid
+                    os.remove(path)
+                    seen.discard(kid)
+                    continue
+
+            if not is_public and (newest_private is None or mtime > newest_private[1]):
+                newest_private = (kid, mtime, path)
+
+            if self._loaded_files.get(path) == (mtime, retired):
+                continue
+
+            with open(path, "rb") as f:
+                data = f.read()
+
+            if is_public:
+                public_key = serialization.load_pem_public_key(data)
+                retire_at = mtime + RETIRED_KEY_RETENTION_SECONDS if retired else None
+            else:
+                public_key = serialization.load_pem_private_key(data, password=None).public_key()
+                retire_at = None
+
+            with self._lock:
+                self._verification_keys[kid] = VerificationKey(
+                    kid=kid,
+                    algorithm=_algorithm_for_key(public_key),
+                    public_key=public_key,
+                    retire_at=retire_at
+                )
+            self._loaded_files[path] = (mtime, retired)
+
+        active_kid = JWT_ACTIVE_KID or (newest_private[0] if newest_private else None)
+        if self.signing_enabled and active_kid and active_kid != self.signing_kid:
+            path = os.path.join(self.keys_dir, f"{active_kid}.pem")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    private_key = serialization.load_pem_private_key(f.read(), password=None)
+                with self._lock:
+                    self._signing_key = private_key
+                    self.signing_kid = active_kid
+                print(f"🔑 Signing with key {active_kid}")
+
+        with self._lock:
+            for kid in list(self._verification_keys):
+                if kid not in seen and kid != self.signing_kid:
+                    del self._verification_keys[kid]
+            self._loaded_files = {p: m for p, m in self._loaded_files.items() if os.path.exists(p)}
+
+    # ----------------------------------------
+    # Rotation
+    # ----------------------------------------
+
+    def _write_public_key(self, kid: str, public_key, overwrite: bool = True) -> None:
+        path = os.path.join(self.keys_dir, f"{kid}.pub.pem")
+        if not overwrite and os.path.exists(path):
+            return
+        pem = public_key.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        _write_file_atomic(path, pem, 0o644)
+
+    def rotate(self) -> str:
+        """
+        Create a new signing key; the previous one keeps verifying until retired.
+
+        Returns:
+            The new kid
+        Raises:
+            RuntimeError: Verify-only node (JWT_SIGNING_ENABLED=0)
+        """
+        if not self.signing_enabled:
+            raise RuntimeError("JWT signing disabled on this node (JWT_SIGNING_ENABLED=0)")
+        private_key = _generate_private_key(self.algorithm)
+        kid = f"{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{secrets.token_hex(4)}"
+        now = time.time()
+
+        if self.keys_dir:
+            pem = private_key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption()
+            )
+            # Public half first: verifiers can check tokens from the first one signed
+            self._write_public_key(kid, private_key.public_key())
+            _write_file_atomic(os.path.join(self.keys_dir, f"{kid}.pem"), pem, 0o600)
+
+        with self._lock:
+            old_kid, old_key = self.signing_kid, self._signing_key
+            self._signing_key = private_key
+            self.signing_kid = kid
+            self._verification_keys[kid] = VerificationKey(
+                kid=kid,
+                algorithm=self.algorithm,
+                public_key=private_key.public_key()
+            )
+            if old_kid and old_kid in self._verification_keys:
+                self._verification_keys[old_kid].retire_at = now + RETIRED_KEY_RETENTION_SECONDS
+            self._last_rotation = now
+
+        if self.keys_dir and old_kid and old_key is not None:
+            # Keep only the public half of the retired key on disk (rewritten: mtime = retired at)
+            old_path = os.path.join(self.keys_dir, f"{old_kid}.pem")
+            self._write_public_key(old_kid, old_key.public_key())
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+        print(f"🔄 JWT signing key rotated: {old_kid} → {kid}")
+        return kid
+
+    def prune(self) -> None:
+        """Drop retired verification keys past their retention window."""
+        now = time.time()
+        with self._lock:
+            for kid, key in list(self._verification_keys.items()):
+                if key.retire_at is not None and key.retire_at < now:
+                    del self._verification_keys[kid]
+                    print(f"🗑️  JWT verification key retired: {kid}")
+
+    def rotation_due(self) -> bool:
+        if not self.signing_enabled or JWT_ROTATION_INTERVAL_HOURS <= 0:
+            return False
+        return time.time() - self._last_rotation >= JWT_ROTATION_INTERVAL_HOURS * 3600
+
+    # ----------------------------------------
+    # Signing / verification
+    # ----------------------------------------
+
+    def sign(self, payload: Dict[str, Any]) -> str:
+        """
+        Sign a payload with the active key (kid in the JWT header).
+
+        Raises:
+            RuntimeError: Verify-only node (JWT_SIGNING_ENABLED=0)
+        """
+        if not self.signing_enabled:
+            raise RuntimeError("JWT signing disabled on this node (JWT_SIGNING_ENABLED=0)")
+        with self._lock:
+            key, kid = self._signing_key, self.signing_kid
+        return jwt.encode(payload, key, algorithm=_algorithm_for_key(key), headers={"kid": kid})
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a token against the key named by its kid header.
+
+        Raises:
+            jwt.InvalidTokenError (incl. ExpiredSignatureError) if invalid
+        """
+        kid = jwt.get_unverified_header(token).get("kid")
+
+        if kid is None:
+            if not JWT_LEGACY_SECRET:
+                raise jwt.InvalidTokenError("Missing kid")
+            return jwt.decode(token, JWT_LEGACY_SECRET, algorithms=["HS256"])
+
+        key = self._verification_keys.get(kid)
+        if key is None and self.keys_dir:
+            # Possibly rotated on another node - reload at most every few seconds
+            now = time.monotonic()
+            if now - self._last_unknown_kid_reload > _UNKNOWN_KID_RELOAD_INTERVAL:
+                self._last_unknown_kid_reload = now
+                self.reload()
+                key = self._verification_keys.get(kid)
+
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown kid: {kid}")
+
+        return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
+    def jwks(self) -> Dict[str, Any]:
+        """Public verification keys as a JWK Set."""
+        keys = []
+        with self._lock:
+            verification_keys = list(self._verification_keys.values())
+        for key in verification_keys:
+            if key.algorithm == "EdDSA":
+                jwk = OKPAlgorithm.to_jwk(key.public_key, as_dict=True)
+            else:
+                jwk = ECAlgorithm.to_jwk(key.public_key, as_dict=True)
+            jwk.update({"kid": key.kid, "alg": key.algorithm, "use": "sig"})
+            keys.append(jwk)
+        return {"keys": keys}
+
+
+KEY_SET = KeySet()
+KEY_SET.load()
+
+
+async def key_maintenance_loop() -> None:
+    """Background task: scheduled rotation, pruning and reloading of key files."""
+    while True:
+        await asyncio.sleep(JWT_KEYS_RELOAD_SECONDS)
+        try:
+            if KEY_SET.rotation_due():
+                KEY_SET.rotate()
+            KEY_SET.prune()
+            KEY_SET.reload()
+        except Exception as e:
+            print(f"❌ JWT key maintenance failed: {e}")
@@ -0,0 +1,140 @@
+"""
+Idempotent Tool-Call Execution
+
+VAPI redelivers a tool-calls webhook when the proxy is slow to answer. Without
+deduplication the HA action runs twice (e.g. a door toggles twice).
+
+- Key: toolCallId, or call.id + tool name + canonical arguments when there is none
+- A redelivery that arrives while the first run is in flight awaits that run
+- A redelivery after completion gets the cached result (TTL + LRU bounded)
+- Failed runs (exceptions, or results rejected by `cacheable`) are not cached,
+  so a retry after an HA error really retries
+
+Note: the call.id + arguments fallback also collapses a user repeating the exact
+same command within TOOL_CALL_DEDUP_TTL_SECONDS of the same call.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+TOOL_CALL_DEDUP_TTL_SECONDS = float(os.getenv("TOOL_CALL_DEDUP_TTL_SECONDS", 120))
+TOOL_CALL_DEDUP_MAX_ENTRIES = int(os.getenv("TOOL_CALL_DEDUP_MAX_ENTRIES", 10000))
+
+
+def tool_call_key(customer_id: Optional[str], tool_call_id: Optional[str],
+                  call_id: Optional[str], function_call: Dict[str, Any]) -> Optional[str]:
+    """
+    Deduplication key for a tool call, or None if it cannot be identified.
+
+    Prefers VAPI's toolCallId; falls back to call.id + name + arguments.
+    """
+    tenant = customer_id or "-"
+    if tool_call_id:
+        return f"{tenant}:{tool_call_id}"
+    if not call_id:
+        return None
+
+    arguments = function_call.get("parameters") or function_call.get("arguments") or {}
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments)
+        except ValueError:
+            pass
+    canonical = json.dumps({"name": function_call.get("name", ""), "arguments": arguments}, sort_keys=True)
+    digest = hashlib.sha256(canonical.encode()).hexdigest()[:32]
+    return f"{tenant}:{call_id}:{digest}"
+
+
+class ToolCallCache:
+    """Single-flight + TTL/LRU result cache for tool calls."""
+
+    def __init__(self, ttl: float = TOOL_CALL_DEDUP_TTL_SECONDS,
+                 max_entries: int = TOOL_CALL_DEDUP_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key → (expires_at, result)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.joins = 0
+        self.misses = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]],
+                  cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Run factory() once per key.
+
+        Returns:
+            The (possibly cached or shared) result
+        Raises:
+            Whatever factory() raises - also to redeliveries waiting on it
+        """
+        entry = self._results.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._results.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._results[key]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.joins += 1
+            return await asyncio.shield(in_flight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved - no "never retrieved" warning without waiters
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        if cacheable is None or cacheable(result):
+            self._store(key, result)
+        future.set_result(result)
+        return result
+
+    def _store(self, key: str, result: Any) -> None:
+        self._results[key] = (time.monotonic() + self.ttl, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def snapshot(self) -> List[List[Any]]:
+        """Unexpired JSON-serializable entries as [key, seconds left, result], LRU first."""
+        now = time.monotonic()
+        return [
+            [key, expires_at - now, result]
+            for key, (expires_at, result) in self._results.items()
+            if expires_at > now
+        ]
+
+    def restore(self, entries: List[List[Any]], elapsed: float = 0.0) -> None:
+        """Reload snapshot() entries, minus the time elapsed since it was taken."""
+        now = time.monotonic()
+        for key, remaining, result in entries:
+            if remaining - elapsed > 0:
+                self._results[key] = (now + remaining - elapsed, result)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._results),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "joins": self.joins,
+            "misses": self.misses
+        }
@@ -0,0 +1,55 @@
+"""
+VAPI REST API calls made by the proxy on behalf of devices
+
+The VAPI API key never leaves the proxy. Calls go through the shared
+pooled client (see http_clients.py) to VAPI_BASE_URL.
+"""
+
+from typing import Dict, Any
+
+from http_clients import get_vapi_client
+
+
+def _headers(vapi_api_key: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {vapi_api_key}",
+        "Content-Type": "application/json"
+    }
+
+
+async def create_web_call(vapi_api_key: str, assistant_id: str,
+                          assistant_overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    POST /call/web
+
+    Format matches vapi-python SDK: {'assistantId': ..., 'assistantOverrides': ...}
+
+    Raises:
+        httpx.HTTPStatusError on a non-2xx response
+    """
+    response = await get_vapi_client().post(
+        "/call/web",
+        headers=_headers(vapi_api_key),
+        json={
+            "assistantId": assistant_id,
+            "assistantOverrides": assistant_overrides
+        }
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def end_call(vapi_api_key: str, call_id: str) -> Dict[str, Any]:
+    """
+    PATCH /call/{id} with status=ended
+
+    Raises:
+        httpx.HTTPStatusError on a non-2xx response
+    """
+    response = await get_vapi_client().patch(
+        f"/call/{call_id}",
+        headers=_headers(vapi_api_key),
+        json={"status": "ended"}
+    )
+    response.raise_for_status()
+    return response.json()
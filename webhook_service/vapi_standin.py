@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Local VAPI REST API Stand-in (offline benchmarking)
+
+Implements just enough of api.vapi.ai for the proxy:
+- POST  /call/web    → fake web call ({"id", "webCallUrl", ...})
+- PATCH /call/{id}   → {"status": "ended"}
+
+With configurable latency and error injection, and replays realistic webhook
+event sequences (status-update, transcript, tool-calls, conversation-update,
+end-of-call-report) to the call's serverUrl - i.e. the proxy's
+/webhook?device_id=... that the Pi passes in assistantOverrides.
+
+Usage:
+    # Stand-in on :8100, proxy pointed at it
+    python vapi_standin.py serve --port 8100 --latency-ms 300 --error-rate 0.05
+    VAPI_BASE_URL=http://localhost:8100 VAPI_API_KEY=test python main.py
+
+    # Fire webhook sequences at the proxy without creating calls
+    python vapi_standin.py replay --proxy-url http://localhost:8001 \\
+        --device-id pi_urbanjungle_001 --sequence tools --count 200 --concurrency 20
+
+Runtime knobs: GET/POST /_standin/config, GET /_standin/stats
+"""
+
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import httpx
+
+from call_stats import LatencySketch
+
+# Defaults (overridable by CLI flags or POST /_standin/config)
+STANDIN_CONFIG: Dict[str, Any] = {
+    "latency_ms": float(os.getenv("STANDIN_LATENCY_MS", 250)),
+    "jitter_ms": float(os.getenv("STANDIN_JITTER_MS", 100)),
+    "error_rate": float(os.getenv("STANDIN_ERROR_RATE", 0)),
+    "error_status": int(os.getenv("STANDIN_ERROR_STATUS", 500)),
+    # Webhook sequence sent to serverUrl after each created call ("" = none)
+    "sequence": os.getenv("STANDIN_SEQUENCE", "basic"),
+    # Delay between webhook events within a sequence
+    "event_gap_ms": float(os.getenv("STANDIN_EVENT_GAP_MS", 200)),
+}
+
+stats: Dict[str, Any] = {
+    "calls_created": 0,
+    "calls_ended": 0,
+    "errors_injected": 0,
+    "webhooks_sent": 0,
+    "webhook_failures": 0,
+    # Bounded: fixed-size quantile sketch, not a list of every sample
+    "webhook_latency": LatencySketch()
+}
+
+# call_id → serverUrl (PATCH {"status": "ended"} stops the call's sequence and
+# sends its end-of-call-report)
+active_calls: Dict[str, str] = {}
+_background: set = set()
+
+app = FastAPI(title="VAPI Stand-in", version="1.0.0")
+
+
+# ========================================
+# Webhook event sequences
+# ========================================
+
+def _call_object(call_id: str) -> Dict[str, Any]:
+    return {"id": call_id, "type": "webCall", "status": "in-progress"}
+
+
+def _event(call_id: str, message: Dict[str, Any]) -> Dict[str, Any]:
+    """VAPI puts the call inside message; the proxy also reads it at the top level."""
+    call = _call_object(call_id)
+    return {"message": {**message, "call": call, "timestamp": int(time.time() * 1000)}, "call": call}
+
+
+def _tool_call(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    tool_call = {
+        "id": f"call_{uuid.uuid4().hex[:24]}",
+        "type": "function",
+        "function": {"name": name, "arguments": arguments}
+    }
+    return {"type": "tool-calls", "toolCallList": [tool_call], "toolCalls": [tool_call]}
+
+
+def build_sequence(name: str, call_id: str) -> List[Dict[str, Any]]:
+    """
+    Webhook payloads for one call, in order.
+
+    - basic: status → home_auth tool call → transcript → conversation → end
+    - tools: basic plus air-circulator and front-door tool calls (hits HA!)
+    """
+    conversation = [
+        {"role": "assistant", "message": "Hi, I'm Luna. How can I help?"},
+        {"role": "user", "message": "Turn on the fan please."}
+    ]
+    events = [
+        {"type": "status-update", "status": "in-progress"},
+        _tool_call("home_auth", {}),
+        {"type": "transcript", "role": "user", "transcriptType": "partial", "transcript": "turn on the"},
+        {"type": "transcript", "role": "user", "transcriptType": "final", "transcript": "Turn on the fan please."},
+        {"type": "conversation-update", "conversation": conversation},
+    ]
+    if name == "tools":
+        events += [
+            _tool_call("control_air_circulator", {"device": "fan", "action": "turn_on"}),
+            _tool_call("control_front_door", {"action": "lock"}),
+        ]
+    events += [
+        {"type": "status-update", "status": "ended", "endedReason": "customer-ended-call"},
+        {"type": "end-of-call-report", "endedReason": "customer-ended-call",
+         "summary": "User asked to turn on the fan.", "messages": conversation},
+    ]
+    return [_event(call_id, message) for message in events]
+
+
+async def send_webhook(client: httpx.AsyncClient, server_url: str, payload: Dict[str, Any]) -> Optional[httpx.Response]:
+    """POST one event to the proxy and record latency."""
+    started = time.perf_counter()
+    try:
+        response = await client.post(server_url, json=payload, timeout=30.0)
+    except httpx.HTTPError as e:
+        stats["webhook_failures"] += 1
+        print(f"❌ Webhook {payload['message']['type']} failed: {e}")
+        return None
+    stats["webhooks_sent"] += 1
+    stats["webhook_latency"].add(time.perf_counter() - started)
+    if response.status_code >= 400:
+        stats["webhook_failures"] += 1
+        print(f"⚠️  Webhook {payload['message']['type']} → {response.status_code}")
+    return response
+
+
+async def replay_sequence(client: httpx.AsyncClient, server_url: str, sequence: str,
+                          call_id: str, event_gap_ms: float = 0) -> None:
+    for payload in build_sequence(sequence, call_id):
+        await send_webhook(client, server_url, payload)
+        if event_gap_ms:
+            await asyncio.sleep(event_gap_ms / 1000)
+
+
+# ========================================
+# Fake VAPI REST API
+# ========================================
+
+async def _simulate_upstream() -> Optional[JSONResponse]:
+    """Apply latency; maybe return an injected error."""
+    delay = STANDIN_CONFIG["latency_ms"] + random.uniform(0, STANDIN_CONFIG["jitter_ms"])
+    await asyncio.sleep(delay / 1000)
+    if random.random() < STANDIN_CONFIG["error_rate"]:
+        stats["errors_injected"] += 1
+        return JSONResponse(
+            status_code=STANDIN_CONFIG["error_status"],
+            content={"message": "Injected error from VAPI stand-in"}
+        )
+    return None
+
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _run_call(server_url: str, call_id: str) -> None:
+    """Replay the configured sequence until it ends or the call is ended by PATCH."""
+    async with httpx.AsyncClient() as client:
+        for payload in build_sequence(STANDIN_CONFIG["sequence"], call_id):
+            if call_id not in active_calls:
+                return  # ended via PATCH (which sent the end-of-call-report)
+            await send_webhook(client, server_url, payload)
+            await asyncio.sleep(STANDIN_CONFIG["event_gap_ms"] / 1000)
+    active_calls.pop(call_id, None)
+
+
+async def _end_live_call(server_url: str, call_id: str) -> None:
+    """What VAPI sends when a live call is ended through the API."""
+    ended = {"endedReason": "assistant-ended-call"}
+    async with httpx.AsyncClient() as client:
+        await send_webhook(client, server_url, _event(call_id, {"type": "status-update", "status": "ended", **ended}))
+        await send_webhook(client, server_url, _event(call_id, {"type": "end-of-call-report", **ended}))
+
+
+@app.post("/call/web")
+async def create_web_call(request: Request):
+    error = await _simulate_upstream()
+    if error:
+        return error
+
+    body = await request.json()
+    if not body.get("assistantId"):
+        return JSONResponse(status_code=400, content={"message": "assistantId required"})
+
+    call_id = str(uuid.uuid4())
+    stats["calls_created"] += 1
+
+    server_url = (body.get("assistantOverrides") or {}).get("serverUrl")
+    if server_url:
+        active_calls[call_id] = server_url
+        if STANDIN_CONFIG["sequence"]:
+            _spawn(_run_call(server_url, call_id))
+
+    return JSONResponse(status_code=201, content={
+        "id": call_id,
+        "type": "webCall",
+        "status": "queued",
+        "assistantId": body["assistantId"],
+        "webCallUrl": f"https://standin.daily.co/{call_id}",
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    })
+
+
+@app.patch("/call/{call_id}")
+async def update_call(call_id: str, request: Request):
+    error = await _simulate_upstream()
+    if error:
+        return error
+
+    body = await request.json()
+    if body.get("status") == "ended":
+        stats["calls_ended"] += 1
+        server_url = active_calls.pop(call_id, None)
+        if server_url:
+            _spawn(_end_live_call(server_url, call_id))
+    return {"id": call_id, "status": body.get("status", "in-progress")}
+
+
+# ========================================
+# Stand-in control
+# ========================================
+
+@app.get("/_standin/config")
+async def get_config():
+    return STANDIN_CONFIG
+
+
+@app.post("/_standin/config")
+async def update_config(request: Request):
+    """Change latency / error injection at runtime, e.g. {"error_rate": 0.2}"""
+    updates = await request.json()
+    for key, value in updates.items():
+        if key in STANDIN_CONFIG:
+            STANDIN_CONFIG[key] = type(STANDIN_CONFIG[key])(value)
+    return STANDIN_CONFIG
+
+
+@app.get("/_standin/stats")
+async def get_stats():
+    return summarize_stats()
+
+
+def summarize_stats() -> Dict[str, Any]:
+    latency = stats["webhook_latency"]
+    summary = {key: value for key, value in stats.items() if key != "webhook_latency"}
+    summary["active_calls"] = len(active_calls)
+    if latency.count:
+        summary["webhook_p50_ms"] = round(latency.quantile(0.5) * 1000, 1)
+        summary["webhook_p99_ms"] = round(latency.quantile(0.99) * 1000, 1)
+    return summary
+
+
+# ========================================
+# CLI
+# ========================================
+
+async def replay_main(args) -> None:
+    server_url = f"{args.proxy_url.rstrip('/')}/webhook?device_id={args.device_id}"
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        async def one_call():
+            async with semaphore:
+                await replay_sequence(client, server_url, args.sequence, str(uuid.uuid4()))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_call() for _ in range(args.count)))
+        elapsed = time.perf_counter() - started
+
+    summary = summarize_stats()
+    print(f"📊 {args.count} × '{args.sequence}' sequences in {elapsed:.2f}s "
+          f"({summary['webhooks_sent'] / elapsed:.0f} webhooks/s)")
+    print(f"   p50 {summary.get('webhook_p50_ms')}ms, p99 {summary.get('webhook_p99_ms')}ms, "
+          f"failures {summary['webhook_failures']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local VAPI REST API stand-in")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve", help="run the fake VAPI API")
+    serve.add_argument("--port", type=int, default=8100)
+    serve.add_argument("--latency-ms", type=float, default=STANDIN_CONFIG["latency_ms"])
+    serve.add_argument("--jitter-ms", type=float, default=STANDIN_CONFIG["jitter_ms"])
+    serve.add_argument("--error-rate", type=float, default=STANDIN_CONFIG["error_rate"])
+    serve.add_argument("--error-status", type=int, default=STANDIN_CONFIG["error_status"])
+    serve.add_argument("--sequence", choices=["", "basic", "tools"], default=STANDIN_CONFIG["sequence"])
+
+    replay = subparsers.add_parser("replay", help="send webhook sequences to the proxy")
+    replay.add_argument("--proxy-url", default="http://localhost:8001")
+    replay.add_argument("--device-id", required=True)
+    replay.add_argument("--sequence", choices=["basic", "tools"], default="basic")
+    replay.add_argument("--count", type=int, default=100)
+    replay.add_argument("--concurrency", type=int, default=10)
+
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        asyncio.run(replay_main(args))
+        return
+
+    STANDIN_CONFIG.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        sequence=args.sequence
+    )
+    print(f"🎭 VAPI stand-in on :{args.port} - {STANDIN_CONFIG}")
+
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Startup Warm-Up
+
+The first requests after a boot used to pay for DNS resolution and the TLS
+handshake of every tenant's Home Assistant and of the VAPI API. warm_up()
+runs once from the lifespan, in the background:
+
+- Compiles the routing table (device + HA registries)
+- Opens a pooled connection (DNS + TCP + TLS) to every HA site and to VAPI
+  with a cheap HEAD request; any HTTP response counts, failures are logged
+  and never block startup for more than WARMUP_TIMEOUT_SECONDS
+
+/ready reports 503 until it has finished, /health is live immediately.
+"""
+
+from typing import Any, Dict
+import asyncio
+import os
+import time
+
+import httpx
+
+from http_clients import get_vapi_client
+from routing import ROUTING_TABLE, DEFAULT_ROUTE
+
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", 5))
+
+WARMUP_STATE: Dict[str, Any] = {"done": False}
+
+
+async def _preconnect(client: httpx.AsyncClient) -> str:
+    try:
+        response = await client.head("/", timeout=WARMUP_TIMEOUT_SECONDS)
+        return f"ok ({response.status_code})"
+    except Exception as e:
+        return f"failed ({type(e).__name__})"
+
+
+async def warm_up() -> Dict[str, Any]:
+    """
+    Load the registries and pre-connect to every upstream.
+
+    Returns:
+        Summary: {"ha": {url: outcome}, "vapi": outcome, "seconds": ...}
+    """
+    started = time.monotonic()
+    routes = ROUTING_TABLE.current()
+
+    ha_routes = {
+        site.ha_url: site
+        for route in routes.by_customer.values()
+        for site in route.sites or (route,)
+    }
+    ha_routes.setdefault(DEFAULT_ROUTE.ha_url, DEFAULT_ROUTE)
+    ha_urls = list(ha_routes)
+
+    outcomes = await asyncio.gather(
+        _preconnect(get_vapi_client()),
+        *(_preconnect(ha_routes[ha_url].client) for ha_url in ha_urls)
+    )
+
+    summary = {
+        "ha": dict(zip(ha_urls, outcomes[1:])),
+        "vapi": outcomes[0],
+        "seconds": round(time.monotonic() - started, 3)
+    }
+    WARMUP_STATE.update(summary, done=True)
+    failed = sum(1 for outcome in outcomes if outcome.startswith("failed"))
+    print(f"🔥 Warm-up done in {summary['seconds']}s: {len(ha_urls)} HA instance(s) + VAPI, {failed} unreachable")
+    return summary
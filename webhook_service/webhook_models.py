@@ -0,0 +1,305 @@
+"""
+Typed VAPI Webhook Payloads
+
+The webhook body is validated once, straight from the raw bytes, by
+pydantic-core (parse_webhook). Handlers get typed objects instead of walking
+dicts with chains of .get():
+
+- message is a discriminated union on message.type (resolved inside
+  pydantic-core); unknown types validate as UnknownMessage instead of failing
+- fields are lenient: null or a mistyped value reads as the field's default
+  and malformed toolCalls entries are dropped, so one bad field does not
+  turn a real status update or tool call into an UnknownMessage
+- tool calls are a discriminated union on the function name, each with its
+  own argument model; arguments sent as a JSON string are decoded during
+  validation (invalid JSON becomes empty arguments, i.e. "Missing ...")
+- "functionCall" (legacy) and "toolCalls" are both accepted; "parameters"
+  and "arguments" are both accepted for the arguments
+
+Unknown fields are ignored, so VAPI adding fields never breaks parsing.
+See bench_webhook_parsing.py for the comparison with dict walking.
+"""
+
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+import json
+
+from pydantic import AliasChoices, BaseModel, BeforeValidator, Field, TypeAdapter
+
+
+def _decode_arguments(value: Any) -> Any:
+    """Arguments may arrive as a JSON string; None/invalid JSON/non-objects → no arguments."""
+    if isinstance(value, (str, bytes)):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, (dict, BaseModel)) else {}
+
+
+def _lenient_text(default: str = ""):
+    """str field where null, an object or a list reads as default."""
+    def coerce(value: Any) -> Any:
+        if value is None or isinstance(value, (dict, list)):
+            return default
+        return value if isinstance(value, str) else str(value)
+    return BeforeValidator(coerce)
+
+
+def _text_or_none(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def _number_or_none(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _list_or_empty(value: Any) -> Any:
+    return value if isinstance(value, list) else []
+
+
+def _list_or_none(value: Any) -> Any:
+    return value if isinstance(value, list) else None
+
+
+def _object_or_none(value: Any) -> Any:
+    return value if isinstance(value, (dict, BaseModel)) else None
+
+
+def _valid_tool_calls(value: Any) -> Any:
+    """Drop toolCalls entries without a function object (e.g. "function": null)."""
+    if not isinstance(value, list):
+        return []
+    return [
+        item for item in value
+        if isinstance(item, BaseModel) or (
+            isinstance(item, dict)
+            and isinstance(item.get("function"), dict)
+            and isinstance(item["function"].get("name", ""), str)
+        )
+    ]
+
+
+Text = Annotated[str, _lenient_text()]
+OptionalText = Annotated[Optional[str], BeforeValidator(_text_or_none)]
+OptionalNumber = Annotated[Optional[float], BeforeValidator(_number_or_none)]
+
+
+def _arguments_field(model):
+    return Field(
+        default_factory=model,
+        validation_alias=AliasChoices("parameters", "arguments")
+    )
+
+
+# ========================================
+# Tool (function) calls
+# ========================================
+
+class AirCirculatorArguments(BaseModel):
+    device: Text = ""
+    action: Text = ""
+    target: Text = ""  # site id / name / tag, "all"; empty = the customer's first site
+
+
+class FrontDoorArguments(BaseModel):
+    action: Text = ""
+    target: Text = ""
+
+
+class HomeAuthArguments(BaseModel):
+    pass
+
+
+class ScheduleCommandArguments(BaseModel):
+    device: Text = ""
+    action: Text = ""
+    delay_minutes: OptionalNumber = None
+    target: Text = ""
+
+
+class CancelScheduledArguments(BaseModel):
+    command_id: Text = ""
+    device: Text = ""
+
+
+class AirCirculatorCall(BaseModel):
+    name: Literal["control_air_circulator"]
+    arguments: Annotated[AirCirculatorArguments, BeforeValidator(_decode_arguments)] = \
+        _arguments_field(AirCirculatorArguments)
+
+
+class FrontDoorCall(BaseModel):
+    name: Literal["control_front_door"]
+    arguments: Annotated[FrontDoorArguments, BeforeValidator(_decode_arguments)] = \
+        _arguments_field(FrontDoorArguments)
+
+
+class HomeAuthCall(BaseModel):
+    name: Literal["home_auth"]
+    arguments: Annotated[HomeAuthArguments, BeforeValidator(_decode_arguments)] = \
+        _arguments_field(HomeAuthArguments)
+
+
+class ScheduleCommandCall(BaseModel):
+    name: Literal["schedule_device_command"]
+    arguments: Annotated[ScheduleCommandArguments, BeforeValidator(_decode_arguments)] = \
+        _arguments_field(ScheduleCommandArguments)
+
+
+class ListScheduledCall(BaseModel):
+    name: Literal["list_scheduled_commands"]
+
+
+class CancelScheduledCall(BaseModel):
+    name: Literal["cancel_scheduled_command"]
+    arguments: Annotated[CancelScheduledArguments, BeforeValidator(_decode_arguments)] = \
+        _arguments_field(CancelScheduledArguments)
+
+
+class UnknownFunctionCall(BaseModel):
+    name: Text = ""
+    arguments: Annotated[Dict[str, Any], BeforeValidator(_decode_arguments)] = \
+        _arguments_field(dict)
+
+
+# Known tools: tagged union on "name" (resolved in pydantic-core, no Python
+# callback); any other name falls through to UnknownFunctionCall
+KnownFunctionCall = Annotated[
+    Union[AirCirculatorCall, FrontDoorCall, HomeAuthCall,
+          ScheduleCommandCall, ListScheduledCall, CancelScheduledCall],
+    Field(discriminator="name")
+]
+FunctionCall = Annotated[
+    Union[KnownFunctionCall, UnknownFunctionCall],
+    Field(union_mode="left_to_right")
+]
+
+
+class ToolCall(BaseModel):
+    id: OptionalText = None
+    function: FunctionCall = Field(default_factory=UnknownFunctionCall)
+
+
+# ========================================
+# Messages (discriminated on message.type)
+# ========================================
+
+class VapiCall(BaseModel):
+    """VAPI call information"""
+    id: OptionalText = None
+    assistantId: OptionalText = None
+
+
+# A "call" that is not an object reads as no call
+OptionalCall = Annotated[Optional[VapiCall], BeforeValidator(_object_or_none)]
+
+
+class _Message(BaseModel):
+    call: OptionalCall = None
+
+
+class StatusUpdateMessage(_Message):
+    type: Literal["status-update"]
+    status: Text = ""
+    endedReason: OptionalText = None
+
+
+class TranscriptMessage(_Message):
+    type: Literal["transcript"]
+    transcript: Text = ""
+    transcriptType: Annotated[str, _lenient_text("partial")] = "partial"
+    role: Annotated[str, _lenient_text("unknown")] = "unknown"
+
+
+class ConversationUpdateMessage(_Message):
+    type: Literal["conversation-update"]
+    # Items are kept as decoded JSON (not validated one by one - updates repeat the whole call)
+    conversation: Annotated[List[Any], BeforeValidator(_list_or_empty)] = []
+
+
+class EndOfCallReportMessage(_Message):
+    type: Literal["end-of-call-report"]
+    endedReason: OptionalText = None
+    summary: OptionalText = None
+    messages: Annotated[Optional[List[Any]], BeforeValidator(_list_or_none)] = None
+    cost: OptionalNumber = None
+    durationSeconds: OptionalNumber = None
+
+
+class AssistantRequestMessage(_Message):
+    type: Literal["assistant-request"]
+
+
+class ConversationStartedMessage(_Message):
+    type: Literal["conversation-started"]
+
+
+class ToolCallsMessage(_Message):
+    type: Literal["tool-calls", "function-call"]
+    functionCall: Annotated[Optional[FunctionCall], BeforeValidator(_object_or_none)] = None
+    toolCalls: Annotated[List[ToolCall], BeforeValidator(_valid_tool_calls)] = []
+
+    def first_call(self) -> ToolCall:
+        """The tool call to run: functionCall, else the first of toolCalls."""
+        if self.functionCall is not None and self.functionCall.name:
+            return ToolCall(function=self.functionCall)
+        if self.toolCalls:
+            return self.toolCalls[0]
+        return ToolCall()
+
+
+class UnknownMessage(_Message):
+    type: Text = ""
+
+
+KnownMessage = Annotated[
+    Union[
+        StatusUpdateMessage,
+        TranscriptMessage,
+        ConversationUpdateMessage,
+        EndOfCallReportMessage,
+        AssistantRequestMessage,
+        ConversationStartedMessage,
+        ToolCallsMessage
+    ],
+    Field(discriminator="type")
+]
+VapiMessage = Annotated[
+    Union[KnownMessage, UnknownMessage],
+    Field(union_mode="left_to_right")
+]
+
+
+class VapiWebhookRequest(BaseModel):
+    """VAPI webhook request payload"""
+    message: VapiMessage = Field(default_factory=UnknownMessage)
+    call: OptionalCall = None
+
+    @property
+    def call_id(self) -> Optional[str]:
+        call = self.call or self.message.call
+        return call.id if call else None
+
+
+WEBHOOK_ADAPTER = TypeAdapter(VapiWebhookRequest)
+
+
+def parse_webhook(raw: bytes) -> VapiWebhookRequest:
+    """
+    Validate a raw webhook body in one pass.
+
+    Raises:
+        pydantic.ValidationError: Invalid JSON, or body / message not objects
+    """
+    return WEBHOOK_ADAPTER.validate_json(raw or b"{}")
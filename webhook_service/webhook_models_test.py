@@ -0,0 +1,52 @@
+import json
+
+from webhook_models import (
+    AirCirculatorCall, EndOfCallReportMessage, StatusUpdateMessage, ToolCallsMessage, parse_webhook
+)
+
+
+def _parse(message):
+    return parse_webhook(json.dumps({"message": message}).encode())
+
+
+def test_malformed_tool_call_entry_is_dropped():
+    event = _parse({
+        "type": "tool-calls",
+        "call": {"id": "call-1"},
+        "toolCalls": [
+            {"id": "tc-1", "function": {"name": "control_air_circulator",
+                                        "arguments": '{"device": "fan", "action": "on", "target": null}'}},
+            {"id": "tc-2", "function": None},
+            "garbage",
+        ],
+    })
+
+    message = event.message
+    assert isinstance(message, ToolCallsMessage)
+    assert [tool_call.id for tool_call in message.toolCalls] == ["tc-1"]
+    function = message.first_call().function
+    assert isinstance(function, AirCirculatorCall)
+    assert (function.arguments.device, function.arguments.action, function.arguments.target) == ("fan", "on", "")
+    assert event.call_id == "call-1"
+
+
+def test_non_object_arguments_read_as_no_arguments():
+    for arguments in ([], 5, '"on"', True):
+        message = _parse({"type": "tool-calls", "toolCalls": [
+            {"id": "t1", "function": {"name": "control_air_circulator", "arguments": arguments}}
+        ]}).message
+        assert isinstance(message, ToolCallsMessage)
+        function = message.first_call().function
+        assert isinstance(function, AirCirculatorCall)
+        assert function.arguments.device == ""
+
+
+def test_null_fields_keep_the_message_type():
+    status = _parse({"type": "status-update", "status": None, "endedReason": None, "call": "not-an-object"}).message
+    assert isinstance(status, StatusUpdateMessage)
+    assert status.status == "" and status.call is None
+
+    report = _parse({"type": "end-of-call-report", "endedReason": {"code": 1},
+                     "cost": "n/a", "durationSeconds": "12.5", "messages": None}).message
+    assert isinstance(report, EndOfCallReportMessage)
+    assert report.endedReason is None and report.cost is None and report.durationSeconds == 12.5